@@ -0,0 +1,179 @@
+# benchmarks/bench_gunicorn.py
+
+"""
+Benchmark de peticiones por segundo contra un gunicorn real, comparando el acceso
+a SQLite anterior (una conexión nueva por petición, sin PRAGMAs) con el pool de
+conexiones y el perfil de PRAGMAs de fabricioboard/db.py.
+
+Uso (desde la raíz del repositorio):
+
+    python benchmarks/bench_gunicorn.py
+    python benchmarks/bench_gunicorn.py --workers 1 2 4 8 --duration 15 --concurrency 32
+
+Para cada perfil y número de workers crea una base de datos nueva (el modo WAL se
+guarda en el archivo), arranca gunicorn y lanza durante `--duration` segundos una
+mezcla de cargas de tablero (GET) y ediciones de tareas (PUT).
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import warnings
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from fabricioboard import create_app  # noqa: E402
+from fabricioboard.db import get_db, init_db  # noqa: E402
+
+PROFILES = {
+    # Comportamiento anterior: abrir y cerrar la conexión en cada petición, sin PRAGMAs
+    'anterior': {'SQLITE_POOL_SIZE': 0, 'SQLITE_PRAGMAS': {}},
+    # Valores por defecto actuales
+    'pool': {},
+}
+
+WSGI_MODULE = """
+import json, os
+from fabricioboard import create_app
+from fabricioboard.extensions import limiter
+
+app = create_app(json.loads(os.environ['BENCH_CONFIG']))
+limiter.enabled = False
+"""
+
+COLUMNS = ['Por Hacer', 'En Progreso', 'Hecho']
+
+
+def seed(config, n_tasks):
+    app = create_app(config)
+    with app.app_context():
+        init_db()
+        db = get_db()
+        db.execute("INSERT INTO projects (code, name) VALUES ('BENCH', 'Benchmark')")
+        db.executemany(
+            """
+            INSERT INTO tasks (project_id, title, description, column, position)
+            VALUES (1, ?, '', ?, ?)
+            """,
+            [(f'Tarea {i}', COLUMNS[i % 3], float(i)) for i in range(n_tasks)],
+        )
+        db.commit()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(port, timeout=15):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/api/projects/BENCH')
+            conn.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError('gunicorn no arrancó a tiempo')
+
+
+def drive(port, duration, concurrency, n_tasks, write_ratio):
+    counts = {'ok': 0, 'errors': 0}
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(seed):
+        rnd = random.Random(seed)
+        ok = errors = 0
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        while time.monotonic() < deadline:
+            try:
+                if rnd.random() < write_ratio:
+                    body = json.dumps({'title': f'Editada {rnd.random()}'})
+                    conn.request('PUT', f'/api/tasks/{rnd.randint(1, n_tasks)}', body,
+                                 {'Content-Type': 'application/json'})
+                else:
+                    conn.request('GET', '/api/projects/BENCH')
+                response = conn.getresponse()
+                response.read()
+                if response.status < 400:
+                    ok += 1
+                else:
+                    errors += 1
+            except (OSError, http.client.HTTPException):
+                errors += 1
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        with lock:
+            counts['ok'] += ok
+            counts['errors'] += errors
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return counts
+
+
+def run(profile, workers, args, tmp):
+    database = os.path.join(tmp, f'{profile}_{workers}.db')
+    config = {'DATABASE': database, **PROFILES[profile]}
+    seed(config, args.tasks)
+
+    port = free_port()
+    env = dict(
+        os.environ,
+        BENCH_CONFIG=json.dumps(config),
+        PYTHONPATH=os.pathsep.join([tmp, ROOT]),
+        PYTHONWARNINGS='ignore',
+    )
+    # Se ejecuta desde el directorio temporal para no cargar el gunicorn.conf.py del proyecto
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-w', str(workers), '-k', 'sync',
+         '-b', f'127.0.0.1:{port}', '--log-level', 'warning', 'bench_wsgi:app'],
+        cwd=tmp, env=env,
+    )
+    try:
+        wait_ready(port)
+        counts = drive(port, args.duration, args.concurrency, args.tasks, args.write_ratio)
+    finally:
+        server.terminate()
+        server.wait()
+    return counts['ok'] / args.duration, counts['errors']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--tasks', type=int, default=500)
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    args = parser.parse_args()
+    warnings.simplefilter('ignore')
+
+    print(f"{'perfil':<9} | {'workers':>7} | {'req/s':>9} | {'errores':>7}")
+    print('-' * 42)
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, 'bench_wsgi.py'), 'w') as f:
+            f.write(WSGI_MODULE)
+        for workers in args.workers:
+            for profile in PROFILES:
+                rps, errors = run(profile, workers, args, tmp)
+                print(f'{profile:<9} | {workers:>7} | {rps:>9.1f} | {errors:>7}')
+
+
+if __name__ == '__main__':
+    main()
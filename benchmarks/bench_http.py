@@ -0,0 +1,387 @@
+# benchmarks/bench_http.py
+
+"""
+Suite de benchmarks HTTP repetible para la API y el panel de administración.
+
+Uso (desde la raíz del repositorio):
+
+    python benchmarks/bench_http.py --output resultados.json
+    python benchmarks/bench_http.py --baseline base.json            # falla si hay regresiones
+    python benchmarks/bench_http.py --baseline base.json --update-baseline
+    python benchmarks/bench_http.py --sizes 100 1000 --drivers client --mixes edicion
+
+Para cada tamaño de base de datos (tareas por proyecto) genera datos sintéticos
+con una semilla fija (ver fabricioboard/bulk.py) y recorre cada mezcla de
+operaciones con dos drivers:
+
+- client:   el test client de Flask, en el mismo proceso y secuencial. Mide el
+            costo de la aplicación sin red ni servidor (--requests peticiones).
+- gunicorn: un proceso gunicorn real con --workers workers, atacado durante
+            --duration segundos por --concurrency clientes HTTP en paralelo.
+
+Las mezclas combinan cargas de tablero, arrastres (PUT /api/tasks/<id> con
+column/position, como SortableJS), creación de tareas, alternar etiquetas y cargas
+del dashboard de administración. Se reportan peticiones/s y latencias p50/p95/p99
+(total y por operación), y se guardan en JSON.
+
+Con --baseline se comparan los resultados con un JSON anterior: si el throughput
+baja o el p95 sube más que --tolerance, se listan las regresiones y el script
+termina con código 1. Los números dependen de la máquina: compara siempre contra
+una línea base tomada en el mismo equipo.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import warnings
+from datetime import datetime, timezone
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from fabricioboard import create_app  # noqa: E402
+from fabricioboard.bulk import bulk_load, generate  # noqa: E402
+from fabricioboard.db import get_db, init_db  # noqa: E402
+from fabricioboard.extensions import limiter  # noqa: E402
+from fabricioboard.search import rebuild_index  # noqa: E402
+from fabricioboard.stats import rebuild_stats  # noqa: E402
+
+COLUMNS = ['Por Hacer', 'En Progreso', 'Hecho']
+
+ADMIN_PASSWORD = 'bench'
+
+# Peso de cada operación en cada mezcla
+MIXES = {
+    # Uso habitual: mucha gente mirando tableros y pocas ediciones
+    'lectura': {'board': 85, 'drag': 5, 'tag_toggle': 5, 'admin': 5},
+    # Sesión de planificación: arrastres, tareas nuevas y etiquetado
+    'edicion': {'board': 40, 'drag': 30, 'create': 10, 'tag_toggle': 15, 'admin': 5},
+}
+
+PROJECTS = 3
+SEED = 42
+
+WSGI_MODULE = """
+from fabricioboard import create_app
+from fabricioboard.extensions import limiter
+
+app = create_app({'DATABASE': %r})
+limiter.enabled = False
+"""
+
+
+# --- Datos y operaciones ---
+
+def seed_database(database, tasks_per_project, toggle_tags):
+    """Crea la base de datos y devuelve el contexto que usan las operaciones."""
+    app = create_app({'DATABASE': database, 'TESTING': True})
+    with app.app_context():
+        init_db()
+        db = get_db()
+        with bulk_load(db):
+            generate(db, PROJECTS, tasks_per_project, users=25, tags=12, seed=SEED, chunk=10000)
+            rebuild_index(db, optimize=False)
+            rebuild_stats(db)
+            # Una etiqueta propia por cliente: así sus altas y bajas nunca chocan
+            db.executemany(
+                'INSERT INTO tags (name, color) VALUES (?, ?)',
+                [(f'bench-toggle-{i}', '#cccccc') for i in range(toggle_tags)]
+            )
+        projects = db.execute('SELECT id, code FROM projects ORDER BY id').fetchall()
+        toggles = db.execute("SELECT id FROM tags WHERE name LIKE 'bench-toggle-%' ORDER BY id").fetchall()
+        return {
+            'projects': [(row['id'], row['code']) for row in projects],
+            'max_task_id': db.execute('SELECT MAX(id) FROM tasks').fetchone()[0],
+            'toggle_tags': [row['id'] for row in toggles],
+        }
+
+
+def make_request(op, rnd, context, state):
+    """Devuelve (método, ruta, cuerpo JSON) de la operación `op`."""
+    if op == 'board':
+        return 'GET', f"/api/projects/{rnd.choice(context['projects'])[1]}", None
+    if op == 'admin':
+        return 'GET', '/admin/dashboard', None
+    if op == 'create':
+        project_id = rnd.choice(context['projects'])[0]
+        return 'POST', '/api/tasks', {'title': 'Tarea de benchmark', 'project_id': project_id,
+                                      'column': rnd.choice(COLUMNS)}
+
+    task_id = rnd.randint(1, context['max_task_id'])
+    if op == 'drag':
+        return 'PUT', f'/api/tasks/{task_id}', {'column': rnd.choice(COLUMNS), 'position': rnd.randint(0, 20)}
+    if op == 'tag_toggle':
+        tag_id = state['tag_id']
+        if task_id in state['tagged']:
+            state['tagged'].discard(task_id)
+            return 'DELETE', f'/api/tasks/{task_id}/tags/{tag_id}', None
+        state['tagged'].add(task_id)
+        return 'POST', f'/api/tasks/{task_id}/tags', {'tag_id': tag_id}
+    raise ValueError(op)
+
+
+def pick_operations(rnd, mix):
+    ops = list(MIXES[mix])
+    weights = list(MIXES[mix].values())
+    while True:
+        yield rnd.choices(ops, weights)[0]
+
+
+# --- Drivers ---
+
+def run_client(database, context, mix, args):
+    """Driver en proceso con el test client de Flask. Devuelve (muestras, segundos)."""
+    app = create_app({'DATABASE': database, 'TESTING': True})
+    limiter.enabled = False
+    client = app.test_client()
+    client.post('/admin/login', data={'password': ADMIN_PASSWORD})
+
+    rnd = random.Random(SEED)
+    state = {'tag_id': context['toggle_tags'][0], 'tagged': set()}
+    operations = pick_operations(rnd, mix)
+    samples = []
+    start = time.perf_counter()
+    for _ in range(args.requests):
+        op = next(operations)
+        method, path, body = make_request(op, rnd, context, state)
+        t0 = time.perf_counter()
+        response = client.open(path, method=method, json=body)
+        response.get_data()
+        samples.append((op, time.perf_counter() - t0, response.status_code))
+    return samples, time.perf_counter() - start
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(port, timeout=15):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/admin/login')
+            conn.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError('gunicorn no arrancó a tiempo')
+
+
+def admin_cookie(conn):
+    conn.request('POST', '/admin/login', f'password={ADMIN_PASSWORD}',
+                 {'Content-Type': 'application/x-www-form-urlencoded'})
+    response = conn.getresponse()
+    response.read()
+    return response.getheader('Set-Cookie', '').split(';', 1)[0]
+
+
+def run_gunicorn(database, context, mix, args, tmp):
+    """Driver con un gunicorn real y clientes HTTP concurrentes. Devuelve (muestras, segundos)."""
+    module = f'bench_http_wsgi_{os.getpid()}'
+    with open(os.path.join(tmp, f'{module}.py'), 'w') as f:
+        f.write(WSGI_MODULE % database)
+
+    port = free_port()
+    env = dict(
+        os.environ,
+        ADMIN_SECRET_KEY=ADMIN_PASSWORD,
+        PYTHONPATH=os.pathsep.join([tmp, ROOT]),
+        PYTHONWARNINGS='ignore',
+    )
+    # Se ejecuta desde el directorio temporal para no cargar el gunicorn.conf.py del proyecto
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-w', str(args.workers), '-k', 'sync',
+         '-b', f'127.0.0.1:{port}', '--log-level', 'warning', f'{module}:app'],
+        cwd=tmp, env=env,
+    )
+    samples = []
+    lock = threading.Lock()
+
+    def client(index, deadline):
+        rnd = random.Random(SEED + index)
+        state = {'tag_id': context['toggle_tags'][index], 'tagged': set()}
+        operations = pick_operations(rnd, mix)
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        cookie = admin_cookie(conn)
+        local = []
+        while time.monotonic() < deadline:
+            op = next(operations)
+            method, path, body = make_request(op, rnd, context, state)
+            headers = {'Cookie': cookie}
+            if body is not None:
+                headers['Content-Type'] = 'application/json'
+                body = json.dumps(body)
+            t0 = time.perf_counter()
+            try:
+                conn.request(method, path, body, headers)
+                response = conn.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                status = 599
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            local.append((op, time.perf_counter() - t0, status))
+        with lock:
+            samples.extend(local)
+
+    try:
+        wait_ready(port)
+        deadline = time.monotonic() + args.duration
+        threads = [threading.Thread(target=client, args=(i, deadline)) for i in range(args.concurrency)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait()
+    return samples, elapsed
+
+
+# --- Estadísticas y comparación ---
+
+def percentile(sorted_values, p):
+    """Percentil por rango más cercano sobre una lista ya ordenada."""
+    index = max(0, min(len(sorted_values) - 1, int(round(p / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def latency_stats(durations):
+    durations = sorted(durations)
+    return {
+        'count': len(durations),
+        'p50': percentile(durations, 50) * 1000,
+        'p95': percentile(durations, 95) * 1000,
+        'p99': percentile(durations, 99) * 1000,
+    }
+
+
+def summarize(samples, elapsed):
+    by_op = {}
+    for op, duration, _ in samples:
+        by_op.setdefault(op, []).append(duration)
+    return {
+        'requests': len(samples),
+        'errors': sum(1 for _, _, status in samples if status >= 400),
+        'throughput': len(samples) / elapsed,
+        'latency_ms': {
+            'all': latency_stats([duration for _, duration, _ in samples]),
+            **{op: latency_stats(durations) for op, durations in sorted(by_op.items())},
+        },
+    }
+
+
+def compare(results, baseline, tolerance, min_ms):
+    """Devuelve la lista de regresiones (texto) frente a la línea base."""
+    regressions = []
+    for key, current in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        if current['throughput'] < base['throughput'] * (1 - tolerance):
+            regressions.append(
+                f"{key}: throughput {current['throughput']:.1f} req/s < {base['throughput']:.1f} req/s"
+            )
+        if current['errors'] > base['errors']:
+            regressions.append(f"{key}: errores {current['errors']} > {base['errors']}")
+        for op, stats in current['latency_ms'].items():
+            base_stats = base['latency_ms'].get(op)
+            if base_stats is None:
+                continue
+            # Por debajo de min_ms el ruido de la medición domina: no se compara
+            limit = max(base_stats['p95'] * (1 + tolerance), base_stats['p95'] + min_ms)
+            if stats['p95'] > limit:
+                regressions.append(f"{key} [{op}]: p95 {stats['p95']:.2f} ms > {base_stats['p95']:.2f} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 5000],
+                        help='Tareas por proyecto (se generan 3 proyectos).')
+    parser.add_argument('--drivers', nargs='+', choices=['client', 'gunicorn'], default=['client', 'gunicorn'])
+    parser.add_argument('--mixes', nargs='+', choices=list(MIXES), default=list(MIXES))
+    parser.add_argument('--requests', type=int, default=500, help='Peticiones por corrida del driver client.')
+    parser.add_argument('--duration', type=float, default=10, help='Segundos por corrida del driver gunicorn.')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--output', help='Archivo JSON donde guardar los resultados.')
+    parser.add_argument('--baseline', help='JSON de una corrida anterior con el que comparar.')
+    parser.add_argument('--update-baseline', action='store_true', help='Sobrescribe --baseline con estos resultados.')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Empeoramiento relativo tolerado (0.2 = 20%%).')
+    parser.add_argument('--min-ms', type=float, default=1.0, help='Diferencia mínima de p95 (ms) para contar como regresión.')
+    args = parser.parse_args()
+    warnings.simplefilter('ignore')
+    os.environ['ADMIN_SECRET_KEY'] = ADMIN_PASSWORD
+
+    results = {}
+    print(f"{'corrida':<28} | {'req/s':>8} | {'p50 ms':>8} | {'p95 ms':>8} | {'p99 ms':>8} | {'errores':>7}")
+    print('-' * 82)
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            for driver in args.drivers:
+                for mix in args.mixes:
+                    # Base de datos nueva en cada corrida: las escrituras no se acumulan
+                    database = os.path.join(tmp, f'{driver}_{size}_{mix}.db')
+                    context = seed_database(database, size, max(args.concurrency, 1))
+                    if driver == 'client':
+                        samples, elapsed = run_client(database, context, mix, args)
+                    else:
+                        samples, elapsed = run_gunicorn(database, context, mix, args, tmp)
+
+                    key = f'{driver}/{size}/{mix}'
+                    results[key] = summary = summarize(samples, elapsed)
+                    stats = summary['latency_ms']['all']
+                    print(f"{key:<28} | {summary['throughput']:>8.1f} | {stats['p50']:>8.2f} | "
+                          f"{stats['p95']:>8.2f} | {stats['p99']:>8.2f} | {summary['errors']:>7}")
+
+    document = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'args': {k: v for k, v in vars(args).items() if k not in ('output', 'baseline', 'update_baseline')},
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(document, f, indent=2)
+        print(f'\nResultados guardados en {args.output}')
+
+    if args.baseline and args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(document, f, indent=2)
+        print(f'Línea base actualizada: {args.baseline}')
+    elif args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.tolerance, args.min_ms)
+        if regressions:
+            print(f'\n¡REGRESIÓN! {len(regressions)} métrica(s) empeoraron más de un {args.tolerance:.0%}:')
+            for line in regressions:
+                print(f'  - {line}')
+            sys.exit(1)
+        print(f'\nSin regresiones frente a {args.baseline} (tolerancia {args.tolerance:.0%}).')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+# benchmarks/bench_metrics.py
+
+"""
+Benchmark del costo de la instrumentación (fabricioboard/metrics.py).
+
+Uso (desde la raíz del repositorio):
+
+    python benchmarks/bench_metrics.py
+    python benchmarks/bench_metrics.py --tasks 5000 --requests 1000
+
+Compara tres perfiles sobre la misma base de datos, con el test client de Flask:
+
+- apagado:   METRICS_ENABLED = False (sin hooks ni conexiones trazadas).
+- peticion:  solo métricas por petición (METRICS_SQL_TRACING = False).
+- completo:  métricas por petición y trazado de cada sentencia SQL.
+
+Para cada perfil mide la mediana de una carga de tablero (sin caché, como tras
+cada cambio) y de un arrastre (PUT /api/tasks/<id>), y la diferencia con el
+perfil apagado.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fabricioboard import create_app  # noqa: E402
+from fabricioboard.bulk import bulk_load, generate  # noqa: E402
+from fabricioboard.db import get_db, init_db  # noqa: E402
+from fabricioboard.extensions import board_cache, limiter  # noqa: E402
+from fabricioboard.search import rebuild_index  # noqa: E402
+from fabricioboard.stats import rebuild_stats  # noqa: E402
+
+PROFILES = {
+    'apagado': {'METRICS_ENABLED': False},
+    'peticion': {'METRICS_SQL_TRACING': False},
+    'completo': {},
+}
+
+COLUMNS = ['Por Hacer', 'En Progreso', 'Hecho']
+
+
+def measure(database, profile, args):
+    app = create_app({'DATABASE': database, 'TESTING': True, **PROFILES[profile]})
+    limiter.enabled = False
+    client = app.test_client()
+    rnd = random.Random(42)
+
+    board, drag = [], []
+    for _ in range(args.requests):
+        # Sin caché: medimos el trabajo real de la consulta en cada carga
+        board_cache.clear()
+        start = time.perf_counter()
+        response = client.get('/api/projects/SEED-0001')
+        board.append(time.perf_counter() - start)
+        assert response.status_code == 200
+
+        task_id = rnd.randint(1, args.tasks)
+        start = time.perf_counter()
+        response = client.put(f'/api/tasks/{task_id}',
+                              json={'column': rnd.choice(COLUMNS), 'position': rnd.randint(0, 20)})
+        drag.append(time.perf_counter() - start)
+        assert response.status_code == 200
+    return statistics.median(board), statistics.median(drag)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--tasks', type=int, default=1000)
+    parser.add_argument('--requests', type=int, default=300)
+    args = parser.parse_args()
+    warnings.simplefilter('ignore')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database = os.path.join(tmp, 'bench.db')
+        app = create_app({'DATABASE': database, 'TESTING': True, 'METRICS_ENABLED': False})
+        with app.app_context():
+            init_db()
+            db = get_db()
+            with bulk_load(db):
+                generate(db, 1, args.tasks, users=25, tags=12, seed=42, chunk=10000)
+                rebuild_index(db, optimize=False)
+                rebuild_stats(db)
+
+        results = {profile: measure(database, profile, args) for profile in PROFILES}
+
+    base_board, base_drag = results['apagado']
+    print(f"{'perfil':<9} | {'tablero ms':>10} | {'dif.':>7} | {'arrastre ms':>11} | {'dif.':>7}")
+    print('-' * 56)
+    for profile, (board, drag) in results.items():
+        print(f'{profile:<9} | {board * 1000:>10.3f} | {(board / base_board - 1):>+7.1%} | '
+              f'{drag * 1000:>11.3f} | {(drag / base_drag - 1):>+7.1%}')
+
+
+if __name__ == '__main__':
+    main()
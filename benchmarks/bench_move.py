@@ -0,0 +1,78 @@
+# benchmarks/bench_move.py
+
+"""
+Benchmark de reordenamiento: costo de mover una tarjeta con POST /api/tasks/<id>/move
+en columnas de distinto tamaño.
+
+Uso (desde la raíz del repositorio):
+
+    python benchmarks/bench_move.py
+    python benchmarks/bench_move.py --sizes 5 2000 20000 --moves 500
+
+Para cada tamaño mueve repetidamente una tarjeta a posiciones aleatorias de la
+columna y mide la mediana por movimiento. Como cada movimiento escribe una sola
+fila de `tasks`, el tiempo no debe depender del tamaño de la columna.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fabricioboard import create_app  # noqa: E402
+from fabricioboard.db import get_db, init_db  # noqa: E402
+from fabricioboard.extensions import limiter  # noqa: E402
+from fabricioboard.ordering import STEP  # noqa: E402
+
+
+def run(size, moves, seed=42):
+    rnd = random.Random(seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'DATABASE': os.path.join(tmp, 'bench.db'), 'TESTING': True})
+        limiter.enabled = False
+        with app.app_context():
+            init_db()
+            db = get_db()
+            db.execute("INSERT INTO projects (code, name) VALUES ('BENCH', 'Benchmark')")
+            db.executemany(
+                """
+                INSERT INTO tasks (project_id, title, description, column, position)
+                VALUES (1, ?, '', 'Por Hacer', ?)
+                """,
+                [(f'Tarea {i}', i * STEP) for i in range(size)],
+            )
+            db.commit()
+
+        client = app.test_client()
+        timings = []
+        for _ in range(moves):
+            task_id, before_id = rnd.sample(range(1, size + 1), 2)
+            start = time.perf_counter()
+            response = client.post(f'/api/tasks/{task_id}/move', json={'before_id': before_id})
+            timings.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.get_data(as_text=True)
+        return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[5, 2000])
+    parser.add_argument('--moves', type=int, default=200)
+    args = parser.parse_args()
+    warnings.simplefilter('ignore')
+
+    print(f"{'tarjetas':>9} | {'mediana ms/mov.':>15}")
+    print('-' * 28)
+    for size in args.sizes:
+        median = run(size, args.moves)
+        print(f'{size:>9} | {median * 1000:>15.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+# benchmarks/bench_ratelimit.py
+
+"""
+Benchmark de los almacenamientos de límites de peticiones (fabricioboard/ratelimit.py).
+
+Uso (desde la raíz del repositorio):
+
+    python benchmarks/bench_ratelimit.py
+    python benchmarks/bench_ratelimit.py --hits 20000 --workers 4 --redis redis://localhost:6379
+
+Compara, con la estrategia de ventana deslizante ('sliding-window-counter') que usa
+la aplicación:
+
+- memory:   contadores en memoria de cada proceso (lo que había sin Redis).
+- sqlite:   archivo SQLite compartido en disco.
+- shm:      el mismo archivo en /dev/shm (tmpfs), si existe.
+- redis:    servidor Redis local (--redis o REDIS_URL), si responde.
+
+Para cada uno mide:
+
+1. El costo de una comprobación (hit) en un solo proceso. Cada petición a la API
+   hace una por cada límite que se le aplica.
+2. Varios procesos (--workers) haciendo hits sobre la misma clave con un límite
+   de --limit: cuántos se aceptan en total (deberían ser exactamente --limit) y
+   cuántos hits por segundo se atienden entre todos.
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from limits import RateLimitItemPerHour  # noqa: E402
+from limits.storage import storage_from_string  # noqa: E402
+from limits.strategies import SlidingWindowCounterRateLimiter  # noqa: E402
+
+import fabricioboard.ratelimit  # noqa: E402,F401  (registra sqlite://)
+
+
+def single_process(uri, hits):
+    """Mediana (en microsegundos) de un hit con claves de 1.000 clientes distintos."""
+    limiter = SlidingWindowCounterRateLimiter(storage_from_string(uri))
+    item = RateLimitItemPerHour(10 ** 9)
+    rnd = random.Random(42)
+    samples = []
+    for _ in range(hits):
+        key = f'10.0.{rnd.randint(0, 3)}.{rnd.randint(0, 249)}'
+        start = time.perf_counter()
+        limiter.hit(item, 'bench', key)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1e6, statistics.quantiles(samples, n=100)[98] * 1e6
+
+
+def _contend(uri, limit, hits, start_event, results):
+    limiter = SlidingWindowCounterRateLimiter(storage_from_string(uri))
+    item = RateLimitItemPerHour(limit)
+    start_event.wait()
+    results.put(sum(limiter.hit(item, 'bench', 'misma-ip') for _ in range(hits)))
+
+
+def multi_process(uri, workers, limit, hits):
+    """Devuelve (hits aceptados en total, hits por segundo entre todos los procesos)."""
+    context = multiprocessing.get_context('fork')
+    start_event, results = context.Event(), context.Queue()
+    processes = [
+        context.Process(target=_contend, args=(uri, limit, hits, start_event, results))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    time.sleep(0.5)
+    start = time.perf_counter()
+    start_event.set()
+    accepted = sum(results.get() for _ in processes)
+    elapsed = time.perf_counter() - start
+    for process in processes:
+        process.join()
+    return accepted, workers * hits / elapsed
+
+
+def redis_available(uri):
+    try:
+        return storage_from_string(uri).check()
+    except Exception:
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--hits', type=int, default=10000, help='hits por medición y por proceso')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--limit', type=int, default=1000)
+    parser.add_argument('--redis', default=os.environ.get('REDIS_URL', 'redis://localhost:6379'))
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    shm = tempfile.mkdtemp(dir='/dev/shm') if os.path.isdir('/dev/shm') else None
+    storages = {
+        'memory': 'memory://',
+        'sqlite': 'sqlite://' + os.path.join(tmp, 'ratelimit.db'),
+    }
+    if shm:
+        storages['shm'] = 'sqlite://' + os.path.join(shm, 'ratelimit.db')
+    storages['redis'] = args.redis
+
+    print(f'{args.hits} hits por medición; {args.workers} procesos con límite {args.limit} sobre la misma clave')
+    print(f"{'almacén':<8} | {'p50 µs':>8} | {'p99 µs':>8} | {'aceptados':>9} | {'hits/s':>8}")
+    print('-' * 53)
+    try:
+        for name, uri in storages.items():
+            if name == 'redis' and not redis_available(uri):
+                print(f'{name:<8} | no disponible en {uri}')
+                continue
+            storage_from_string(uri).reset()
+            p50, p99 = single_process(uri, args.hits)
+            storage_from_string(uri).reset()
+            accepted, rate = multi_process(uri, args.workers, args.limit, args.hits // args.workers)
+            print(f'{name:<8} | {p50:>8.1f} | {p99:>8.1f} | {accepted:>9} | {rate:>8.0f}')
+    finally:
+        shutil.rmtree(tmp)
+        if shm:
+            shutil.rmtree(shm)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+# benchmarks/bench_reference.py
+
+"""
+Benchmark de GET /api/reference y de los listados del dashboard de administración.
+
+Uso (desde la raíz del repositorio):
+
+    python benchmarks/bench_reference.py
+    python benchmarks/bench_reference.py --users 100000 --tags 20000 --projects 20000
+
+Genera --users usuarios, --tags etiquetas y --projects proyectos (sin tareas) y mide
+la mediana y el p95 de:
+
+- GET /api/reference: sin caché (tras cada alta), desde la caché del worker, y la
+  revalidación con If-None-Match (304 sin cuerpo).
+- /admin/dashboard: la primera página, una página intermedia (siguiendo los cursores)
+  y una búsqueda, en cada pestaña.
+"""
+
+import argparse
+import os
+import re
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fabricioboard import create_app  # noqa: E402
+from fabricioboard.db import get_db, init_db  # noqa: E402
+from fabricioboard.extensions import limiter, reference_cache  # noqa: E402
+from fabricioboard.reference import bump_reference_version  # noqa: E402
+
+NEXT_LINK = re.compile(r'href="/admin/dashboard\?tab=(\w+)&amp;cursor=([\w-]+)"')
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def timed(client, url, repeat, before=None, headers=None, status=200):
+    timings = []
+    for _ in range(repeat):
+        if before is not None:
+            before()
+        start = time.perf_counter()
+        response = client.get(url, headers=headers)
+        timings.append(time.perf_counter() - start)
+        assert response.status_code == status, response.status_code
+    return statistics.median(timings), percentile(timings, 0.95), response
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--users', type=int, default=50_000)
+    parser.add_argument('--tags', type=int, default=10_000)
+    parser.add_argument('--projects', type=int, default=20_000)
+    parser.add_argument('--requests', type=int, default=50, help='Peticiones por caso.')
+    parser.add_argument('--pages', type=int, default=20, help='Páginas que se recorren hasta la intermedia.')
+    args = parser.parse_args()
+    warnings.simplefilter('ignore')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'DATABASE': os.path.join(tmp, 'bench.db'), 'TESTING': True})
+        limiter.enabled = False
+        with app.app_context():
+            init_db()
+            db = get_db()
+            db.executemany(
+                'INSERT INTO users (username, full_name) VALUES (?, ?)',
+                ((f'user_{i:06d}', f'Usuario {i}') for i in range(args.users))
+            )
+            db.executemany(
+                'INSERT INTO tags (name, color) VALUES (?, ?)',
+                ((f'tag-{i:06d}', '#0079BF') for i in range(args.tags))
+            )
+            db.executemany(
+                'INSERT INTO projects (name, code) VALUES (?, ?)',
+                ((f'Proyecto {i:06d}', f'P-{i:06d}') for i in range(args.projects))
+            )
+            db.commit()
+
+        def invalidate():
+            # Como un alta desde el admin: nueva versión y caché vacía
+            with app.app_context():
+                db = get_db()
+                bump_reference_version(db)
+                db.commit()
+            reference_cache.clear()
+
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['admin_logged_in'] = True
+
+        rows = []
+        response = client.get('/api/reference')
+        size = len(response.get_data())
+        etag = response.headers['ETag']
+        rows.append(('/api/reference sin caché', *timed(client, '/api/reference', args.requests, invalidate)[:2]))
+        rows.append(('/api/reference en caché', *timed(client, '/api/reference', args.requests)[:2]))
+        rows.append(('/api/reference 304', *timed(
+            client, '/api/reference', args.requests, headers={'If-None-Match': client.get('/api/reference').headers['ETag']},
+            status=304,
+        )[:2]))
+
+        for tab, q in (('projects', '0123'), ('users', 'user_0421'), ('tags', '-0042')):
+            base = f'/admin/dashboard?tab={tab}'
+            rows.append((f'dashboard {tab}: primera', *timed(client, base, args.requests)[:2]))
+            url = base
+            for _ in range(args.pages):
+                links = dict(NEXT_LINK.findall(client.get(url).get_data(as_text=True)))
+                if tab not in links:
+                    break
+                url = f'{base}&cursor={links[tab]}'
+            rows.append((f'dashboard {tab}: página {args.pages + 1}', *timed(client, url, args.requests)[:2]))
+            rows.append((f'dashboard {tab}: búsqueda', *timed(client, f'{base}&q={q}', args.requests)[:2]))
+
+    print(f'{args.users} usuarios, {args.tags} etiquetas, {args.projects} proyectos; '
+          f'/api/reference ocupa {size / 1024:.0f} KiB ({etag})')
+    print(f"{'caso':<32} | {'mediana ms':>10} | {'p95 ms':>8}")
+    print('-' * 56)
+    for label, median, p95 in rows:
+        print(f'{label:<32} | {median * 1000:>10.2f} | {p95 * 1000:>8.2f}')
+
+
+if __name__ == '__main__':
+    main()
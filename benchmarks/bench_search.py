@@ -0,0 +1,139 @@
+# benchmarks/bench_search.py
+
+"""
+Benchmark de búsqueda: GET /api/projects/<code>/search (FTS5) frente a un LIKE
+'%texto%' sobre título y descripción, en un proyecto de 100.000 tareas dentro de
+una base de datos con varios proyectos.
+
+Uso (desde la raíz del repositorio):
+
+    python benchmarks/bench_search.py
+    python benchmarks/bench_search.py --projects 4 --tasks 20000 --queries 100
+
+Genera --projects proyectos de --tasks tareas con un vocabulario fijo (semilla
+fija), mide el tiempo de carga con los triggers del índice activos y después la
+mediana y el p95 de cada tipo de búsqueda en el primer proyecto. Los términos raros
+devuelven pocas tareas; los frecuentes, muchas (de las que solo se pide la primera
+página). El índice es compartido por todos los proyectos (salvo con particionado),
+así que el resto de proyectos no debería encarecer la búsqueda en uno.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fabricioboard import create_app  # noqa: E402
+from fabricioboard.db import get_db, init_db  # noqa: E402
+from fabricioboard.extensions import limiter  # noqa: E402
+
+COLUMNS = ['Por Hacer', 'En Progreso', 'Hecho']
+
+COMMON_WORDS = [
+    'revisar', 'corregir', 'error', 'pantalla', 'usuario', 'tablero', 'tarea', 'api',
+    'diseño', 'prueba', 'cliente', 'servidor', 'datos', 'formulario', 'reporte',
+]
+
+LIKE_QUERY = """
+    SELECT t.id, t.title, t.column, t.assigned_user_id
+    FROM tasks t
+    WHERE t.project_id = ? AND (t.title LIKE ? OR t.description LIKE ?)
+    ORDER BY t.id
+    LIMIT ?
+"""
+
+
+def make_vocabulary(rnd, size):
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    return [''.join(rnd.choice(letters) for _ in range(rnd.randint(5, 10))) for _ in range(size)]
+
+
+def make_text(rnd, vocabulary, words):
+    return ' '.join(
+        rnd.choice(COMMON_WORDS) if rnd.random() < 0.3 else rnd.choice(vocabulary)
+        for _ in range(words)
+    )
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def timed(fn, queries):
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        fn(query)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), percentile(timings, 0.95)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--projects', type=int, default=10)
+    parser.add_argument('--tasks', type=int, default=100_000, help='Tareas por proyecto.')
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args()
+    warnings.simplefilter('ignore')
+
+    rnd = random.Random(42)
+    vocabulary = make_vocabulary(rnd, 20_000)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'DATABASE': os.path.join(tmp, 'bench.db'), 'TESTING': True})
+        limiter.enabled = False
+        with app.app_context():
+            init_db()
+            db = get_db()
+            db.executemany(
+                'INSERT INTO projects (code, name) VALUES (?, ?)',
+                [('BENCH' if p == 1 else f'BENCH-{p}', f'Benchmark {p}') for p in range(1, args.projects + 1)]
+            )
+            start = time.perf_counter()
+            db.executemany(
+                """
+                INSERT INTO tasks (project_id, title, description, column, position)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (
+                    (p, make_text(rnd, vocabulary, 5), make_text(rnd, vocabulary, 30), COLUMNS[i % 3], float(i))
+                    for p in range(1, args.projects + 1)
+                    for i in range(args.tasks)
+                ),
+            )
+            db.commit()
+            load = time.perf_counter() - start
+            print(f'{args.projects} proyectos × {args.tasks} tareas cargadas (con índice FTS5) en {load:.1f} s')
+
+            rare = rnd.sample(vocabulary, args.queries)
+            common = [rnd.choice(COMMON_WORDS) for _ in range(args.queries)]
+            prefix = [word[:3] for word in rnd.sample(vocabulary, args.queries)]
+
+            def like(text):
+                pattern = f'%{text}%'
+                db.execute(LIKE_QUERY, (1, pattern, pattern, args.limit)).fetchall()
+
+            print()
+            print(f"{'consulta':<19} | {'método':<15} | {'mediana ms':>10} | {'p95 ms':>8}")
+            print('-' * 62)
+            client = app.test_client()
+            for label, queries in (('término raro', rare), ('término frecuente', common), ('prefijo (3 letras)', prefix)):
+                def fts(text):
+                    response = client.get(f'/api/projects/BENCH/search?q={text}&limit={args.limit}')
+                    assert response.status_code == 200, response.get_data(as_text=True)
+
+                for name, fn in (('FTS5 (endpoint)', fts), ('LIKE', like)):
+                    median, p95 = timed(fn, queries)
+                    print(f'{label:<19} | {name:<15} | {median * 1000:>10.2f} | {p95 * 1000:>8.2f}')
+
+
+if __name__ == '__main__':
+    main()
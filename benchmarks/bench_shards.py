@@ -0,0 +1,187 @@
+# benchmarks/bench_shards.py
+
+"""
+Benchmark del particionado por proyecto (fabricioboard/shards.py).
+
+Uso (desde la raíz del repositorio):
+
+    python benchmarks/bench_shards.py
+    python benchmarks/bench_shards.py --active 1 4 16 --writers 8 --duration 10
+
+Genera --projects proyectos de --tasks tareas, una vez en un único archivo y otra
+repartidos con `flask shard-split`, y levanta un gunicorn real (workers gthread)
+contra cada uno. Para cada número de proyectos activos a la vez (--active), lanza
+--writers clientes por proyecto que arrastran tarjetas sin pausa (PUT
+/api/tasks/<id> con columna y posición) y mide el throughput de escrituras total.
+
+Con un único archivo, todos los clientes comparten el bloqueo de escritura y el
+throughput no crece con los proyectos activos; con el particionado cada proyecto
+escribe en su archivo. Los commits son durables (synchronous=FULL, un fsync cada
+uno) salvo que se indique otro --synchronous.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import warnings
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from fabricioboard import create_app  # noqa: E402
+from fabricioboard.bulk import bulk_load, generate  # noqa: E402
+from fabricioboard.db import DEFAULT_PRAGMAS, get_db, init_db  # noqa: E402
+from fabricioboard.search import rebuild_index  # noqa: E402
+from fabricioboard.shards import project_databases  # noqa: E402
+from fabricioboard.stats import rebuild_stats  # noqa: E402
+from bench_writequeue import COLUMNS, free_port, percentile, wait_ready  # noqa: E402
+
+WSGI_MODULE = """
+from fabricioboard import create_app
+from fabricioboard.extensions import limiter
+
+app = create_app(%r)
+limiter.enabled = False
+"""
+
+
+def prepare(tmp, mode, args):
+    """Crea la base de datos del modo y devuelve (config, {project_id: [task ids]})."""
+    config = {
+        'DATABASE': os.path.join(tmp, f'{mode}.db'),
+        'TESTING': True,
+        'SQLITE_PRAGMAS': {**DEFAULT_PRAGMAS, 'synchronous': args.synchronous},
+    }
+    app = create_app(config)
+    with app.app_context():
+        init_db()
+        db = get_db()
+        with bulk_load(db):
+            generate(db, args.projects, args.tasks, users=25, tags=12, seed=42, chunk=10000)
+            rebuild_index(db, optimize=False)
+            rebuild_stats(db)
+
+    if mode == 'particionado':
+        config.update(SHARDING_ENABLED=True, SHARD_DIR=os.path.join(tmp, 'shards'))
+        app = create_app(config)
+        with app.app_context():
+            result = app.test_cli_runner().invoke(args=['shard-split'])
+            if result.exit_code:
+                raise RuntimeError(result.output)
+
+    tasks = {}
+    with app.app_context():
+        for db in project_databases():
+            for project_id, task_id in db.execute('SELECT project_id, id FROM tasks ORDER BY id'):
+                tasks.setdefault(project_id, []).append(task_id)
+    return config, tasks
+
+
+def run(config, tasks, active, args, tmp, module):
+    """Devuelve (latencias correctas, errores, segundos) con `active` proyectos escribiendo a la vez."""
+    with open(os.path.join(tmp, f'{module}.py'), 'w') as f:
+        f.write(WSGI_MODULE % (config,))
+
+    port = free_port()
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([tmp, ROOT]), PYTHONWARNINGS='ignore')
+    # Desde el directorio temporal, para no cargar el gunicorn.conf.py del proyecto
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-w', str(args.workers), '-k', 'gthread',
+         '--threads', str(args.threads), '-b', f'127.0.0.1:{port}', '--log-level', 'warning',
+         f'{module}:app'],
+        cwd=tmp, env=env,
+    )
+    latencies, failed = [], [0]
+    lock = threading.Lock()
+    projects = sorted(tasks)[:active]
+
+    def writer(index, deadline):
+        rnd = random.Random(index)
+        task_ids = tasks[projects[index % len(projects)]]
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        local, local_failed = [], 0
+        while time.monotonic() < deadline:
+            body = json.dumps({'column': rnd.choice(COLUMNS), 'position': rnd.randint(0, 20)})
+            t0 = time.perf_counter()
+            try:
+                conn.request('PUT', f'/api/tasks/{rnd.choice(task_ids)}', body, {'Content-Type': 'application/json'})
+                response = conn.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException):
+                local_failed += 1
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+                continue
+            if response.status == 200:
+                local.append(time.perf_counter() - t0)
+            else:
+                local_failed += 1
+        with lock:
+            latencies.extend(local)
+            failed[0] += local_failed
+
+    try:
+        wait_ready(port)
+        deadline = time.monotonic() + args.duration
+        threads = [threading.Thread(target=writer, args=(i, deadline)) for i in range(active * args.writers)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait()
+    return sorted(latencies), failed[0], elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--projects', type=int, default=8)
+    parser.add_argument('--tasks', type=int, default=2000, help='Tareas por proyecto.')
+    parser.add_argument('--active', type=int, nargs='+', default=[1, 2, 4, 8],
+                        help='Proyectos con escritores a la vez (uno o varios valores).')
+    parser.add_argument('--writers', type=int, default=4, help='Clientes concurrentes por proyecto activo.')
+    parser.add_argument('--workers', type=int, default=2, help='Workers de gunicorn.')
+    parser.add_argument('--threads', type=int, default=32, help='Hilos por worker.')
+    parser.add_argument('--duration', type=float, default=10, help='Segundos por medición.')
+    parser.add_argument('--synchronous', default='full', choices=['off', 'normal', 'full'])
+    args = parser.parse_args()
+    warnings.simplefilter('ignore')
+    if max(args.active) > args.projects:
+        parser.error('--active no puede superar --projects.')
+
+    tmp = tempfile.mkdtemp()
+    try:
+        results = []
+        for mode in ('único', 'particionado'):
+            config, tasks = prepare(tmp, mode, args)
+            for active in args.active:
+                module = f'bench_shards_{len(results)}'
+                results.append((mode, active, run(config, tasks, active, args, tmp, module)))
+    finally:
+        shutil.rmtree(tmp)
+
+    print(f'{args.writers} escritores por proyecto activo, gunicorn {args.workers} workers × {args.threads} hilos, '
+          f'synchronous={args.synchronous}, {args.duration:g} s por medición')
+    print(f"{'modo':<12} | {'activos':>7} | {'escrituras/s':>12} | {'p50 ms':>7} | {'p99 ms':>7} | {'errores':>7}")
+    print('-' * 68)
+    for mode, active, (latencies, failed, elapsed) in results:
+        if not latencies:
+            print(f'{mode:<12} | {active:>7} | sin respuestas correctas | errores {failed}')
+            continue
+        print(f'{mode:<12} | {active:>7} | {len(latencies) / elapsed:>12.0f} | '
+              f'{percentile(latencies, 50) * 1000:>7.1f} | {percentile(latencies, 99) * 1000:>7.1f} | {failed:>7}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+# benchmarks/bench_snapshot.py
+
+"""
+Benchmark de carga de tablero: implementación anterior (una consulta de etiquetas
+por tarea) contra el constructor de snapshots de fabricioboard/snapshot.py.
+
+Uso (desde la raíz del repositorio):
+
+    python benchmarks/bench_snapshot.py
+    python benchmarks/bench_snapshot.py --sizes 100 1000 10000 --repeat 7
+
+Para cada tamaño crea una base de datos temporal, mide la mediana de varias
+ejecuciones y cuenta las sentencias SQL lanzadas. El tiempo por tarea debe
+mantenerse aproximadamente constante (escalado lineal) y el número de
+consultas del snapshot debe ser fijo.
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fabricioboard.snapshot import build_board_snapshot, get_project  # noqa: E402
+
+SCHEMA = os.path.join(os.path.dirname(__file__), '..', 'fabricioboard', 'schema.sql')
+COLUMNS = ['Por Hacer', 'En Progreso', 'Hecho']
+
+
+def create_database(path, n_tasks, seed=42):
+    rnd = random.Random(seed)
+    db = sqlite3.connect(path)
+    with open(SCHEMA, encoding='utf8') as f:
+        db.executescript(f.read())
+
+    db.execute("INSERT INTO projects (code, name) VALUES ('BENCH', 'Benchmark')")
+    db.executemany(
+        'INSERT INTO users (username, full_name) VALUES (?, ?)',
+        [(f'user{i}', f'Usuario {i}') for i in range(20)],
+    )
+    db.executemany(
+        'INSERT INTO tags (name, color) VALUES (?, ?)',
+        [(f'tag{i}', '#d73a4a') for i in range(10)],
+    )
+    db.executemany(
+        """
+        INSERT INTO tasks (project_id, assigned_user_id, title, description, column, position)
+        VALUES (1, ?, ?, ?, ?, ?)
+        """,
+        [
+            (rnd.choice([None, *range(1, 21)]), f'Tarea {i}', 'Descripción ' * 5, rnd.choice(COLUMNS), i)
+            for i in range(n_tasks)
+        ],
+    )
+    db.executemany(
+        'INSERT OR IGNORE INTO task_tags (task_id, tag_id) VALUES (?, ?)',
+        [(task_id, rnd.randint(1, 10)) for task_id in range(1, n_tasks + 1) for _ in range(rnd.randint(0, 3))],
+    )
+    db.commit()
+    db.close()
+
+
+def legacy_snapshot(db, project_code):
+    """Copia de la implementación original de get_project_data (N+1 consultas)."""
+    project = db.execute('SELECT id, code, name FROM projects WHERE code = ?', (project_code,)).fetchone()
+    tasks_rows = db.execute("""
+        SELECT t.*, u.username
+        FROM tasks t
+        LEFT JOIN users u ON t.assigned_user_id = u.id
+        WHERE t.project_id = ?
+        ORDER BY t.position
+    """, (project['id'],)).fetchall()
+
+    tasks_list = []
+    for task_row in tasks_rows:
+        task_dict = dict(task_row)
+        tags_rows = db.execute("""
+            SELECT tg.id, tg.name, tg.color
+            FROM tags tg
+            JOIN task_tags tt ON tg.id = tt.tag_id
+            WHERE tt.task_id = ?
+        """, (task_dict['id'],)).fetchall()
+        task_dict['tags'] = [dict(tag) for tag in tags_rows]
+        if task_dict['username']:
+            task_dict['assigned_user'] = {'id': task_dict['assigned_user_id'], 'username': task_dict['username']}
+        else:
+            task_dict['assigned_user'] = None
+        del task_dict['assigned_user_id']
+        del task_dict['project_id']
+        del task_dict['username']
+        tasks_list.append(task_dict)
+    return {'project': dict(project), 'tasks': tasks_list}
+
+
+def snapshot(db, project_code):
+    return build_board_snapshot(db, get_project(db, project_code))
+
+
+def measure(db, func, repeat):
+    statements = []
+    db.set_trace_callback(statements.append)
+    result = func(db, 'BENCH')
+    db.set_trace_callback(None)
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(db, 'BENCH')
+        timings.append(time.perf_counter() - start)
+    return result, statistics.median(timings), len(statements)
+
+
+def normalize(data):
+    """
+    Ordena las etiquetas para comparar ambas salidas sin depender del orden de SQLite
+    y descarta `seq`, que la implementación anterior no devolvía.
+    """
+    data.pop('seq', None)
+    for task in data['tasks']:
+        task['tags'].sort(key=lambda tag: tag['id'])
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'tareas':>8} | {'impl.':<9} | {'consultas':>9} | {'mediana ms':>10} | {'µs/tarea':>8}")
+    print('-' * 57)
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            path = os.path.join(tmp, f'bench_{size}.db')
+            create_database(path, size)
+            db = sqlite3.connect(path)
+            db.row_factory = sqlite3.Row
+
+            results = {}
+            for name, func in (('anterior', legacy_snapshot), ('snapshot', snapshot)):
+                data, median, queries = measure(db, func, args.repeat)
+                results[name] = data
+                print(f'{size:>8} | {name:<9} | {queries:>9} | {median * 1000:>10.2f} | {median / size * 1e6:>8.2f}')
+
+            if normalize(results['anterior']) != normalize(results['snapshot']):
+                sys.exit(f'ERROR: las respuestas difieren para {size} tareas')
+            db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+# benchmarks/bench_stream.py
+
+"""
+Benchmark del envío por partes de GET /api/projects/<code> (iter_board_json).
+
+Uso (desde la raíz del repositorio):
+
+    python benchmarks/bench_stream.py
+    python benchmarks/bench_stream.py --tasks 50000 --repeat 5
+
+Compara tres modos sobre el mismo tablero, sin caché (como tras cada cambio):
+
+- completo:  el cuerpo entero se construye con jsonify (BOARD_STREAM_MIN_TASKS = None).
+- partes:    el JSON se genera mientras se recorren los cursores.
+- gzip:      por partes y comprimido al vuelo (Accept-Encoding: gzip).
+
+Cada modo se mide en un proceso nuevo, para que el pico de memoria (ru_maxrss)
+de uno no oculte el de otro. Se informa el aumento del pico durante la primera
+petición, y la mediana del tiempo hasta el primer fragmento (TTFB), del tiempo
+total y de los bytes enviados.
+"""
+
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fabricioboard import create_app  # noqa: E402
+from fabricioboard.bulk import bulk_load, generate  # noqa: E402
+from fabricioboard.db import get_db, init_db  # noqa: E402
+from fabricioboard.extensions import board_cache, limiter  # noqa: E402
+from fabricioboard.search import rebuild_index  # noqa: E402
+from fabricioboard.stats import rebuild_stats  # noqa: E402
+
+MODES = {
+    'completo': ({'BOARD_STREAM_MIN_TASKS': None}, {}),
+    'partes': ({}, {}),
+    'gzip': ({}, {'Accept-Encoding': 'gzip'}),
+}
+
+
+def peak_rss_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def request_board(client, headers):
+    """Hace una petición sin almacenar el cuerpo. Devuelve (ttfb, total, bytes)."""
+    start = time.perf_counter()
+    response = client.get('/api/projects/SEED-0001', headers=headers, buffered=False)
+    assert response.status_code == 200
+    ttfb, size = None, 0
+    for chunk in response.response:
+        if ttfb is None:
+            ttfb = time.perf_counter() - start
+        size += len(chunk)
+    total = time.perf_counter() - start
+    response.close()
+    return ttfb, total, size
+
+
+def worker(database, mode, repeat):
+    """Mide un modo en este proceso e imprime el resultado como JSON."""
+    config, headers = MODES[mode]
+    app = create_app({'DATABASE': database, 'TESTING': True, 'METRICS_ENABLED': False, **config})
+    limiter.enabled = False
+    client = app.test_client()
+
+    # Calentamiento sin cuerpo (304): rutas, conexión y consulta del proyecto
+    client.get('/api/projects/SEED-0001', headers={'If-None-Match': '*'})
+
+    before = peak_rss_kb()
+    samples = []
+    for _ in range(repeat):
+        board_cache.clear()
+        samples.append(request_board(client, headers))
+        if len(samples) == 1:
+            peak = peak_rss_kb() - before
+
+    print(json.dumps({
+        'peak_kb': peak,
+        'ttfb': statistics.median(s[0] for s in samples),
+        'total': statistics.median(s[1] for s in samples),
+        'bytes': samples[0][2],
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--tasks', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--worker', nargs=2, metavar=('DATABASE', 'MODE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    warnings.simplefilter('ignore')
+
+    if args.worker:
+        worker(*args.worker, args.repeat)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database = os.path.join(tmp, 'bench.db')
+        app = create_app({'DATABASE': database, 'TESTING': True, 'METRICS_ENABLED': False})
+        with app.app_context():
+            init_db()
+            db = get_db()
+            with bulk_load(db):
+                generate(db, 1, args.tasks, users=25, tags=12, seed=42, chunk=10000)
+                rebuild_index(db, optimize=False)
+                rebuild_stats(db)
+
+        results = {}
+        for mode in MODES:
+            output = subprocess.run(
+                [sys.executable, __file__, '--repeat', str(args.repeat), '--worker', database, mode],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            results[mode] = json.loads(output.splitlines()[-1])
+
+    print(f'Tablero de {args.tasks} tareas, {args.repeat} peticiones por modo')
+    print(f"{'modo':<9} | {'pico RSS MB':>11} | {'TTFB ms':>9} | {'total ms':>9} | {'KB enviados':>11}")
+    print('-' * 61)
+    for mode, r in results.items():
+        print(f"{mode:<9} | {r['peak_kb'] / 1024:>11.1f} | {r['ttfb'] * 1000:>9.2f} | "
+              f"{r['total'] * 1000:>9.1f} | {r['bytes'] / 1024:>11.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+# benchmarks/bench_user_tasks.py
+
+"""
+Benchmark de GET /api/users/<id>/tasks ("mi trabajo") en una base de datos grande.
+
+Uso (desde la raíz del repositorio):
+
+    python benchmarks/bench_user_tasks.py
+    python benchmarks/bench_user_tasks.py --projects 20 --tasks 5000 --requests 50
+
+Genera --projects × --tasks tareas (por defecto un millón) repartidas entre 25
+usuarios con la distribución de Zipf de `flask seed`, y mide la mediana y el p95
+de distintas páginas para el usuario con más tareas asignadas y para el que
+tiene menos (con un millón de tareas, unas 180.000 y unas 7.000): la primera
+página, una página intermedia (siguiendo los cursores), y las filtradas por
+columna y por etiqueta. Después repite la primera página sin
+idx_tasks_assigned_user, para comparar.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fabricioboard import create_app  # noqa: E402
+from fabricioboard.bulk import bulk_load, generate  # noqa: E402
+from fabricioboard.db import get_db, init_db  # noqa: E402
+from fabricioboard.extensions import limiter  # noqa: E402
+from fabricioboard.stats import rebuild_stats  # noqa: E402
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def timed(client, url, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(url)
+        timings.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.get_data(as_text=True)
+    return statistics.median(timings), percentile(timings, 0.95), response.json
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--projects', type=int, default=100)
+    parser.add_argument('--tasks', type=int, default=10_000, help='Tareas por proyecto.')
+    parser.add_argument('--requests', type=int, default=200, help='Peticiones por caso.')
+    parser.add_argument('--pages', type=int, default=20, help='Páginas que se recorren hasta la intermedia.')
+    args = parser.parse_args()
+    warnings.simplefilter('ignore')
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'DATABASE': os.path.join(tmp, 'bench.db'), 'TESTING': True})
+        limiter.enabled = False
+        with app.app_context():
+            init_db()
+            db = get_db()
+            start = time.perf_counter()
+            with bulk_load(db):
+                total = generate(db, args.projects, args.tasks, users=25, tags=12, seed=42, chunk=10000)
+                # La búsqueda no se usa aquí: no hace falta reconstruir su índice
+                rebuild_stats(db)
+            db.execute('ANALYZE')
+            print(f'{total} tareas generadas en {time.perf_counter() - start:.1f} s')
+
+            counts = db.execute(
+                """
+                SELECT assigned_user_id, COUNT(*) FROM tasks
+                WHERE assigned_user_id IS NOT NULL
+                GROUP BY assigned_user_id ORDER BY COUNT(*) DESC
+                """
+            ).fetchall()
+            # El usuario con más tareas y el que tiene menos
+            users = [counts[0], counts[-1]]
+            tag_id = db.execute('SELECT MIN(id) FROM tags').fetchone()[0]
+
+        client = app.test_client()
+        print()
+        print(f"{'usuario':>7} | {'asignadas':>9} | {'caso':<26} | {'mediana ms':>10} | {'p95 ms':>8}")
+        print('-' * 74)
+        for user_id, assigned in users:
+            base = f'/api/users/{user_id}/tasks'
+            cases = [
+                ('primera página', base),
+                ('columna "En Progreso"', f'{base}?column=En Progreso'),
+                (f'etiqueta {tag_id}', f'{base}?tag_id={tag_id}'),
+            ]
+            # Página intermedia: se llega siguiendo los cursores
+            cursor = None
+            for _ in range(args.pages):
+                page = client.get(base + (f'?cursor={cursor}' if cursor else '')).json
+                if page['next_cursor'] is None:
+                    break
+                cursor = page['next_cursor']
+            if cursor:
+                cases.insert(1, (f'página {args.pages + 1}', f'{base}?cursor={cursor}'))
+
+            for label, url in cases:
+                median, p95, _ = timed(client, url, args.requests)
+                print(f'{user_id:>7} | {assigned:>9} | {label:<26} | {median * 1000:>10.2f} | {p95 * 1000:>8.2f}')
+
+        with app.app_context():
+            get_db().execute('DROP INDEX idx_tasks_assigned_user')
+        for user_id, assigned in users:
+            median, p95, _ = timed(client, f'/api/users/{user_id}/tasks', max(1, args.requests // 20))
+            label = 'primera página sin índice'
+            print(f'{user_id:>7} | {assigned:>9} | {label:<26} | {median * 1000:>10.2f} | {p95 * 1000:>8.2f}')
+
+
+if __name__ == '__main__':
+    main()
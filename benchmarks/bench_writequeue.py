@@ -0,0 +1,190 @@
+# benchmarks/bench_writequeue.py
+
+"""
+Benchmark de la cola de escrituras con commit agrupado (fabricioboard/writequeue.py).
+
+Uso (desde la raíz del repositorio):
+
+    python benchmarks/bench_writequeue.py
+    python benchmarks/bench_writequeue.py --writers 100 --workers 4 --threads 32 --duration 15
+
+Levanta un gunicorn real (workers gthread) y --writers clientes concurrentes que
+arrastran tarjetas sin pausa (PUT /api/tasks/<id> con columna y posición), como un
+equipo reorganizando un tablero. Compara:
+
+- directo:       cada petición hace su propio commit (synchronous=NORMAL, el perfil del pool).
+- directo-full:  igual, pero con synchronous=FULL: cada commit es durable (un fsync cada uno).
+- cola:          WRITE_QUEUE_ENABLED, commits agrupados y durables (synchronous=FULL).
+
+Reporta peticiones/s, latencias p50/p95/p99 y los errores: "database is locked"
+(500 por agotar busy_timeout) y el resto de respuestas 5xx o conexiones fallidas.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import warnings
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from fabricioboard import create_app  # noqa: E402
+from fabricioboard.bulk import bulk_load, generate  # noqa: E402
+from fabricioboard.db import DEFAULT_PRAGMAS, get_db, init_db  # noqa: E402
+from fabricioboard.search import rebuild_index  # noqa: E402
+from fabricioboard.stats import rebuild_stats  # noqa: E402
+
+MODES = {
+    'directo': {},
+    'directo-full': {'SQLITE_PRAGMAS': {**DEFAULT_PRAGMAS, 'synchronous': 'full'}},
+    'cola': {'WRITE_QUEUE_ENABLED': True},
+}
+
+COLUMNS = ['Por Hacer', 'En Progreso', 'Hecho']
+
+WSGI_MODULE = """
+from fabricioboard import create_app
+from fabricioboard.extensions import limiter
+
+app = create_app({'DATABASE': %r, **%r})
+limiter.enabled = False
+"""
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(port, timeout=15):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/api/projects/SEED-0001/stats')
+            conn.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError('gunicorn no arrancó a tiempo')
+
+
+def percentile(sorted_values, p):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p / 100))]
+
+
+def run(database, mode, args, tmp):
+    """Devuelve (latencias correctas, errores de bloqueo, otros errores, segundos)."""
+    module = f'bench_writequeue_{mode.replace("-", "_")}'
+    with open(os.path.join(tmp, f'{module}.py'), 'w') as f:
+        f.write(WSGI_MODULE % (database, MODES[mode]))
+
+    port = free_port()
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([tmp, ROOT]), PYTHONWARNINGS='ignore')
+    # Desde el directorio temporal, para no cargar el gunicorn.conf.py del proyecto
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-w', str(args.workers), '-k', 'gthread',
+         '--threads', str(args.threads), '-b', f'127.0.0.1:{port}', '--log-level', 'warning',
+         f'{module}:app'],
+        cwd=tmp, env=env,
+    )
+    latencies, locked, failed = [], [0], [0]
+    lock = threading.Lock()
+
+    def writer(index, deadline):
+        rnd = random.Random(index)
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        local, local_locked, local_failed = [], 0, 0
+        while time.monotonic() < deadline:
+            task_id = rnd.randint(1, args.tasks)
+            body = json.dumps({'column': rnd.choice(COLUMNS), 'position': rnd.randint(0, 20)})
+            t0 = time.perf_counter()
+            try:
+                conn.request('PUT', f'/api/tasks/{task_id}', body, {'Content-Type': 'application/json'})
+                response = conn.getresponse()
+                data = response.read()
+            except (OSError, http.client.HTTPException):
+                local_failed += 1
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+                continue
+            if response.status == 200:
+                local.append(time.perf_counter() - t0)
+            elif b'locked' in data:
+                local_locked += 1
+            else:
+                local_failed += 1
+        with lock:
+            latencies.extend(local)
+            locked[0] += local_locked
+            failed[0] += local_failed
+
+    try:
+        wait_ready(port)
+        deadline = time.monotonic() + args.duration
+        threads = [threading.Thread(target=writer, args=(i, deadline)) for i in range(args.writers)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait()
+    return sorted(latencies), locked[0], failed[0], elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--writers', type=int, default=64, help='Clientes concurrentes.')
+    parser.add_argument('--workers', type=int, default=2, help='Workers de gunicorn.')
+    parser.add_argument('--threads', type=int, default=32, help='Hilos por worker.')
+    parser.add_argument('--duration', type=float, default=10, help='Segundos por modo.')
+    parser.add_argument('--tasks', type=int, default=2000)
+    parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES))
+    args = parser.parse_args()
+    warnings.simplefilter('ignore')
+
+    tmp = tempfile.mkdtemp()
+    try:
+        results = {}
+        for mode in args.modes:
+            # Una base de datos nueva por modo, para que todos partan del mismo estado
+            database = os.path.join(tmp, f'{mode}.db')
+            app = create_app({'DATABASE': database, 'TESTING': True})
+            with app.app_context():
+                init_db()
+                db = get_db()
+                with bulk_load(db):
+                    generate(db, 1, args.tasks, users=25, tags=12, seed=42, chunk=10000)
+                    rebuild_index(db, optimize=False)
+                    rebuild_stats(db)
+            results[mode] = run(database, mode, args, tmp)
+    finally:
+        shutil.rmtree(tmp)
+
+    print(f'{args.writers} escritores, gunicorn {args.workers} workers × {args.threads} hilos, {args.duration:g} s por modo')
+    print(f"{'modo':<13} | {'req/s':>7} | {'p50 ms':>7} | {'p95 ms':>7} | {'p99 ms':>7} | {'locked':>6} | {'otros':>5}")
+    print('-' * 70)
+    for mode, (latencies, locked, failed, elapsed) in results.items():
+        if not latencies:
+            print(f'{mode:<13} | sin respuestas correctas | locked {locked} | otros {failed}')
+            continue
+        print(f'{mode:<13} | {len(latencies) / elapsed:>7.0f} | {percentile(latencies, 50) * 1000:>7.1f} | '
+              f'{percentile(latencies, 95) * 1000:>7.1f} | {percentile(latencies, 99) * 1000:>7.1f} | '
+              f'{locked:>6} | {failed:>5}')
+
+
+if __name__ == '__main__':
+    main()
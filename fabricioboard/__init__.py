@@ -1,6 +1,7 @@
 # fabricioboard/__init__.py
 import os
 from flask import Flask, render_template
+from markupsafe import Markup
 
 # --- ¡NUEVA IMPORTACIÓN! ---
 from flask_limiter import Limiter
@@ -8,7 +9,7 @@ from flask_limiter.util import get_remote_address
 
 from flask_cors import CORS
 
-from .extensions import limiter
+from .extensions import board_cache, event_hub, limiter
 
 def create_app(test_config=None):
     # crea y configura la app
@@ -16,9 +17,34 @@ def create_app(test_config=None):
     app.config.from_mapping(
         SECRET_KEY='dev', # Cambiar por un valor aleatorio en producción
         DATABASE=os.path.join(app.instance_path, 'database.db'),
+        # Un archivo SQLite por proyecto, con DATABASE como catálogo (ver shards.py)
+        SHARDING_ENABLED=False,
+        SHARD_DIR=os.path.join(app.instance_path, 'shards'),
+        # Máximo de operaciones aceptadas por POST /api/batch
+        BATCH_MAX_OPERATIONS=200,
+        # Tareas por columna en GET /api/projects/<code>/tasks (por defecto y máximo)
+        BOARD_PAGE_SIZE=50,
+        BOARD_PAGE_MAX_SIZE=200,
+        # Tareas por página en GET /api/users/<id>/tasks (por defecto y máximo)
+        USER_TASKS_PAGE_SIZE=100,
+        USER_TASKS_PAGE_MAX_SIZE=500,
+        # Filas por página en los listados del dashboard de administración
+        ADMIN_PAGE_SIZE=50,
+        # Resultados por página en GET /api/projects/<code>/search (por defecto y máximo)
+        SEARCH_PAGE_SIZE=20,
+        SEARCH_PAGE_MAX_SIZE=100,
+        # A partir de cuántas tareas GET /api/projects/<code> se envía por partes (None: nunca)
+        BOARD_STREAM_MIN_TASKS=2000,
     )
 
-    app.config['RATELIMIT_STORAGE_URI'] = os.environ.get("REDIS_URL")
+    # Sin Redis, los contadores de los límites se comparten entre los workers de este
+    # servidor en un archivo SQLite (ver ratelimit.py), con ventana deslizante
+    app.config['RATELIMIT_STORAGE_URI'] = (
+        os.environ.get("RATELIMIT_STORAGE_URI")
+        or os.environ.get("REDIS_URL")
+        or 'sqlite://' + os.path.join(app.instance_path, 'ratelimit.db')
+    )
+    app.config['RATELIMIT_STRATEGY'] = 'sliding-window-counter'
 
 
     # Se inicializa el limitador, usando la dirección IP del visitante como clave.
@@ -47,6 +73,50 @@ def create_app(test_config=None):
     from . import db
     db.init_app(app)
 
+    # Migraciones del esquema (flask db-upgrade)
+    from . import migrate
+    migrate.init_app(app)
+
+    # Búsqueda de texto completo (flask search-rebuild)
+    from . import search
+    search.init_app(app)
+
+    # Estadísticas materializadas por columna (flask stats-verify)
+    from . import stats
+    stats.init_app(app)
+
+    # Eliminación de proyectos en segundo plano (flask gc-orphans)
+    from . import purge
+    purge.init_app(app)
+
+    # Un archivo SQLite por proyecto, opcional (flask shard-split, shard-check)
+    from . import shards
+    shards.init_app(app)
+
+    # Archivo de tareas terminadas (flask archive-tasks)
+    from . import archive
+    archive.init_app(app)
+
+    # Datos sintéticos y exportación/importación de proyectos (flask seed, export-project, import-project)
+    from . import bulk
+    bulk.init_app(app)
+
+    # Caché de tableros serializados (usa la configuración ya cargada)
+    board_cache.init_app(app)
+
+    # Registro de cambios por proyecto y eventos en vivo
+    from . import changes
+    changes.init_app(app)
+    event_hub.init_app(app)
+
+    # Cola de escrituras con commit agrupado (opcional, WRITE_QUEUE_ENABLED)
+    from . import writequeue
+    writequeue.init_app(app)
+
+    # Métricas por petición y por consulta, y endpoint /metrics (METRICS_ENABLED)
+    from . import metrics
+    metrics.init_app(app)
+
     # Registro del Blueprint de la API
     from . import api
     app.register_blueprint(api.bp)
@@ -60,18 +130,43 @@ def create_app(test_config=None):
     def board_view(project_code):
         """
         Renderiza el tablero Kanban para un proyecto específico.
+        El snapshot inicial (el mismo JSON que GET /api/projects/<code>, desde la misma
+        caché) y los usuarios y etiquetas (los de GET /api/reference) van dentro de la
+        página, así el cliente no tiene que volver a pedirlos al cargar. Los tableros
+        grandes no se incluyen: el cliente los pide a la API, que los envía por partes.
         """
         # Obtenemos los datos del proyecto para pasarlos a la plantilla
+        from .api import get_board_body
         from .db import get_db
-        db = get_db()
-        project = db.execute(
-            'SELECT * FROM projects WHERE code = ?', (project_code,)
-        ).fetchone()
+        from .reference import get_reference_body
+        from .shards import db_for_code
+        from .snapshot import get_project
+        # Con particionado, la conexión al archivo del proyecto (ver shards.py)
+        db = db_for_code(project_code)
+        project = get_project(db, project_code) if db is not None else None
 
         if project is None:
             from flask import abort
             abort(404)
 
-        return render_template('index.html', project=project)
-
-    return app
\ No newline at end of file
+        body = get_board_body(db, project)
+        # Los mismos usuarios y etiquetas que GET /api/reference, desde su caché
+        _, reference = get_reference_body(get_db())
+        return render_template(
+            'index.html', project=project, reference_json=_inline_json(reference),
+            board_json=_inline_json(body) if body is not None else None,
+        )
+
+    return app
+
+
+def _inline_json(body):
+    """
+    JSON ya serializado (bytes) listo para ir dentro de un <script>: igual que el filtro
+    `tojson`, escapa los caracteres que podrían cerrar la etiqueta (solo aparecen
+    dentro de cadenas JSON, donde \\uXXXX es equivalente).
+    """
+    text = body.decode()
+    for char, escaped in (('<', '\\u003c'), ('>', '\\u003e'), ('&', '\\u0026'), ("'", '\\u0027')):
+        text = text.replace(char, escaped)
+    return Markup(text)
\ No newline at end of file
@@ -3,13 +3,44 @@
 import os
 from functools import wraps
 from flask import (
-    Blueprint, flash, g, redirect, render_template, request, session, url_for
+    Blueprint, abort, current_app, flash, g, redirect, render_template, request, session, url_for
 )
-from .db import get_db
+from .changes import commit_changes, record_tag_deleted, record_user_deleted
+from .db import get_db, release_db
+from .extensions import board_cache, event_hub, reference_cache
+from .purge import mark_project_deleted, schedule_purge
+from .reference import bump_reference_version
+from .shards import create_shard, project_databases, sharding_enabled
+from .snapshot import decode_cursor, encode_cursor
 
 # Creamos el Blueprint para las rutas de administración
 bp = Blueprint('admin', __name__, url_prefix='/admin')
 
+# Listados del dashboard: consulta (con sus filtros en {where}), clave de orden y
+# columnas donde se busca. Se ordenan por la clave y el id usando un índice (el
+# UNIQUE de `username` y de `tags.name`, e idx_projects_name) y se paginan por cursor.
+ADMIN_LISTINGS = {
+    'projects': (
+        'SELECT id, name, code FROM projects WHERE deleted_at IS NULL{where} ORDER BY name, id LIMIT ?',
+        'name', ('name', 'code'),
+    ),
+    'users': (
+        'SELECT id, username, full_name FROM users WHERE 1 = 1{where} ORDER BY username, id LIMIT ?',
+        'username', ('username', 'full_name'),
+    ),
+    'tags': (
+        'SELECT id, name, color FROM tags WHERE 1 = 1{where} ORDER BY name, id LIMIT ?',
+        'name', ('name',),
+    ),
+}
+
+# Tareas y sin asignar de los proyectos de una página, desde las estadísticas
+# materializadas (ver stats.py), sin recorrer `tasks`
+PROJECT_TOTALS_QUERY = """
+    SELECT project_id, SUM(task_count), SUM(unassigned_count) FROM column_stats
+    WHERE project_id IN ({placeholders}) GROUP BY project_id
+"""
+
 def admin_required(view):
     """
     Este es nuestro decorador "guardián".
@@ -27,14 +58,89 @@ def admin_required(view):
 @admin_required
 def dashboard():
     """
-    Muestra el dashboard. Ahora también obtiene la lista de usuarios y etiquetas.
+    Muestra el dashboard con los proyectos, usuarios y etiquetas, paginados en el
+    servidor (ADMIN_PAGE_SIZE filas) para que siga siendo rápido con decenas de miles.
+
+    Parámetros opcionales (query string), para la pestaña `tab` (por defecto 'projects'):
+    - q:       texto a buscar (en el nombre y el código, o el username y el nombre completo).
+    - cursor:  `next_cursor` de la página anterior.
+    Las otras pestañas muestran su primera página sin filtrar.
     """
+    tab = request.args.get('tab', 'projects')
+    if tab not in ADMIN_LISTINGS:
+        abort(400, description=f"Pestaña desconocida: '{tab}'.")
+    q = request.args.get('q', '').strip()
+    cursor = request.args.get('cursor')
+
     db = get_db()
-    projects = db.execute('SELECT id, name, code FROM projects ORDER BY name ASC').fetchall()
-    users = db.execute('SELECT id, username, full_name FROM users ORDER BY username ASC').fetchall()
-    tags = db.execute('SELECT id, name, color FROM tags ORDER BY name ASC').fetchall()
-    
-    return render_template('admin/dashboard.html', projects=projects, users=users, tags=tags)
+    limit = current_app.config['ADMIN_PAGE_SIZE']
+    listings = {}
+    for name in ADMIN_LISTINGS:
+        try:
+            listings[name] = _listing(
+                db, name, limit, q if name == tab else '', cursor if name == tab else None
+            )
+        except ValueError as e:
+            abort(400, description=str(e))
+
+    projects, projects_cursor = listings['projects']
+    totals = _project_totals(db, [project['id'] for project in projects])
+    projects = [
+        dict(project, task_count=totals.get(project['id'], (0, 0))[0],
+             unassigned_count=totals.get(project['id'], (0, 0))[1])
+        for project in projects
+    ]
+    users, users_cursor = listings['users']
+    tags, tags_cursor = listings['tags']
+
+    return render_template(
+        'admin/dashboard.html', projects=projects, users=users, tags=tags, tab=tab, q=q,
+        next_cursors={'projects': projects_cursor, 'users': users_cursor, 'tags': tags_cursor},
+    )
+
+def _listing(db, name, limit, q='', cursor=None):
+    """
+    Devuelve (filas, next_cursor) con hasta `limit` filas del listado `name` (ver
+    ADMIN_LISTINGS). Lanza ValueError si el cursor no es válido.
+    """
+    sql, key, fields = ADMIN_LISTINGS[name]
+    where, params = '', []
+    if q:
+        # Coincidencia parcial sin distinguir mayúsculas; % y _ se buscan literalmente
+        pattern = '%' + q.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        where += ' AND (' + ' OR '.join(f"{field} LIKE ? ESCAPE '\\'" for field in fields) + ')'
+        params.extend([pattern] * len(fields))
+    if cursor is not None:
+        where += f' AND ({key}, id) > (?, ?)'
+        params.extend(decode_cursor(cursor, (str, int)))
+    # Pedimos una de más para saber si hay otra página
+    params.append(limit + 1)
+
+    rows = db.execute(sql.format(where=where), params).fetchall()
+    if len(rows) <= limit:
+        return rows, None
+    last = rows[limit - 1]
+    return rows[:limit], encode_cursor(last[key], last['id'])
+
+def _project_totals(db, project_ids):
+    """Devuelve {project_id: (tareas, sin asignar)} de los proyectos indicados."""
+    if not sharding_enabled():
+        return _column_totals(db, project_ids)
+    # Con particionado cada archivo tiene las de su proyecto (ver shards.py); cada
+    # conexión se devuelve al pool al terminar con ella
+    totals = {}
+    for project_id in project_ids:
+        try:
+            totals.update(_column_totals(get_db(project_id), [project_id]))
+        finally:
+            release_db(project_id)
+    return totals
+
+def _column_totals(db, project_ids):
+    if not project_ids:
+        return {}
+    sql = PROJECT_TOTALS_QUERY.format(placeholders=', '.join('?' * len(project_ids)))
+    return {row[0]: (row[1], row[2]) for row in db.execute(sql, project_ids)}
 
 @bp.route('/login', methods=('GET', 'POST'))
 def login():
@@ -76,10 +182,18 @@ def create_project():
         flash('El nombre y el código son obligatorios.')
     else:
         db = get_db()
-        db.execute(
-            'INSERT INTO projects (name, code) VALUES (?, ?)',
-            (name, code)
-        )
+        try:
+            cursor = db.execute(
+                'INSERT INTO projects (name, code) VALUES (?, ?)',
+                (name, code)
+            )
+        except db.IntegrityError:
+            db.rollback()
+            flash(f'Ya existe un proyecto con el código "{code}".')
+            return redirect(url_for('admin.dashboard'))
+        if sharding_enabled():
+            # Su archivo se crea antes de confirmar: sin él, el proyecto no existe
+            create_shard(cursor.lastrowid, code, name)
         db.commit()
         flash(f'Proyecto "{name}" creado con éxito.')
         
@@ -90,14 +204,15 @@ def create_project():
 def delete_project(project_id):
     """Procesa la eliminación de un proyecto."""
     db = get_db()
-    db.execute('DELETE FROM projects WHERE id = ?', (project_id,))
-    db.commit()
-    flash('Proyecto eliminado con éxito.')
-    
-    # Recuerda: gracias a "ON DELETE CASCADE" en nuestro schema,
-    # todas las tareas asociadas a este proyecto también se eliminarán automáticamente.
-    # ¡Una buena decisión de diseño al principio nos ahorra trabajo ahora!
-    
+    # Solo lo marcamos: borrar todas sus tareas en esta petición bloquearía las
+    # escrituras de toda la aplicación. Se borran por partes en segundo plano.
+    if mark_project_deleted(db, project_id):
+        db.commit()
+        board_cache.discard(project_id)
+        event_hub.close_project(project_id)
+        schedule_purge(project_id)
+        flash('Proyecto eliminado con éxito. Sus tareas se borrarán en segundo plano.')
+
     return redirect(url_for('admin.dashboard'))
 
 
@@ -113,19 +228,40 @@ def create_user():
     else:
         db = get_db()
         db.execute('INSERT INTO users (username, full_name) VALUES (?, ?)', (username, full_name))
+        bump_reference_version(db)
         db.commit()
+        reference_cache.clear()
         flash(f'Usuario "{username}" creado.')
         
-    return redirect(url_for('admin.dashboard'))
+    return redirect(url_for('admin.dashboard', tab='users'))
 
 @bp.route('/users/<int:user_id>/delete', methods=['POST'])
 @admin_required
 def delete_user(user_id):
     db = get_db()
-    db.execute('DELETE FROM users WHERE id = ?', (user_id,))
-    db.commit()
+    if not sharding_enabled():
+        # Los tableros donde el usuario tenía tareas cambian (quedan sin asignar por
+        # el ON DELETE SET NULL, en la misma transacción)
+        record_user_deleted(db, user_id)
+        db.execute('DELETE FROM users WHERE id = ?', (user_id,))
+        bump_reference_version(db)
+        commit_changes(db)
+    else:
+        # Primero el catálogo: los archivos de los proyectos (ver shards.py) hacen commit
+        # cada uno por su cuenta y el ON DELETE SET NULL no cruza archivos
+        db.execute('DELETE FROM users WHERE id = ?', (user_id,))
+        bump_reference_version(db)
+        db.commit()
+        # La limpieza es idempotente: si falla a mitad, repetir la eliminación (o
+        # `flask shard-check --repair`) termina los proyectos que faltaban
+        for project_db in project_databases():
+            record_user_deleted(project_db, user_id)
+            for table in ('tasks', 'archived_tasks'):
+                project_db.execute(f'UPDATE {table} SET assigned_user_id = NULL WHERE assigned_user_id = ?', (user_id,))
+            commit_changes(project_db)
+    reference_cache.clear()
     flash('Usuario eliminado.')
-    return redirect(url_for('admin.dashboard'))
+    return redirect(url_for('admin.dashboard', tab='users'))
 
 
 # --- ¡NUEVAS RUTAS DE GESTIÓN DE ETIQUETAS! ---
@@ -140,16 +276,33 @@ def create_tag():
     else:
         db = get_db()
         db.execute('INSERT INTO tags (name, color) VALUES (?, ?)', (name, color))
+        bump_reference_version(db)
         db.commit()
+        reference_cache.clear()
         flash(f'Etiqueta "{name}" creada.')
 
-    return redirect(url_for('admin.dashboard'))
+    return redirect(url_for('admin.dashboard', tab='tags'))
 
 @bp.route('/tags/<int:tag_id>/delete', methods=['POST'])
 @admin_required
 def delete_tag(tag_id):
     db = get_db()
-    db.execute('DELETE FROM tags WHERE id = ?', (tag_id,))
-    db.commit()
+    if not sharding_enabled():
+        # Los tableros donde se usaba la etiqueta dejan de mostrarla (ON DELETE CASCADE)
+        record_tag_deleted(db, tag_id)
+        db.execute('DELETE FROM tags WHERE id = ?', (tag_id,))
+        bump_reference_version(db)
+        commit_changes(db)
+    else:
+        # Primero el catálogo, como en delete_user: el ON DELETE CASCADE no cruza archivos
+        db.execute('DELETE FROM tags WHERE id = ?', (tag_id,))
+        bump_reference_version(db)
+        db.commit()
+        for project_db in project_databases():
+            record_tag_deleted(project_db, tag_id)
+            for table in ('task_tags', 'archived_task_tags'):
+                project_db.execute(f'DELETE FROM {table} WHERE tag_id = ?', (tag_id,))
+            commit_changes(project_db)
+    reference_cache.clear()
     flash('Etiqueta eliminada.')
-    return redirect(url_for('admin.dashboard'))
\ No newline at end of file
+    return redirect(url_for('admin.dashboard', tab='tags'))
\ No newline at end of file
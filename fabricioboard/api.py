@@ -1,9 +1,30 @@
 # fabricioboard/api.py
 
-from flask import Blueprint, jsonify, abort, request
+import functools
+import zlib
+
+from flask import Blueprint, current_app, jsonify, abort, request, stream_with_context
+from werkzeug.exceptions import HTTPException
 from fabricioboard.db import get_db
+from fabricioboard.archive import build_archive_page, unarchive_task
+from fabricioboard.snapshot import (
+    build_board_snapshot, build_column_page, build_user_tasks_page, count_tasks, get_project,
+    iter_board_json, list_columns
+)
 
-from .extensions import limiter
+from .cache import board_etag, reference_etag
+from .changes import (
+    get_changes, record_task_change, record_task_deleted, rollback_changes
+)
+from .extensions import board_cache, event_hub, limiter
+from .ordering import position_after_last, position_for_index, position_for_move
+from .reference import get_reference_body, get_reference_version
+from .search import search_tasks
+from .shards import (
+    db_for_code, db_for_project, db_for_task, project_databases, sharding_enabled, task_project_id
+)
+from .stats import get_project_stats
+from .writequeue import perform_write
 
 # Creamos el Blueprint.
 # 'api' es el nombre del blueprint.
@@ -13,69 +34,409 @@ bp = Blueprint('api', __name__, url_prefix='/api')
 # --- ¡NUEVO! Aplicamos un límite por defecto a TODAS las rutas de este blueprint ---
 bp.limit = limiter.shared_limit("100 per hour; 20 per minute", scope="api")
 
+# Máximo de cambios devueltos por cada llamada a /changes
+CHANGES_PAGE_SIZE = 500
+
+# Longitud máxima del texto de búsqueda
+SEARCH_MAX_LENGTH = 200
+
+# Tamaño aproximado de cada fragmento de un tablero enviado por partes (bytes sin comprimir)
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Sufijo del ETag de un tablero enviado comprimido: son otros bytes, así que otro ETag
+GZIP_ETAG_SUFFIX = '-gzip'
+
 @bp.route('/projects/<project_code>', methods=['GET'])
 def get_project_data(project_code):
     """
     Endpoint para obtener todos los datos de un tablero (proyecto).
     Esta será la llamada principal al cargar la aplicación.
     """
-    db = get_db()
-    
     # 1. Buscar el proyecto por su código para obtener su ID y nombre
-    project = db.execute('SELECT * FROM projects WHERE code = ?', (project_code,)).fetchone()
-    
-    # Si el proyecto no existe, devolvemos un error 404 (Not Found)
+    # (y, con particionado, la conexión a su archivo). Si no existe, error 404.
+    db, project = _load_project(project_code)
+
+    # 2. Si el cliente ya tiene esta versión del tablero, respondemos 304 sin cuerpo
+    etag = board_etag(project)
+    for candidate in (etag, etag + GZIP_ETAG_SUFFIX):
+        if request.if_none_match.contains(candidate):
+            return _board_response(b'', candidate, status=304)
+
+    # 3. Si este worker ya serializó esta versión, la reutilizamos tal cual
+    body = get_board_body(db, project)
+    if body is None:
+        # Tablero grande: se envía por partes mientras se leen las filas, sin
+        # construirlo entero en memoria (y por tanto sin guardarlo en la caché)
+        return _stream_board_response(db, project, etag)
+
+    # No es necesario llamar a db.close() aquí, la función teardown_appcontext en db.py se encarga automáticamente.
+    return _board_response(body, etag)
+
+@bp.route('/projects/<project_code>/tasks', methods=['GET'])
+def get_project_tasks(project_code):
+    """
+    Tareas de un tablero filtradas en el servidor y paginadas por columna.
+
+    Parámetros opcionales (query string):
+    - column:           solo esa columna (obligatorio si se envía `cursor`).
+    - assigned_user_id: solo las tareas asignadas a ese usuario.
+    - tag_id:           solo las tareas con esa etiqueta.
+    - limit:            tareas por columna (por defecto BOARD_PAGE_SIZE, máximo BOARD_PAGE_MAX_SIZE).
+    - cursor:           `next_cursor` de la página anterior de la columna.
+
+    Devuelve {'project', 'seq', 'columns': {<columna>: {'tasks', 'next_cursor'}}}.
+    Con `seq` el cliente puede seguir los cambios con /changes o /events.
+    """
+    column = request.args.get('column')
+    cursor = request.args.get('cursor')
+    if cursor is not None and column is None:
+        abort(400, description="El parámetro 'cursor' requiere indicar la columna ('column').")
+
+    filters = {}
+    for name in ('assigned_user_id', 'tag_id', 'limit'):
+        value = request.args.get(name)
+        if value is None:
+            continue
+        try:
+            filters[name] = int(value)
+        except ValueError:
+            abort(400, description=f"El parámetro '{name}' debe ser un entero.")
+
+    # El tamaño de página siempre está acotado en el servidor
+    limit = filters.pop('limit', current_app.config['BOARD_PAGE_SIZE'])
+    if limit < 1:
+        abort(400, description="El parámetro 'limit' debe ser mayor que cero.")
+    limit = min(limit, current_app.config['BOARD_PAGE_MAX_SIZE'])
+
+    db, project = _load_project(project_code)
+
+    columns = [column] if column is not None else list_columns(db, project['id'])
+    try:
+        pages = {
+            name: build_column_page(db, project['id'], name, limit, cursor, **filters)
+            for name in columns
+        }
+    except ValueError as e:
+        abort(400, description=str(e))
+
+    return jsonify({
+        'project': {'id': project['id'], 'code': project['code'], 'name': project['name']},
+        'seq': project['version'],
+        'columns': pages,
+    })
+
+@bp.route('/users/<int:user_id>/tasks', methods=['GET'])
+def get_user_tasks(user_id):
+    """
+    Tareas asignadas a un usuario en todos los proyectos ("mi trabajo"), agrupadas
+    por proyecto y columna, sin cargar ningún tablero completo.
+
+    Parámetros opcionales (query string):
+    - column:  solo esa columna.
+    - tag_id:  solo las tareas con esa etiqueta.
+    - limit:   tareas por página (por defecto USER_TASKS_PAGE_SIZE, máximo USER_TASKS_PAGE_MAX_SIZE).
+    - cursor:  `next_cursor` de la página anterior.
+
+    Devuelve {'user', 'projects': [{'id', 'code', 'name', 'columns': {<columna>: [...]}}],
+    'next_cursor'}. Un proyecto puede continuar en la página siguiente.
+    """
+    filters = {}
+    for name in ('tag_id', 'limit'):
+        value = request.args.get(name)
+        if value is None:
+            continue
+        try:
+            filters[name] = int(value)
+        except ValueError:
+            abort(400, description=f"El parámetro '{name}' debe ser un entero.")
+
+    limit = filters.pop('limit', current_app.config['USER_TASKS_PAGE_SIZE'])
+    if limit < 1:
+        abort(400, description="El parámetro 'limit' debe ser mayor que cero.")
+    limit = min(limit, current_app.config['USER_TASKS_PAGE_MAX_SIZE'])
+
+    db = get_db()
+    user = db.execute('SELECT id, username, full_name FROM users WHERE id = ?', (user_id,)).fetchone()
+    if user is None:
+        abort(404, description=f"Usuario con id {user_id} no encontrado.")
+
+    try:
+        # Con particionado se recorren los archivos de los proyectos en orden (ver shards.py)
+        page = build_user_tasks_page(
+            project_databases, user_id, limit, request.args.get('cursor'),
+            column=request.args.get('column'), **filters
+        )
+    except ValueError as e:
+        abort(400, description=str(e))
+
+    return jsonify({'user': dict(user), **page})
+
+@bp.route('/reference', methods=['GET'])
+@limiter.exempt
+def get_reference():
+    """
+    Todos los usuarios y etiquetas, para los selectores del modal de una tarea.
+    Devuelve {'version', 'users', 'tags'} (ver reference.py). Como cambian muy poco,
+    con If-None-Match responde 304 mientras no haya altas ni bajas. No cuenta para
+    los límites de peticiones: el tablero lo revalida cada vez que abre una tarea.
+    """
+    db = get_db()
+    version = get_reference_version(db)
+    etag = reference_etag(version)
+    if request.if_none_match.contains(etag):
+        return _board_response(b'', etag, status=304)
+
+    _, body = get_reference_body(db, version)
+    return _board_response(body, etag)
+
+@bp.route('/projects/<project_code>/search', methods=['GET'])
+def search_project_tasks(project_code):
+    """
+    Búsqueda de texto completo en el título y la descripción de las tareas.
+    Parámetros: q (texto), limit (por defecto SEARCH_PAGE_SIZE, máximo
+    SEARCH_PAGE_MAX_SIZE) y offset. Devuelve {'results': [...], 'next_offset': N | None},
+    con los resultados ordenados por relevancia y un fragmento resaltado con <mark>.
+    """
+    text = request.args.get('q', '').strip()
+    if not text:
+        abort(400, description="Falta el parámetro 'q' con el texto a buscar.")
+    if len(text) > SEARCH_MAX_LENGTH:
+        abort(400, description=f"El texto de búsqueda no puede superar {SEARCH_MAX_LENGTH} caracteres.")
+
+    limit = request.args.get('limit', current_app.config['SEARCH_PAGE_SIZE'], type=int)
+    offset = request.args.get('offset', 0, type=int)
+    if limit < 1 or offset < 0:
+        abort(400, description="Los parámetros 'limit' y 'offset' deben ser enteros positivos.")
+    limit = min(limit, current_app.config['SEARCH_PAGE_MAX_SIZE'])
+
+    db, project = _load_project(project_code)
+
+    # Pedimos uno de más para saber si hay otra página
+    results = search_tasks(db, project['id'], text, limit + 1, offset)
+    has_more = len(results) > limit
+
+    return jsonify({
+        'results': results[:limit],
+        'next_offset': offset + limit if has_more else None,
+    })
+
+@bp.route('/projects/<project_code>/stats', methods=['GET'])
+def get_project_stats_view(project_code):
+    """
+    Resumen del tablero sin cargar sus tareas: total de tareas y sin asignar, y por
+    cada columna, sus tareas, las sin asignar y cuántas llevan cada etiqueta.
+    Se lee de los contadores materializados (ver stats.py).
+    """
+    db, project = _load_project(project_code)
+
+    # Los contadores solo cambian cuando cambia la versión del tablero
+    etag = f"stats-{project['id']}-{project['version']}"
+    if request.if_none_match.contains(etag):
+        return _board_response(b'', etag, status=304)
+
+    stats = get_project_stats(db, project['id'])
+    stats['project'] = {'id': project['id'], 'code': project['code'], 'name': project['name']}
+    stats['seq'] = project['version']
+    return _board_response(jsonify(stats).get_data(), etag)
+
+@bp.route('/projects/<project_code>/archive', methods=['GET'])
+def get_project_archive(project_code):
+    """
+    Tareas archivadas de un proyecto (ver archive.py), de la archivada más
+    recientemente a la más antigua. El tablero no las incluye: el cliente las pide
+    solo cuando el usuario abre el archivo.
+
+    Parámetros opcionales: limit (por defecto ARCHIVE_PAGE_SIZE, máximo
+    ARCHIVE_PAGE_MAX_SIZE) y cursor (`next_cursor` de la página anterior).
+    Devuelve {'tasks': [...], 'next_cursor': str | None}.
+    """
+    limit = request.args.get('limit', current_app.config['ARCHIVE_PAGE_SIZE'], type=int)
+    if limit < 1:
+        abort(400, description="El parámetro 'limit' debe ser mayor que cero.")
+    limit = min(limit, current_app.config['ARCHIVE_PAGE_MAX_SIZE'])
+
+    db, project = _load_project(project_code)
+
+    try:
+        page = build_archive_page(db, project['id'], limit, request.args.get('cursor'))
+    except ValueError as e:
+        abort(400, description=str(e))
+    return jsonify(page)
+
+@bp.route('/projects/<project_code>/changes', methods=['GET'])
+@limiter.limit("120 per minute") # Reemplaza al límite general: cada tablero abierto sincroniza por aquí
+def get_project_changes(project_code):
+    """
+    Endpoint para obtener solo los cambios de un tablero posteriores a un `seq`.
+    El cliente usa el `seq` del snapshot (o de la última respuesta de este endpoint).
+    Si `since` es demasiado antiguo responde 410 y el cliente debe recargar el tablero.
+    """
+    since = request.args.get('since', type=int)
+    if since is None:
+        abort(400, description="Falta el parámetro 'since' (entero).")
+
+    db = db_for_code(project_code)
+    project = db.execute(
+        'SELECT id, version, changes_floor FROM projects WHERE code = ? AND deleted_at IS NULL', (project_code,)
+    ).fetchone() if db is not None else None
     if project is None:
         abort(404, description=f"Proyecto con código '{project_code}' no encontrado.")
-        
-    project_id = project['id']
-    
-    # 2. Obtener todas las tareas de ese proyecto, incluyendo el nombre del usuario asignado
-    tasks_rows = db.execute("""
-        SELECT t.*, u.username 
-        FROM tasks t
-        LEFT JOIN users u ON t.assigned_user_id = u.id
-        WHERE t.project_id = ?
-        ORDER BY t.position
-    """, (project_id,)).fetchall()
-    
-    # 3. Construir la lista de tareas en formato JSON, añadiendo las etiquetas a cada una
-    tasks_list = []
-    for task_row in tasks_rows:
-        task_dict = dict(task_row) # Convertir la fila a un diccionario completo
-        
-        # Por cada tarea, buscar sus etiquetas asociadas
-        tags_rows = db.execute("""
-            SELECT tg.id, tg.name, tg.color
-            FROM tags tg
-            JOIN task_tags tt ON tg.id = tt.tag_id
-            WHERE tt.task_id = ?
-        """, (task_dict['id'],)).fetchall()
-        
-        task_dict['tags'] = [dict(tag) for tag in tags_rows]
-        
-        # Formatear el usuario asignado para que sea un objeto o nulo
-        if task_dict['username']:
-            task_dict['assigned_user'] = {'id': task_dict['assigned_user_id'], 'username': task_dict['username']}
-        else:
-            task_dict['assigned_user'] = None
-            
-        # Eliminar las claves que no queremos en el JSON final de la tarea
-        del task_dict['assigned_user_id']
-        del task_dict['project_id']
-        # También podemos eliminar el username duplicado
-        if 'username' in task_dict:
-            del task_dict['username']
-        
-        tasks_list.append(task_dict)
-    
-    # 4. Devolver la respuesta final en el formato que diseñamos
-    # No es necesario llamar a db.close() aquí, la función teardown_appcontext en db.py se encarga automáticamente.
+
+    limit = CHANGES_PAGE_SIZE
+    changes = get_changes(db, project, since, limit)
+    if changes is None:
+        return jsonify({'reset': True, 'seq': project['version']}), 410
+
     return jsonify({
-        'project': dict(project),
-        'tasks': tasks_list
+        'changes': changes,
+        'seq': changes[-1]['seq'] if changes else since,
+        # Si hay más cambios pendientes, el cliente vuelve a pedir desde el nuevo seq
+        'more': len(changes) == limit,
     })
 
+@bp.route('/projects/<project_code>/events', methods=['GET'])
+@limiter.exempt
+def stream_project_events(project_code):
+    """
+    Canal Server-Sent Events con los cambios del tablero en vivo.
+    Cada evento 'change' tiene el mismo formato que /changes, más `prev` (la versión
+    anterior del tablero). Un evento 'reset' indica que el cliente debe sincronizar.
+    No cuenta para los límites de peticiones: EventSource no reintenta tras un 429 y
+    el tablero dejaría de actualizarse sin avisar (el máximo de conexiones lo pone
+    EVENTS_MAX_SUBSCRIBERS).
+    """
+    db = db_for_code(project_code)
+    project = db.execute(
+        'SELECT id, version FROM projects WHERE code = ? AND deleted_at IS NULL', (project_code,)
+    ).fetchone() if db is not None else None
+    if project is None:
+        abort(404, description=f"Proyecto con código '{project_code}' no encontrado.")
+
+    subscriber = event_hub.subscribe(project['id'], project['version'])
+    if subscriber is None:
+        abort(503, description="Demasiadas conexiones en vivo, inténtelo más tarde.")
+
+    # El generador no usa la base de datos: la conexión se cierra al terminar esta vista
+    response = current_app.response_class(
+        event_hub.stream(subscriber, project['version']), mimetype='text/event-stream'
+    )
+    response.headers['Cache-Control'] = 'no-cache'
+    # Evita que nginx acumule el stream en su buffer
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+def _load_project(project_code):
+    """
+    Conexión con las tareas del proyecto (la de su archivo con particionado, ver
+    shards.py) y su fila. Responde 404 si no existe.
+    """
+    db = db_for_code(project_code)
+    project = get_project(db, project_code) if db is not None else None
+    if project is None:
+        abort(404, description=f"Proyecto con código '{project_code}' no encontrado.")
+    return db, project
+
+def _task_db(task_id):
+    """Conexión con la tarea (ver shards.py). Responde 404 si su proyecto no existe."""
+    db = db_for_task(task_id)
+    if db is None:
+        abort(404, description=f"La tarea con id {task_id} no fue encontrada.")
+    return db
+
+def _get_task(db, task_id, columns='t.*'):
+    """
+    Fila de una tarea para modificarla. Responde 404 si no existe o si su proyecto
+    está marcado como eliminado: se está purgando en segundo plano (ver purge.py).
+    """
+    task = db.execute(
+        f'SELECT {columns} FROM tasks t JOIN projects p ON p.id = t.project_id '
+        'WHERE t.id = ? AND p.deleted_at IS NULL',
+        (task_id,)
+    ).fetchone()
+    if task is None:
+        abort(404, description=f"La tarea con id {task_id} no fue encontrada.")
+    return task
+
+def _check_project_writable(db, project_id):
+    """Responde 404 si el proyecto está marcado como eliminado (ver purge.py)."""
+    project = db.execute('SELECT deleted_at FROM projects WHERE id = ?', (project_id,)).fetchone()
+    if project is not None and project['deleted_at'] is not None:
+        abort(404, description=f"Proyecto con id {project_id} no encontrado.")
+
+def get_board_body(db, project):
+    """
+    Snapshot del tablero serializado (bytes), desde la caché del worker si ya tiene
+    esta versión. Devuelve None si el tablero es lo bastante grande como para
+    enviarse por partes (ver _should_stream): así no se construye entero en memoria.
+    """
+    body = board_cache.get(project['id'], project['version'])
+    if body is None and not _should_stream(db, project):
+        # Cargar tareas, usuarios asignados y etiquetas con un número fijo de consultas
+        # (ver snapshot.py) en lugar de una consulta de etiquetas por cada tarea.
+        body = jsonify(build_board_snapshot(db, project)).get_data()
+        board_cache.set(project['id'], project['version'], body)
+    return body
+
+def _board_response(body, etag, status=200):
+    response = current_app.response_class(body, status=status, mimetype='application/json')
+    response.set_etag(etag)
+    # Obligamos al navegador a revalidar siempre con If-None-Match
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def _should_stream(db, project):
+    """Indica si el tablero supera BOARD_STREAM_MIN_TASKS (None desactiva el envío por partes)."""
+    min_tasks = current_app.config.get('BOARD_STREAM_MIN_TASKS')
+    return min_tasks is not None and count_tasks(db, project['id']) >= min_tasks
+
+def _stream_board_response(db, project, etag):
+    """
+    Respuesta del tablero enviada por partes (iter_board_json), comprimida con gzip
+    al vuelo si el cliente lo acepta (con su propio ETag, GZIP_ETAG_SUFFIX).
+    stream_with_context mantiene la petición (y la conexión a la base de datos)
+    abierta hasta que se envía el último fragmento.
+    """
+    # Mismo formato compacto que jsonify
+    dumps = functools.partial(current_app.json.dumps, separators=(',', ':'))
+    chunks = _group_chunks(iter_board_json(db, project, dumps))
+    use_gzip = request.accept_encodings['gzip'] > 0
+    if use_gzip:
+        chunks = _gzip_chunks(chunks)
+        etag += GZIP_ETAG_SUFFIX
+
+    response = _board_response(stream_with_context(chunks), etag)
+    if use_gzip:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    return response
+
+def _group_chunks(parts):
+    """
+    Agrupa las partes del JSON en fragmentos de unos STREAM_CHUNK_SIZE bytes.
+    La primera parte (la cabecera del tablero) se envía sola y de inmediato.
+    """
+    parts = iter(parts)
+    for part in parts:
+        yield part.encode()
+        break
+    buffer, size = [], 0
+    for part in parts:
+        buffer.append(part)
+        size += len(part)
+        if size >= STREAM_CHUNK_SIZE:
+            yield ''.join(buffer).encode()
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer).encode()
+
+def _gzip_chunks(chunks):
+    """Comprime los fragmentos en un único flujo gzip, vaciando el compresor tras cada uno."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        # Z_SYNC_FLUSH: el cliente puede descomprimir cada fragmento en cuanto llega
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
 @bp.route('/tasks', methods=['POST'])
 @limiter.limit("5 per minute") # Decorador específico para esta ruta
 def create_task():
@@ -86,6 +447,21 @@ def create_task():
     # 1. Obtener los datos del request JSON
     data = request.get_json()
 
+    # Con particionado la tarea se escribe en el archivo de su proyecto (ver shards.py)
+    db = None
+    if isinstance(data, dict) and 'project_id' in data:
+        db = db_for_project(data['project_id'])
+        if db is None:
+            _check_project_writable(get_db(), data['project_id'])
+            abort(400, description="Error de integridad, verifique que los IDs de proyecto y usuario son válidos.")
+
+    new_task = perform_write(lambda db: _create_task(db, data), db)
+
+    # El código 201 significa "Created" y es la respuesta estándar para un POST exitoso.
+    return jsonify(new_task), 201
+
+def _create_task(db, data):
+    """Valida e inserta una tarea nueva (sin commit). Devuelve la fila creada como dict."""
     # 2. Validar que los datos necesarios están presentes
     if not data or not all(k in data for k in ('title', 'project_id', 'column')):
         abort(400, description="Faltan datos requeridos: se necesita 'title', 'project_id' y 'column'.")
@@ -98,35 +474,31 @@ def create_task():
     # El usuario asignado también es opcional
     assigned_user_id = data.get('assigned_user_id', None)
 
+    _check_project_writable(db, project_id)
+
     try:
-        db = get_db()
-        
         # 3. Calcular la nueva posición de la tarea (la ponemos al final de la columna)
-        cursor = db.execute(
-            'SELECT COUNT(id) as count FROM tasks WHERE project_id = ? AND column = ?',
-            (project_id, column)
-        )
-        position = cursor.fetchone()['count']
+        position = position_after_last(db, project_id, column)
 
         # 4. Insertar la nueva tarea en la base de datos
         cursor = db.execute(
             """
-            INSERT INTO tasks (project_id, assigned_user_id, title, description, column, position)
-            VALUES (?, ?, ?, ?, ?, ?)
+            INSERT INTO tasks (project_id, assigned_user_id, title, description, column, position,
+                               created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
             """,
             (project_id, assigned_user_id, title, description, column, position)
         )
         
         new_task_id = cursor.lastrowid
-        db.commit()
+        record_task_change(db, new_task_id)
 
         # 5. Obtener la tarea recién creada para devolverla en la respuesta
         new_task = db.execute(
             'SELECT * FROM tasks WHERE id = ?', (new_task_id,)
         ).fetchone()
 
-        # El código 201 significa "Created" y es la respuesta estándar para un POST exitoso.
-        return jsonify(dict(new_task)), 201
+        return dict(new_task)
 
     except db.IntegrityError:
         # Esto podría pasar si, por ejemplo, el project_id no existe.
@@ -139,15 +511,29 @@ def update_task(task_id):
     Acepta un JSON con los campos a modificar.
     """
     data = request.get_json()
+
+    updated_task = perform_write(lambda db: _update_task(db, task_id, data), _task_db(task_id))
+
+    # Devolvemos la tarea actualizada
+    return jsonify(updated_task)
+
+def _update_task(db, task_id, data):
+    """Valida y aplica la actualización de una tarea (sin commit). Devuelve la fila como dict."""
     if not data:
         abort(400, description="No se enviaron datos para actualizar.")
 
-    db = get_db()
-    
     # Verificamos primero que la tarea exista
-    task = db.execute('SELECT * FROM tasks WHERE id = ?', (task_id,)).fetchone()
-    if task is None:
-        abort(404, description=f"La tarea con id {task_id} no fue encontrada.")
+    task = _get_task(db, task_id)
+
+    # La posición que envía SortableJS es un índice dentro de la columna destino:
+    # la traducimos a una posición fraccionaria para no tener que mover a las demás.
+    if 'position' in data:
+        try:
+            data['position'] = position_for_index(
+                db, task, data.get('column', task['column']), int(data['position'])
+            )
+        except (TypeError, ValueError) as e:
+            abort(400, description=f"Posición inválida: {e}")
 
     # Construimos la consulta de actualización dinámicamente
     # para modificar solo los campos que se envían en el JSON.
@@ -165,20 +551,52 @@ def update_task(task_id):
     if not fields:
         abort(400, description="Ningún campo válido para actualizar fue proporcionado.")
 
+    # Fecha de la última modificación (ver archive.py)
+    fields.append("updated_at = CURRENT_TIMESTAMP")
     values.append(task_id) # Añadimos el id de la tarea al final para el WHERE
 
     query = f"UPDATE tasks SET {', '.join(fields)} WHERE id = ?"
     
     try:
         db.execute(query, tuple(values))
-        db.commit()
+        record_task_change(db, task_id)
     except db.Error as e:
         abort(500, description=f"Error en la base de datos: {e}")
 
-    # Devolvemos la tarea actualizada
-    updated_task = db.execute('SELECT * FROM tasks WHERE id = ?', (task_id,)).fetchone()
-    
-    return jsonify(dict(updated_task))
+    return dict(db.execute('SELECT * FROM tasks WHERE id = ?', (task_id,)).fetchone())
+
+
+@bp.route('/tasks/<int:task_id>/move', methods=['POST'])
+def move_task(task_id):
+    """
+    Mueve una tarea dentro de su columna o a otra columna, escribiendo solo su fila.
+    Espera un JSON con: {"column": <columna>, "before_id": <id>, "after_id": <id>}
+    donde before_id es la tarjeta que quedará encima y after_id la que quedará debajo.
+    Todos los campos son opcionales: sin vecinas la tarea va al final de la columna.
+    """
+    data = request.get_json(silent=True) or {}
+
+    moved = perform_write(lambda db: _move_task(db, task_id, data), _task_db(task_id))
+
+    return jsonify(moved)
+
+def _move_task(db, task_id, data):
+    """Calcula la nueva posición y mueve la tarea (sin commit)."""
+    task = _get_task(db, task_id, 't.id, t.project_id, t.column')
+
+    column = data.get('column', task['column'])
+    try:
+        position = position_for_move(db, task, column, data.get('before_id'), data.get('after_id'))
+    except ValueError as e:
+        abort(400, description=str(e))
+
+    db.execute(
+        'UPDATE tasks SET column = ?, position = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?',
+        (column, position, task_id)
+    )
+    record_task_change(db, task_id)
+
+    return {'id': task_id, 'column': column, 'position': position}
 
 
 @bp.route('/tasks/<int:task_id>', methods=['DELETE'])
@@ -186,16 +604,40 @@ def delete_task(task_id):
     """
     Endpoint para eliminar una tarea.
     """
-    db = get_db()
+    result = perform_write(lambda db: _delete_task(db, task_id), _task_db(task_id))
+    
+    return jsonify(result)
+
+def _delete_task(db, task_id):
     # Verificamos que la tarea exista antes de intentar borrarla
-    task = db.execute('SELECT id FROM tasks WHERE id = ?', (task_id,)).fetchone()
-    if task is None:
-        abort(404, description=f"La tarea con id {task_id} no fue encontrada.")
+    task = _get_task(db, task_id, 't.id, t.project_id')
 
     db.execute('DELETE FROM tasks WHERE id = ?', (task_id,))
-    db.commit()
-    
-    return jsonify({'success': True, 'message': f'Tarea {task_id} eliminada correctamente.'})
+    record_task_deleted(db, task['project_id'], task_id)
+
+    return {'success': True, 'message': f'Tarea {task_id} eliminada correctamente.'}
+
+
+@bp.route('/tasks/<int:task_id>/unarchive', methods=['POST'])
+def unarchive_task_view(task_id):
+    """
+    Restaura una tarea archivada: vuelve al final de su columna con sus etiquetas.
+    Devuelve la tarea en el mismo formato que el tablero.
+    """
+    task = perform_write(lambda db: _unarchive_task(db, task_id), _task_db(task_id))
+
+    return jsonify(task)
+
+def _unarchive_task(db, task_id):
+    project = db.execute(
+        'SELECT p.deleted_at FROM archived_tasks a JOIN projects p ON p.id = a.project_id WHERE a.id = ?', (task_id,)
+    ).fetchone()
+    if project is not None and project['deleted_at'] is not None:
+        abort(404, description=f"La tarea archivada con id {task_id} no fue encontrada.")
+    task = unarchive_task(db, task_id)
+    if task is None:
+        abort(404, description=f"La tarea archivada con id {task_id} no fue encontrada.")
+    return task
 
 
 @bp.route('/tasks/<int:task_id>/tags', methods=['POST'])
@@ -205,39 +647,156 @@ def assign_tag_to_task(task_id):
     Espera un JSON con: {"tag_id": <id>}
     """
     data = request.get_json()
+
+    result = perform_write(lambda db: _assign_tag(db, task_id, data), _task_db(task_id))
+
+    return jsonify(result), 201
+
+def _assign_tag(db, task_id, data):
     if not data or 'tag_id' not in data:
         abort(400, description="Falta 'tag_id' en el cuerpo del request.")
     
     tag_id = data['tag_id']
-    db = get_db()
+    _get_task(db, task_id, 't.id')
     
     try:
         db.execute(
             'INSERT INTO task_tags (task_id, tag_id) VALUES (?, ?)',
             (task_id, tag_id)
         )
-        db.commit()
+        record_task_change(db, task_id)
     except db.IntegrityError:
         # Esto puede pasar si la tarea o el tag no existen, o si la asignación ya existe.
         abort(400, description="Error de integridad: la tarea/etiqueta no existe o la asignación ya fue hecha.")
         
-    return jsonify({'success': True, 'message': f'Etiqueta {tag_id} asignada a la tarea {task_id}.'}), 201
+    return {'success': True, 'message': f'Etiqueta {tag_id} asignada a la tarea {task_id}.'}
 
 @bp.route('/tasks/<int:task_id>/tags/<int:tag_id>', methods=['DELETE'])
 def unassign_tag_from_task(task_id, tag_id):
     """
     Desasigna una etiqueta de una tarea.
     """
-    db = get_db()
+    result = perform_write(lambda db: _unassign_tag(db, task_id, tag_id), _task_db(task_id))
+
+    return jsonify(result)
+
+def _unassign_tag(db, task_id, tag_id):
+    _get_task(db, task_id, 't.id')
     # La sentencia DELETE no da error si la fila no existe, pero es buena práctica verificar.
     result = db.execute(
         'DELETE FROM task_tags WHERE task_id = ? AND tag_id = ?',
         (task_id, tag_id)
     )
-    db.commit()
 
     if result.rowcount == 0:
         # Si no se borró ninguna fila, es porque la asignación no existía.
         abort(404, description="La asignación especificada no fue encontrada.")
 
-    return jsonify({'success': True, 'message': f'Etiqueta {tag_id} desasignada de la tarea {task_id}.'})
\ No newline at end of file
+    record_task_change(db, task_id)
+    return {'success': True, 'message': f'Etiqueta {tag_id} desasignada de la tarea {task_id}.'}
+
+
+# --- Operaciones en lote ---
+
+# Cada operación del lote se traduce a la misma función que usa su endpoint individual,
+# de modo que las reglas de validación son exactamente las mismas.
+# Los parámetros de la URL van al nivel superior de la operación y el cuerpo JSON en "data".
+# Cada entrada: (código de estado, campos obligatorios, función).
+BATCH_OPERATIONS = {
+    'create_task': (201, (), lambda db, op: _create_task(db, op.get('data'))),
+    'update_task': (200, ('task_id',), lambda db, op: _update_task(db, op['task_id'], op.get('data'))),
+    'move_task': (200, ('task_id',), lambda db, op: _move_task(db, op['task_id'], op.get('data') or {})),
+    'delete_task': (200, ('task_id',), lambda db, op: _delete_task(db, op['task_id'])),
+    'assign_tag': (201, ('task_id',), lambda db, op: _assign_tag(db, op['task_id'], op.get('data'))),
+    'unassign_tag': (200, ('task_id', 'tag_id'), lambda db, op: _unassign_tag(db, op['task_id'], op['tag_id'])),
+    'unarchive_task': (200, ('task_id',), lambda db, op: _unarchive_task(db, op['task_id'])),
+}
+
+class BatchFailed(Exception):
+    """Una operación de un lote falló: su índice, su error y los resultados anteriores."""
+
+    def __init__(self, index, error, results):
+        super().__init__(error.description)
+        self.index = index
+        self.error = error
+        self.results = results
+
+def _apply_batch(db, operations):
+    """Aplica las operaciones de un lote (sin commit). Lanza BatchFailed en la primera que falle."""
+    results = []
+    for index, op in enumerate(operations):
+        try:
+            if not isinstance(op, dict) or op.get('op') not in BATCH_OPERATIONS:
+                abort(400, description=f"Operación desconocida: {op.get('op') if isinstance(op, dict) else op!r}.")
+            status, required, apply = BATCH_OPERATIONS[op['op']]
+            missing = [field for field in required if field not in op]
+            if missing:
+                abort(400, description=f"Faltan campos en la operación: {', '.join(missing)}.")
+            results.append({'status': status, 'result': apply(db, op)})
+        except HTTPException as e:
+            raise BatchFailed(index, e, results) from e
+    return results
+
+def _batch_db(operations):
+    """
+    Conexión donde se aplica el lote. Con particionado todas las operaciones deben
+    ser del mismo proyecto: una transacción no puede abarcar varios archivos.
+    """
+    if not sharding_enabled():
+        return get_db()
+    project_ids = set()
+    for op in operations:
+        if not isinstance(op, dict):
+            continue
+        data = op.get('data')
+        if op.get('op') == 'create_task' and isinstance(data, dict) and 'project_id' in data:
+            project_ids.add(data['project_id'])
+        elif isinstance(op.get('task_id'), int):
+            project_ids.add(task_project_id(op['task_id']))
+    if len(project_ids) > 1:
+        abort(400, description="Con el particionado, un lote solo puede modificar tareas de un proyecto.")
+    if not project_ids:
+        # Ninguna operación válida: fallarán al validarse, sin escribir nada
+        return get_db()
+    project_id = project_ids.pop()
+    db = db_for_project(project_id)
+    if db is None:
+        abort(400, description=f"El proyecto {project_id} no existe.")
+    return db
+
+@bp.route('/batch', methods=['POST'])
+def batch():
+    """
+    Aplica varias operaciones en una sola transacción: o se aplican todas o ninguna.
+    Espera un JSON con: {"operations": [{"op": "update_task", "task_id": 3, "data": {...}}, ...]}
+    Operaciones: create_task, update_task, move_task, delete_task, assign_tag, unassign_tag,
+    unarchive_task.
+    Devuelve el resultado de cada operación, con el mismo contenido que su endpoint individual.
+    """
+    data = request.get_json(silent=True)
+    operations = data.get('operations') if isinstance(data, dict) else None
+    if not isinstance(operations, list) or not operations:
+        abort(400, description="Falta la lista 'operations' en el cuerpo del request.")
+
+    max_operations = current_app.config['BATCH_MAX_OPERATIONS']
+    if len(operations) > max_operations:
+        abort(400, description=f"Un lote admite como máximo {max_operations} operaciones.")
+
+    db = _batch_db(operations)
+    try:
+        # Como las demás mutaciones, por la cola de escrituras si está activada: el lote
+        # entero es una operación (su SAVEPOINT lo deshace completo si algo falla)
+        results = perform_write(lambda db: _apply_batch(db, operations), db)
+    except BatchFailed as e:
+        # Deshacemos todo el lote (también las operaciones que ya habían funcionado)
+        # y las siguientes no se intentan
+        rollback_changes(db)
+        results = e.results + [{'status': e.error.code, 'error': e.error.description}]
+        results.extend({'status': None, 'error': 'No ejecutada.'} for _ in operations[e.index + 1:])
+        return jsonify({
+            'success': False,
+            'failed_operation': e.index,
+            'results': results,
+        }), 400 if e.error.code < 500 else e.error.code
+
+    return jsonify({'success': True, 'results': results})
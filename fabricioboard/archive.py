@@ -0,0 +1,220 @@
+# fabricioboard/archive.py
+
+"""
+Archivo de tareas terminadas.
+
+Las tarjetas de la columna "Hecho" se acumulan sin límite, y cada carga del tablero
+(y cada render del cliente) las paga todas. `flask archive-tasks` mueve las que
+llevan más de TASK_ARCHIVE_AFTER_DAYS días sin modificarse (`tasks.updated_at`) a
+`archived_tasks` / `archived_task_tags`, de modo que el tablero crece con el trabajo
+activo y no con la historia del proyecto.
+
+Las tareas archivadas salen de `tasks`, así que tampoco cuentan en las estadísticas
+ni aparecen en la búsqueda (los triggers hacen el trabajo al borrarlas). Conservan
+su id y se pueden consultar por páginas (GET /api/projects/<code>/archive, de la
+más reciente a la más antigua) y restaurar (POST /api/tasks/<id>/unarchive), que
+las devuelve al final de su columna.
+
+Cada lote archivado registra un cambio 'reset' en su proyecto: los clientes
+conectados recargan el tablero, ya sin esas tarjetas.
+"""
+
+import time
+
+import click
+from flask import current_app
+
+from .changes import commit_changes, record_change, record_task_change
+from .db import get_db
+from .ordering import position_after_last
+from .snapshot import build_task_snapshot, decode_cursor, encode_cursor
+
+# Tareas que se archivan en cada transacción
+ARCHIVE_BATCH_SIZE = 500
+
+# Se resuelve con idx_tasks_project_column_position
+ARCHIVE_CANDIDATES_QUERY = """
+    SELECT id FROM tasks
+    WHERE project_id = ? AND column = ? AND updated_at < ?
+    LIMIT ?
+"""
+
+# Tipos de las claves del cursor del archivo: (archived_at, id)
+ARCHIVE_CURSOR_TYPES = (str, int)
+
+ARCHIVE_PAGE_QUERY = """
+    SELECT a.id, a.title, a.description, a.column, a.position,
+           a.assigned_user_id, u.username, a.created_at, a.updated_at, a.archived_at
+    FROM archived_tasks a
+    LEFT JOIN users u ON a.assigned_user_id = u.id
+    WHERE a.project_id = ?{after}
+    ORDER BY a.archived_at DESC, a.id DESC
+    LIMIT ?
+"""
+
+ARCHIVE_TAGS_QUERY = """
+    SELECT att.task_id, tg.id, tg.name, tg.color
+    FROM archived_task_tags att
+    JOIN tags tg ON tg.id = att.tag_id
+    WHERE att.task_id IN ({placeholders})
+"""
+
+
+def archive_tasks(db, task_ids):
+    """Mueve esas tareas (y sus etiquetas) al archivo. NO hace commit ni registra cambios."""
+    placeholders = ', '.join('?' * len(task_ids))
+    db.execute(
+        f"""
+        INSERT INTO archived_tasks (id, project_id, assigned_user_id, title, description, column,
+                                    position, created_at, updated_at, archived_at)
+        SELECT id, project_id, assigned_user_id, title, description, column,
+               position, created_at, updated_at, CURRENT_TIMESTAMP
+        FROM tasks WHERE id IN ({placeholders})
+        """,
+        task_ids
+    )
+    db.execute(
+        f'INSERT INTO archived_task_tags (task_id, tag_id) '
+        f'SELECT task_id, tag_id FROM task_tags WHERE task_id IN ({placeholders})',
+        task_ids
+    )
+    # ON DELETE CASCADE borra sus task_tags; los triggers actualizan búsqueda y estadísticas
+    db.execute(f'DELETE FROM tasks WHERE id IN ({placeholders})', task_ids)
+
+
+def archive_project(db, project_id, column, before):
+    """
+    Archiva las tareas de la columna modificadas antes de `before` ('AAAA-MM-DD HH:MM:SS',
+    UTC), en transacciones de ARCHIVE_BATCH_SIZE tareas. Devuelve cuántas archivó.
+    """
+    total = 0
+    while True:
+        db.execute('BEGIN IMMEDIATE')
+        task_ids = [
+            row[0] for row in db.execute(ARCHIVE_CANDIDATES_QUERY, (project_id, column, before, ARCHIVE_BATCH_SIZE))
+        ]
+        if not task_ids:
+            db.rollback()
+            return total
+        archive_tasks(db, task_ids)
+        record_change(db, project_id, 'reset')
+        commit_changes(db)
+        total += len(task_ids)
+
+
+def unarchive_task(db, task_id):
+    """
+    Devuelve una tarea archivada al final de su columna, con sus etiquetas (las que
+    sigan existiendo). Devuelve la tarea en el formato del tablero, o None si no está
+    archivada. NO hace commit.
+    """
+    task = db.execute('SELECT * FROM archived_tasks WHERE id = ?', (task_id,)).fetchone()
+    if task is None:
+        return None
+    position = position_after_last(db, task['project_id'], task['column'])
+    db.execute(
+        """
+        INSERT INTO tasks (id, project_id, assigned_user_id, title, description, column,
+                           position, created_at, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        """,
+        (task['id'], task['project_id'], task['assigned_user_id'], task['title'],
+         task['description'], task['column'], position, task['created_at'])
+    )
+    db.execute(
+        'INSERT INTO task_tags (task_id, tag_id) SELECT task_id, tag_id FROM archived_task_tags WHERE task_id = ?',
+        (task_id,)
+    )
+    db.execute('DELETE FROM archived_tasks WHERE id = ?', (task_id,))
+    record_task_change(db, task_id)
+    return build_task_snapshot(db, task_id)
+
+
+def build_archive_page(db, project_id, limit, cursor=None):
+    """
+    Devuelve {'tasks': [...], 'next_cursor': str | None} con hasta `limit` tareas
+    archivadas, de la archivada más recientemente a la más antigua. Cada tarea tiene
+    el formato del tablero más `created_at`, `updated_at` y `archived_at`.
+    """
+    params = [project_id]
+    after = ''
+    if cursor is not None:
+        after = ' AND (a.archived_at, a.id) < (?, ?)'
+        params.extend(decode_cursor(cursor, ARCHIVE_CURSOR_TYPES))
+    # Pedimos una de más para saber si hay otra página
+    params.append(limit + 1)
+
+    rows = db.execute(ARCHIVE_PAGE_QUERY.format(after=after), params).fetchall()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    tasks_list = []
+    tags_by_task = {}
+    for row in rows:
+        tags = []
+        tags_by_task[row['id']] = tags
+        tasks_list.append({
+            'id': row['id'],
+            'title': row['title'],
+            'description': row['description'],
+            'column': row['column'],
+            'position': row['position'],
+            'tags': tags,
+            'assigned_user': {'id': row['assigned_user_id'], 'username': row['username']} if row['username'] else None,
+            'created_at': row['created_at'],
+            'updated_at': row['updated_at'],
+            'archived_at': row['archived_at'],
+        })
+
+    if tags_by_task:
+        sql = ARCHIVE_TAGS_QUERY.format(placeholders=', '.join('?' * len(tags_by_task)))
+        for task_id, tag_id, name, color in db.execute(sql, list(tags_by_task)):
+            tags_by_task[task_id].append({'id': tag_id, 'name': name, 'color': color})
+
+    next_cursor = None
+    if has_more:
+        last = tasks_list[-1]
+        next_cursor = encode_cursor(last['archived_at'], last['id'])
+    return {'tasks': tasks_list, 'next_cursor': next_cursor}
+
+
+@click.command('archive-tasks')
+@click.option('--days', type=int, default=None,
+              help='Archiva las tareas sin cambios desde hace más de N días (por defecto, TASK_ARCHIVE_AFTER_DAYS).')
+@click.option('--project', 'code', default=None, help='Solo el proyecto con este código.')
+def archive_tasks_command(days, code):
+    """Archiva las tareas terminadas antiguas."""
+    if days is None:
+        days = current_app.config['TASK_ARCHIVE_AFTER_DAYS']
+    column = current_app.config['TASK_ARCHIVE_COLUMN']
+    db = get_db()
+    before = db.execute("SELECT datetime('now', ?)", (f'-{days} days',)).fetchone()[0]
+
+    query = 'SELECT id, code FROM projects WHERE deleted_at IS NULL'
+    params = ()
+    if code is not None:
+        query += ' AND code = ?'
+        params = (code,)
+    projects = db.execute(query, params).fetchall()
+    if code is not None and not projects:
+        raise click.ClickException(f"Proyecto con código '{code}' no encontrado.")
+
+    start = time.perf_counter()
+    total = 0
+    for project in projects:
+        # Con particionado, sus tareas están en su propio archivo (ver shards.py)
+        archived = archive_project(get_db(project['id']), project['id'], column, before)
+        if archived:
+            click.echo(f"{project['code']}: {archived} tareas archivadas.")
+        total += archived
+    click.echo(f'{total} tareas archivadas en {time.perf_counter() - start:.1f} s.')
+
+
+def init_app(app):
+    # Días sin modificarse tras los que se archiva una tarea terminada, y su columna
+    app.config.setdefault('TASK_ARCHIVE_AFTER_DAYS', 30)
+    app.config.setdefault('TASK_ARCHIVE_COLUMN', 'Hecho')
+    # Tareas por página en GET /api/projects/<code>/archive (por defecto y máximo)
+    app.config.setdefault('ARCHIVE_PAGE_SIZE', 50)
+    app.config.setdefault('ARCHIVE_PAGE_MAX_SIZE', 200)
+    app.cli.add_command(archive_tasks_command)
@@ -0,0 +1,413 @@
+# fabricioboard/bulk.py
+
+"""
+Carga masiva de datos: generador sintético y exportación/importación NDJSON.
+
+- `flask seed` genera N proyectos × M tareas con distribuciones realistas de
+  columnas, usuarios asignados y etiquetas, a partir de una semilla fija (la misma
+  semilla produce siempre la misma base de datos). Sirve para reproducir tableros
+  del tamaño de producción y perfilar la aplicación.
+- `flask export-project` y `flask import-project` mueven un tablero entre entornos
+  en formato NDJSON (un objeto JSON por línea), leyendo y escribiendo fila a fila,
+  sin cargar el tablero completo en memoria.
+
+Las inserciones se hacen con executemany en lotes de `--chunk` filas dentro de una
+sola transacción. Mientras tanto los triggers del índice de búsqueda se desactivan,
+y las tareas nuevas se indexan de una vez al final (ver search.py).
+"""
+
+import json
+import random
+import time
+from contextlib import contextmanager
+from itertools import islice
+
+import click
+
+from .db import get_db
+from .shards import db_for_code, sharding_enabled
+from .ordering import STEP
+from .reference import bump_reference_version
+from .search import index_project, rebuild_index
+from .stats import rebuild_stats
+
+# Versión del formato NDJSON de exportación
+EXPORT_FORMAT = 1
+
+# Columnas del tablero y su peso en los datos generados (los tableros reales
+# acumulan tarjetas terminadas y tienen poco trabajo en curso)
+COLUMN_WEIGHTS = {'Por Hacer': 35, 'En Progreso': 15, 'Hecho': 50}
+
+# Fracción de tareas sin usuario asignado
+UNASSIGNED_RATIO = 0.3
+
+# Cuántas etiquetas lleva cada tarea (0 a 3) y con qué peso
+TAG_COUNT_WEIGHTS = [45, 35, 15, 5]
+
+# Antigüedad máxima (días) de la última modificación de las tareas generadas
+HISTORY_DAYS = 180
+
+TAG_COLORS = ['#d73a4a', '#0366d6', '#28a745', '#f9d0c4', '#6f42c1', '#fbca04', '#e99695', '#0e8a16']
+
+VERBS = [
+    'Revisar', 'Corregir', 'Implementar', 'Diseñar', 'Documentar', 'Migrar', 'Optimizar',
+    'Probar', 'Refactorizar', 'Configurar', 'Actualizar', 'Eliminar', 'Validar', 'Desplegar',
+]
+
+NOUNS = [
+    'el login', 'la API de tareas', 'el tablero', 'el formulario de registro', 'los reportes',
+    'la base de datos', 'el panel de administración', 'las notificaciones', 'la búsqueda',
+    'el modal de tareas', 'los permisos', 'la exportación', 'el despliegue', 'la caché',
+    'las etiquetas', 'el perfil de usuario', 'la paginación', 'los filtros', 'el backup',
+]
+
+DETAILS = [
+    'en móvil', 'para proyectos grandes', 'antes de la demo', 'según el feedback del cliente',
+    'con el nuevo diseño', 'en producción', 'para la versión 2.0', 'tras la migración', '',
+]
+
+DESCRIPTIONS = [
+    '', '', 'Ver el ticket relacionado.', 'Falla de forma intermitente.',
+    'Coordinar con el equipo de frontend.', 'Pendiente de revisión.',
+    'Reproducible con datos de producción.', 'Medir el impacto antes y después del cambio.',
+]
+
+# Sin fechas (None), la tarea se da por creada y modificada ahora
+TASK_INSERT = """
+    INSERT INTO tasks (id, project_id, assigned_user_id, title, description, column, position,
+                       created_at, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), COALESCE(?, CURRENT_TIMESTAMP))
+"""
+
+
+def chunked(iterable, size):
+    """Divide un iterable en listas de hasta `size` elementos, sin materializarlo."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _next_id(db, table):
+    # Como AUTOINCREMENT, nunca reutiliza un id (p. ej. el de una tarea archivada)
+    return db.execute(
+        f'SELECT MAX(COALESCE((SELECT MAX(id) FROM {table}), 0), '
+        f'COALESCE((SELECT seq FROM sqlite_sequence WHERE name = ?), 0)) + 1',
+        (table,)
+    ).fetchone()[0]
+
+
+@contextmanager
+def bulk_load(db):
+    """
+    Abre una transacción de escritura sin los triggers de `tasks` y `task_tags` y la
+    confirma al salir, volviendo a crear los triggers. Si algo falla, se deshace todo
+    (también la eliminación de los triggers). Quien carga debe indexar las tareas
+    nuevas y recalcular sus estadísticas (stats.rebuild_stats).
+    """
+    db.execute('BEGIN IMMEDIATE')
+    try:
+        triggers = db.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND tbl_name IN ('tasks', 'task_tags')"
+        ).fetchall()
+        for trigger in triggers:
+            db.execute(f'DROP TRIGGER {trigger["name"]}')
+        yield db
+        for trigger in triggers:
+            db.execute(trigger['sql'])
+        db.commit()
+    except BaseException:
+        db.rollback()
+        raise
+
+
+def generate(db, projects, tasks_per_project, users, tags, seed, chunk):
+    """
+    Inserta datos sintéticos (NO hace commit). Devuelve el número de tareas creadas.
+    Los usuarios y etiquetas se reparten con una distribución de Zipf: unos pocos
+    concentran la mayoría de las tareas, como en un equipo real.
+    """
+    rnd = random.Random(seed)
+
+    first_user = _next_id(db, 'users')
+    db.executemany(
+        'INSERT INTO users (id, username, full_name) VALUES (?, ?, ?)',
+        [(first_user + i, f'seed_user_{seed}_{first_user + i}', f'Usuario {first_user + i}') for i in range(users)]
+    )
+    first_tag = _next_id(db, 'tags')
+    db.executemany(
+        'INSERT INTO tags (id, name, color) VALUES (?, ?, ?)',
+        [(first_tag + i, f'seed-{seed}-{first_tag + i}', TAG_COLORS[i % len(TAG_COLORS)]) for i in range(tags)]
+    )
+    bump_reference_version(db)
+
+    # Los sorteos se hacen por lotes con random.choices: mucho más rápido que fila a fila
+    assignees = [None] + list(range(first_user, first_user + users))
+    zipf = [1 / (rank + 1) for rank in range(users)]
+    assignee_weights = [UNASSIGNED_RATIO] + [(1 - UNASSIGNED_RATIO) * w / sum(zipf) for w in zipf]
+    tag_ids = list(range(first_tag, first_tag + tags))
+    tag_weights = [1 / (rank + 1) for rank in range(tags)]
+    tag_counts = range(len(TAG_COUNT_WEIGHTS)) if tags else [0]
+    columns = list(COLUMN_WEIGHTS)
+    titles = [f'{verb} {noun} {detail}'.rstrip() for verb in VERBS for noun in NOUNS for detail in DETAILS]
+
+    # Las fechas se reparten hacia atrás desde ahora, con la misma semilla
+    now = int(time.time())
+
+    first_project = _next_id(db, 'projects')
+    task_id = _next_id(db, 'tasks')
+    total = 0
+    for p in range(projects):
+        project_id = first_project + p
+        db.execute(
+            'INSERT INTO projects (id, code, name) VALUES (?, ?, ?)',
+            (project_id, f'SEED-{project_id:04d}', f'Proyecto sintético {project_id}')
+        )
+
+        # Cada lote se genera e inserta por separado: la memoria no crece con M
+        positions = dict.fromkeys(columns, 0.0)
+        for batch in chunked(range(tasks_per_project), chunk):
+            n = len(batch)
+            task_rows = []
+            tag_rows = []
+            rows = zip(
+                rnd.choices(columns, list(COLUMN_WEIGHTS.values()), k=n),
+                rnd.choices(assignees, assignee_weights, k=n),
+                rnd.choices(titles, k=n),
+                rnd.choices(DESCRIPTIONS, k=n),
+                rnd.choices(tag_counts, TAG_COUNT_WEIGHTS[:len(tag_counts)], k=n),
+                [rnd.randrange(HISTORY_DAYS * 86400) for _ in range(n)],
+            )
+            for column, user_id, title, description, tag_count, age in rows:
+                positions[column] += STEP
+                updated_at = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(now - age))
+                task_rows.append((
+                    task_id, project_id, user_id, title, description, column, positions[column],
+                    updated_at, updated_at,
+                ))
+                if tag_count:
+                    for tag_id in set(rnd.choices(tag_ids, tag_weights, k=tag_count)):
+                        tag_rows.append((task_id, tag_id))
+                task_id += 1
+
+            db.executemany(TASK_INSERT, task_rows)
+            db.executemany('INSERT INTO task_tags (task_id, tag_id) VALUES (?, ?)', tag_rows)
+            total += n
+    return total
+
+
+@click.command('seed')
+@click.option('--projects', type=int, default=10, show_default=True, help='Proyectos a generar.')
+@click.option('--tasks', type=int, default=1000, show_default=True, help='Tareas por proyecto.')
+@click.option('--users', type=int, default=25, show_default=True, help='Usuarios a generar.')
+@click.option('--tags', type=int, default=12, show_default=True, help='Etiquetas a generar.')
+@click.option('--seed', type=int, default=42, show_default=True, help='Semilla aleatoria.')
+@click.option('--chunk', type=int, default=10000, show_default=True, help='Filas por executemany.')
+def seed_command(projects, tasks, users, tags, seed, chunk):
+    """Genera datos sintéticos para pruebas de carga."""
+    _require_single_database()
+    db = get_db()
+    start = time.perf_counter()
+    with bulk_load(db):
+        total = generate(db, projects, tasks, users, tags, seed, chunk)
+        # Un solo 'rebuild' del índice es más rápido que indexar fila a fila
+        rebuild_index(db, optimize=False)
+        rebuild_stats(db)
+
+    elapsed = time.perf_counter() - start
+    click.echo(f'{projects} proyectos y {total} tareas generados en {elapsed:.1f} s.')
+
+
+# --- Exportación e importación NDJSON ---
+
+EXPORT_TASKS_QUERY = """
+    SELECT t.title, t.description, t.column, t.position, t.created_at, t.updated_at, u.username,
+           (SELECT json_group_array(tg.name) FROM task_tags tt
+            JOIN tags tg ON tg.id = tt.tag_id
+            WHERE tt.task_id = t.id) AS tags
+    FROM tasks t
+    LEFT JOIN users u ON u.id = t.assigned_user_id
+    WHERE t.project_id = ?
+    ORDER BY t.column, t.position, t.id
+"""
+
+
+def export_project(db, project, out):
+    """
+    Escribe un proyecto en `out` como NDJSON: primero el proyecto, después los
+    usuarios y etiquetas que usan sus tareas y por último las tareas, una por línea.
+    Las tareas se leen del cursor fila a fila. Devuelve el número de tareas.
+    Las tareas archivadas (ver archive.py) no se exportan.
+    """
+    def write(record):
+        out.write(json.dumps(record, ensure_ascii=False))
+        out.write('\n')
+
+    write({'type': 'project', 'format': EXPORT_FORMAT, 'code': project['code'], 'name': project['name']})
+
+    users = db.execute(
+        """
+        SELECT DISTINCT u.username, u.full_name FROM tasks t
+        JOIN users u ON u.id = t.assigned_user_id
+        WHERE t.project_id = ?
+        """,
+        (project['id'],)
+    )
+    for user in users:
+        write({'type': 'user', 'username': user['username'], 'full_name': user['full_name']})
+
+    tags = db.execute(
+        """
+        SELECT DISTINCT tg.name, tg.color FROM tasks t
+        JOIN task_tags tt ON tt.task_id = t.id
+        JOIN tags tg ON tg.id = tt.tag_id
+        WHERE t.project_id = ?
+        """,
+        (project['id'],)
+    )
+    for tag in tags:
+        write({'type': 'tag', 'name': tag['name'], 'color': tag['color']})
+
+    total = 0
+    for task in db.execute(EXPORT_TASKS_QUERY, (project['id'],)):
+        write({
+            'type': 'task',
+            'title': task['title'],
+            'description': task['description'],
+            'column': task['column'],
+            'position': task['position'],
+            'created_at': task['created_at'],
+            'updated_at': task['updated_at'],
+            'assigned_user': task['username'],
+            'tags': json.loads(task['tags']),
+        })
+        total += 1
+    return total
+
+
+def import_project(db, lines, code=None, chunk=10000):
+    """
+    Importa un proyecto desde líneas NDJSON (NO hace commit). Los usuarios y las
+    etiquetas se buscan por nombre y se crean si no existen. `code` permite importar
+    con otro código de proyecto. Lanza ValueError si el archivo no es válido o si
+    ya existe un proyecto con ese código. Devuelve (proyecto, número de tareas).
+    """
+    records = (json.loads(line) for line in lines if line.strip())
+
+    header = next(records, None)
+    if header is None or header.get('type') != 'project':
+        raise ValueError('La primera línea debe describir el proyecto.')
+    if header.get('format') != EXPORT_FORMAT:
+        raise ValueError(f"Formato de exportación no soportado: {header.get('format')}.")
+
+    code = code or header['code']
+    if db.execute('SELECT 1 FROM projects WHERE code = ?', (code,)).fetchone():
+        raise ValueError(f"Ya existe un proyecto con el código '{code}'.")
+    project_id = db.execute(
+        'INSERT INTO projects (code, name) VALUES (?, ?)', (code, header['name'])
+    ).lastrowid
+
+    # Puede crear usuarios y etiquetas: los clientes deben volver a pedir GET /api/reference
+    bump_reference_version(db)
+    user_ids = {}
+    tag_ids = {}
+
+    def task_rows():
+        # Los usuarios y etiquetas van antes que las tareas; se resuelven según aparecen
+        next_task_id = _next_id(db, 'tasks')
+        for record in records:
+            kind = record.get('type')
+            if kind == 'user':
+                db.execute(
+                    'INSERT OR IGNORE INTO users (username, full_name) VALUES (?, ?)',
+                    (record['username'], record.get('full_name'))
+                )
+                user_ids[record['username']] = db.execute(
+                    'SELECT id FROM users WHERE username = ?', (record['username'],)
+                ).fetchone()['id']
+            elif kind == 'tag':
+                db.execute(
+                    'INSERT OR IGNORE INTO tags (name, color) VALUES (?, ?)',
+                    (record['name'], record.get('color', '#FFFFFF'))
+                )
+                tag_ids[record['name']] = db.execute(
+                    'SELECT id FROM tags WHERE name = ?', (record['name'],)
+                ).fetchone()['id']
+            elif kind == 'task':
+                try:
+                    user_id = user_ids[record['assigned_user']] if record.get('assigned_user') else None
+                    tags = [tag_ids[name] for name in record.get('tags', [])]
+                except KeyError as e:
+                    raise ValueError(f'Usuario o etiqueta no declarados antes de la tarea: {e}')
+                yield (
+                    next_task_id, project_id, user_id, record['title'], record.get('description'),
+                    record['column'], record['position'], record.get('created_at'), record.get('updated_at'),
+                ), tags
+                next_task_id += 1
+            else:
+                raise ValueError(f"Tipo de registro desconocido: '{kind}'.")
+
+    total = 0
+    for batch in chunked(task_rows(), chunk):
+        db.executemany(TASK_INSERT, [row for row, _ in batch])
+        db.executemany(
+            'INSERT INTO task_tags (task_id, tag_id) VALUES (?, ?)',
+            [(row[0], tag_id) for row, tags in batch for tag_id in tags]
+        )
+        total += len(batch)
+
+    project = db.execute('SELECT id, code, name FROM projects WHERE id = ?', (project_id,)).fetchone()
+    return project, total
+
+
+@click.command('export-project')
+@click.argument('code')
+@click.option('--output', '-o', type=click.Path(dir_okay=False, writable=True), default='-',
+              help='Archivo de salida (por defecto, la salida estándar).')
+def export_project_command(code, output):
+    """Exporta un proyecto como NDJSON."""
+    # Con particionado, el archivo del proyecto (ver shards.py)
+    db = db_for_code(code)
+    project = db.execute(
+        'SELECT id, code, name FROM projects WHERE code = ? AND deleted_at IS NULL', (code,)
+    ).fetchone() if db is not None else None
+    if project is None:
+        raise click.ClickException(f"Proyecto con código '{code}' no encontrado.")
+
+    with click.open_file(output, 'w', encoding='utf8') as out:
+        total = export_project(db, project, out)
+    # Los mensajes van a stderr para no mezclarse con el NDJSON de la salida estándar
+    click.echo(f"Proyecto '{code}' exportado ({total} tareas).", err=True)
+
+
+@click.command('import-project')
+@click.argument('source', type=click.Path(dir_okay=False, allow_dash=True))
+@click.option('--code', default=None, help='Código del proyecto importado (por defecto, el del archivo).')
+@click.option('--chunk', type=int, default=10000, show_default=True, help='Filas por executemany.')
+def import_project_command(source, code, chunk):
+    """Importa un proyecto desde un archivo NDJSON."""
+    _require_single_database()
+    db = get_db()
+    try:
+        with bulk_load(db), click.open_file(source, 'r', encoding='utf8') as lines:
+            project, total = import_project(db, lines, code, chunk)
+            index_project(db, project['id'])
+            rebuild_stats(db, project['id'])
+    except (ValueError, KeyError) as e:
+        raise click.ClickException(f'No se pudo importar el proyecto: {e}')
+    click.echo(f"Proyecto '{project['code']}' importado ({total} tareas).")
+
+
+def _require_single_database():
+    if sharding_enabled():
+        raise click.ClickException(
+            'Con SHARDING_ENABLED, genera o importa los datos sin particionar y después ejecuta `flask shard-split`.'
+        )
+
+
+def init_app(app):
+    app.cli.add_command(seed_command)
+    app.cli.add_command(export_project_command)
+    app.cli.add_command(import_project_command)
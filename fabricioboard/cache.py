@@ -0,0 +1,116 @@
+# fabricioboard/cache.py
+
+"""
+Caché de tableros serializados, indexada por la versión de cada proyecto.
+
+Cada proyecto tiene una columna `version` que las mutaciones actualizan dentro de
+su misma transacción (ver changes.py). Como la versión vive en la base de datos,
+todos los workers de gunicorn ven el mismo valor, y cada worker guarda en memoria
+el último JSON que generó para cada proyecto.
+Si la versión guardada coincide con la actual, el JSON se sirve sin reconstruirlo.
+
+Los usuarios y etiquetas (GET /api/reference) siguen la misma idea con una única
+versión global, guardada en la tabla `reference_version` (ver reference.py).
+"""
+
+import threading
+from collections import OrderedDict
+
+
+class BoardCache:
+    """
+    Caché LRU acotada por número de proyectos y por bytes totales.
+    Guarda, por cada project_id, una sola entrada (versión, cuerpo JSON).
+    """
+
+    def __init__(self, max_entries=128, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.config.setdefault('BOARD_CACHE_MAX_ENTRIES', self.max_entries)
+        app.config.setdefault('BOARD_CACHE_MAX_BYTES', self.max_bytes)
+        self.max_entries = app.config['BOARD_CACHE_MAX_ENTRIES']
+        self.max_bytes = app.config['BOARD_CACHE_MAX_BYTES']
+        self.clear()
+
+    def get(self, project_id, version):
+        """Devuelve el cuerpo guardado si corresponde a esa versión, o None."""
+        with self._lock:
+            entry = self._entries.get(project_id)
+            if entry is None or entry[0] != version:
+                return None
+            self._entries.move_to_end(project_id)
+            return entry[1]
+
+    def stats(self):
+        """Devuelve (número de tableros, bytes ocupados)."""
+        with self._lock:
+            return len(self._entries), self._size
+
+    def set(self, project_id, version, body):
+        if self.max_entries <= 0 or len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(project_id, None)
+            if old is not None:
+                self._size -= len(old[1])
+            self._entries[project_id] = (version, body)
+            self._size += len(body)
+
+            # Expulsamos los tableros usados hace más tiempo hasta volver a los límites
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def discard(self, project_id):
+        with self._lock:
+            entry = self._entries.pop(project_id, None)
+            if entry is not None:
+                self._size -= len(entry[1])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+class ReferenceCache:
+    """
+    Los usuarios y etiquetas ya serializados (GET /api/reference), con su versión.
+    Es una sola entrada: cuando la versión de la base de datos cambia, se reemplaza.
+    """
+
+    def __init__(self):
+        self._entry = None
+        self._lock = threading.Lock()
+
+    def get(self, version):
+        """Devuelve el cuerpo guardado si corresponde a esa versión, o None."""
+        with self._lock:
+            if self._entry is None or self._entry[0] != version:
+                return None
+            return self._entry[1]
+
+    def set(self, version, body):
+        with self._lock:
+            # Otro hilo pudo guardar ya una versión más nueva
+            if self._entry is None or self._entry[0] <= version:
+                self._entry = (version, body)
+
+    def clear(self):
+        with self._lock:
+            self._entry = None
+
+
+def board_etag(project):
+    """ETag de un tablero: cambia con cada nueva versión del proyecto."""
+    return f"board-{project['id']}-{project['version']}"
+
+
+def reference_etag(version):
+    """ETag de los usuarios y etiquetas: cambia con cada alta o baja."""
+    return f"reference-{version}"
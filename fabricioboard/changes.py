@@ -0,0 +1,195 @@
+# fabricioboard/changes.py
+
+"""
+Registro persistente de cambios por proyecto (change feed).
+
+Cada mutación de un tablero inserta una fila en `board_changes` dentro de su
+propia transacción, antes de confirmarla. El `seq` de esa fila (autoincremental y
+global) pasa a ser la nueva `version` del proyecto, de modo que:
+
+- la caché y el ETag del tablero (ver cache.py) se invalidan con cada cambio, y
+- el cliente puede pedir GET /api/projects/<code>/changes?since=<seq> usando el
+  `seq` que recibió en el snapshot, y aplicar solo los cambios posteriores.
+
+Tipos de cambio (`kind`):
+
+- 'task':         la tarea se creó o modificó; `data` es la tarea completa.
+- 'task_deleted': la tarea se eliminó; `data` es None.
+- 'user_deleted': se eliminó un usuario; `data` es {'user_id': id}.
+- 'tag_deleted':  se eliminó una etiqueta; `data` es {'tag_id': id}.
+- 'reset':        cambiaron muchas tarjetas a la vez (p. ej. al rebalancear una
+                  columna, ver ordering.py); el cliente debe recargar el tablero.
+
+Además, cada cambio queda pendiente en `g` hasta que la mutación llama a
+commit_changes(db), que confirma la transacción y solo entonces lo publica a las
+conexiones en vivo (ver events.py).
+
+Los cambios antiguos se compactan: de cada proyecto se guardan solo los últimos
+CHANGE_LOG_RETENTION. `projects.changes_floor` recuerda el último `seq` borrado;
+si un cliente pide cambios anteriores a ese punto debe volver a cargar el snapshot.
+"""
+
+import json
+
+import click
+from flask import current_app, g
+
+from .extensions import event_hub
+from .snapshot import build_task_snapshot
+
+# Cada cuántos cambios (según el seq global) se compacta el proyecto que escribe
+COMPACT_EVERY = 100
+
+# Proyectos que usan una etiqueta (resuelto por idx_task_tags_tag)
+TAG_PROJECTS_QUERY = """
+    SELECT DISTINCT t.project_id FROM tasks t
+    JOIN task_tags tt ON tt.task_id = t.id
+    WHERE tt.tag_id = ?
+"""
+
+
+def record_change(db, project_id, kind, task_id=None, data=None):
+    """
+    Inserta un cambio y actualiza la versión del proyecto. NO hace commit:
+    debe llamarse antes del commit_changes(db) de la mutación. Devuelve el nuevo seq.
+    """
+    cursor = db.execute(
+        'INSERT INTO board_changes (project_id, kind, task_id, data) VALUES (?, ?, ?, ?)',
+        (project_id, kind, task_id, None if data is None else json.dumps(data))
+    )
+    seq = cursor.lastrowid
+    # La transacción ya está abierta (tras el INSERT), así que `prev` es consistente
+    project = db.execute('SELECT version FROM projects WHERE id = ?', (project_id,)).fetchone()
+    db.execute('UPDATE projects SET version = ? WHERE id = ?', (seq, project_id))
+
+    g.setdefault('pending_changes', []).append((project_id, {
+        'seq': seq,
+        # Versión anterior: si coincide con la del cliente puede aplicar el cambio directamente
+        'prev': project['version'] if project is not None else None,
+        'kind': kind,
+        'task_id': task_id,
+        'data': data,
+    }))
+
+    if seq % COMPACT_EVERY == 0:
+        compact_changes(db, project_id, current_app.config['CHANGE_LOG_RETENTION'])
+    return seq
+
+
+def commit_changes(db):
+    """Confirma la transacción y publica los cambios registrados en ella."""
+    db.commit()
+    for project_id, change in g.pop('pending_changes', ()):
+        event_hub.publish(project_id, change)
+
+
+def rollback_changes(db):
+    """Deshace la transacción y descarta los cambios pendientes de publicar."""
+    db.rollback()
+    g.pop('pending_changes', None)
+
+
+def record_task_change(db, task_id):
+    """Registra el estado actual de una tarea (creada o modificada)."""
+    task = db.execute('SELECT project_id FROM tasks WHERE id = ?', (task_id,)).fetchone()
+    if task is None:
+        return None
+    return record_change(db, task['project_id'], 'task', task_id, build_task_snapshot(db, task_id))
+
+
+def record_task_deleted(db, project_id, task_id):
+    return record_change(db, project_id, 'task_deleted', task_id)
+
+
+def record_user_deleted(db, user_id):
+    """Registra la eliminación de un usuario en cada proyecto donde tenía tareas."""
+    projects = db.execute(
+        'SELECT DISTINCT project_id FROM tasks WHERE assigned_user_id = ?', (user_id,)
+    ).fetchall()
+    for project in projects:
+        record_change(db, project['project_id'], 'user_deleted', data={'user_id': user_id})
+
+
+def record_tag_deleted(db, tag_id):
+    """Registra la eliminación de una etiqueta en cada proyecto donde se usaba."""
+    projects = db.execute(TAG_PROJECTS_QUERY, (tag_id,)).fetchall()
+    for project in projects:
+        record_change(db, project['project_id'], 'tag_deleted', data={'tag_id': tag_id})
+
+
+def compact_changes(db, project_id, keep):
+    """
+    Borra los cambios de un proyecto excepto los `keep` más recientes y mueve
+    `changes_floor` hasta el último seq borrado. NO hace commit.
+    """
+    row = db.execute(
+        """
+        SELECT seq FROM board_changes WHERE project_id = ?
+        ORDER BY seq DESC LIMIT 1 OFFSET ?
+        """,
+        (project_id, keep)
+    ).fetchone()
+    if row is None:
+        return 0
+
+    floor = row['seq']
+    result = db.execute(
+        'DELETE FROM board_changes WHERE project_id = ? AND seq <= ?', (project_id, floor)
+    )
+    db.execute(
+        'UPDATE projects SET changes_floor = MAX(changes_floor, ?) WHERE id = ?', (floor, project_id)
+    )
+    return result.rowcount
+
+
+def get_changes(db, project, since, limit):
+    """
+    Devuelve los cambios de un proyecto con seq > since, o None si `since` ya fue
+    compactado (o no corresponde a este proyecto) y el cliente debe recargar el tablero.
+    """
+    if since < project['changes_floor'] or since > project['version']:
+        return None
+    if since == project['version']:
+        # Atajo habitual: no hay nada nuevo, ni siquiera hace falta consultar la tabla
+        return []
+
+    rows = db.execute(
+        """
+        SELECT seq, kind, task_id, data FROM board_changes
+        WHERE project_id = ? AND seq > ?
+        ORDER BY seq
+        LIMIT ?
+        """,
+        (project['id'], since, limit)
+    ).fetchall()
+    return [
+        {
+            'seq': row['seq'],
+            'kind': row['kind'],
+            'task_id': row['task_id'],
+            'data': None if row['data'] is None else json.loads(row['data']),
+        }
+        for row in rows
+    ]
+
+
+@click.command('compact-changes')
+@click.option('--keep', type=int, default=None, help='Cambios a conservar por proyecto.')
+def compact_changes_command(keep):
+    """Compacta el registro de cambios de todos los proyectos."""
+    if keep is None:
+        keep = current_app.config['CHANGE_LOG_RETENTION']
+    from .shards import project_databases
+
+    total = 0
+    # Con particionado, cada proyecto lleva su registro en su archivo (ver shards.py)
+    for db in project_databases():
+        for project in db.execute('SELECT id FROM projects').fetchall():
+            total += compact_changes(db, project['id'], keep)
+        db.commit()
+    click.echo(f'{total} cambios antiguos eliminados.')
+
+
+def init_app(app):
+    app.config.setdefault('CHANGE_LOG_RETENTION', 1000)
+    app.cli.add_command(compact_changes_command)
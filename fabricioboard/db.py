@@ -1,26 +1,218 @@
 # fabricioboard/db.py
+import os
 import sqlite3
+import threading
+from urllib.parse import quote
+
 import click
 from flask import current_app, g
 
-def get_db():
-    if 'db' not in g:
-        g.db = sqlite3.connect(
-            current_app.config['DATABASE'],
-            detect_types=sqlite3.PARSE_DECLTYPES
+# Perfil de PRAGMAs aplicado a cada conexión nueva (configurable con SQLITE_PRAGMAS).
+# - WAL permite que las lecturas no bloqueen a la escritura (y viceversa).
+# - synchronous=NORMAL es seguro con WAL y evita un fsync por cada commit.
+# - cache_size negativo se expresa en KiB; mmap_size en bytes.
+# - busy_timeout espera al bloqueo de escritura en vez de fallar con "database is locked".
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'cache_size': -16000,
+    'mmap_size': 256 * 1024 * 1024,
+    'busy_timeout': 5000,
+    'foreign_keys': 'on',
+}
+
+
+# Llaves foráneas hacia el catálogo en las conexiones a un archivo de proyecto (ver
+# shards.py): SQLite no las admite entre archivos, pero los triggers TEMP sí pueden
+# consultar otra base de datos. Fallan con IntegrityError, como la llave foránea.
+SHARD_FOREIGN_KEYS = """
+    CREATE TEMP TRIGGER shard_tasks_user_insert BEFORE INSERT ON main.tasks
+    WHEN new.assigned_user_id IS NOT NULL
+     AND NOT EXISTS (SELECT 1 FROM catalog.users WHERE id = new.assigned_user_id)
+    BEGIN SELECT RAISE(ABORT, 'FOREIGN KEY constraint failed'); END;
+
+    CREATE TEMP TRIGGER shard_tasks_user_update BEFORE UPDATE OF assigned_user_id ON main.tasks
+    WHEN new.assigned_user_id IS NOT NULL
+     AND NOT EXISTS (SELECT 1 FROM catalog.users WHERE id = new.assigned_user_id)
+    BEGIN SELECT RAISE(ABORT, 'FOREIGN KEY constraint failed'); END;
+
+    CREATE TEMP TRIGGER shard_task_tags_tag_insert BEFORE INSERT ON main.task_tags
+    WHEN NOT EXISTS (SELECT 1 FROM catalog.tags WHERE id = new.tag_id)
+    BEGIN SELECT RAISE(ABORT, 'FOREIGN KEY constraint failed'); END;
+"""
+
+
+class ConnectionPool:
+    """
+    Pool de conexiones SQLite reutilizables, uno por proceso (worker de gunicorn).
+
+    Cada petición toma una conexión ya configurada (PRAGMAs aplicados, caché de
+    páginas y de sentencias calientes) y la devuelve al terminar, en lugar de abrir
+    y cerrar el archivo en cada petición. Las conexiones no están atadas a un hilo:
+    solo las usa una petición a la vez, lo que permite workers con hilos o gevent.
+    """
+
+    def __init__(self, database, pragmas, max_idle, cached_statements, attach=None, uri=False, script=None):
+        self.database = database
+        self.pragmas = pragmas
+        self.max_idle = max_idle
+        self.cached_statements = cached_statements
+        # Bases de datos adjuntas a cada conexión ({alias: ruta}, ver shards.py)
+        self.attach = attach or {}
+        self.uri = uri
+        # SQL que se ejecuta en cada conexión nueva (p. ej. triggers TEMP)
+        self.script = script
+        # Clase de las conexiones nuevas (metrics.py la cambia para trazar las consultas)
+        self.factory = sqlite3.Connection
+        self._idle = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def connect(self):
+        conn = sqlite3.connect(
+            self.database,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            cached_statements=self.cached_statements,
+            check_same_thread=False,
+            factory=self.factory,
+            uri=self.uri,
         )
-        g.db.row_factory = sqlite3.Row
+        conn.row_factory = sqlite3.Row
+        for alias, path in self.attach.items():
+            conn.execute('ATTACH DATABASE ? AS ?', (path, alias))
+        if self.script:
+            conn.executescript(self.script)
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def acquire(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                # Proceso hijo tras un fork (gunicorn --preload): no compartimos conexiones
+                self._idle = []
+                self._pid = os.getpid()
+            if self._idle:
+                return self._idle.pop()
+        return self.connect()
+
+    def release(self, conn):
+        if conn.in_transaction:
+            # La petición terminó sin commit (p. ej. por un abort): deshacemos
+            conn.rollback()
+        with self._lock:
+            if self._pid == os.getpid() and len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def idle_count(self):
+        return len(self._idle)
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+def get_pool(app=None):
+    app = app or current_app
+    return app.extensions['sqlite_pool']
+
+
+_shard_pools_lock = threading.Lock()
+
+
+def shard_path(project_id, app=None):
+    """Archivo con las tareas de un proyecto en modo particionado."""
+    app = app or current_app
+    return os.path.join(app.config['SHARD_DIR'], f'project_{project_id}.db')
+
+
+def get_shard_pool(project_id, app=None):
+    """Pool de conexiones del archivo de un proyecto (modo particionado, ver shards.py)."""
+    app = app or current_app
+    pools = app.extensions['sqlite_shard_pools']
+    with _shard_pools_lock:
+        pool = pools.get(project_id)
+        if pool is None:
+            pool = ConnectionPool(
+                # mode=rw: nunca se crea un archivo vacío para un proyecto que no lo tiene
+                f'file:{quote(shard_path(project_id, app))}?mode=rw',
+                app.config['SQLITE_PRAGMAS'],
+                app.config['SQLITE_SHARD_POOL_SIZE'],
+                app.config['SQLITE_CACHED_STATEMENTS'],
+                attach={'catalog': app.config['DATABASE']},
+                uri=True,
+                script=SHARD_FOREIGN_KEYS,
+            )
+            pool.factory = get_pool(app).factory
+            pools[project_id] = pool
+    return pool
+
+
+def discard_shard_pool(project_id, app=None):
+    """Cierra las conexiones inactivas al archivo de un proyecto (p. ej. antes de borrarlo)."""
+    app = app or current_app
+    with _shard_pools_lock:
+        pool = app.extensions['sqlite_shard_pools'].pop(project_id, None)
+    if pool is not None:
+        pool.close_all()
+
+
+def get_db(project_id=None):
+    """
+    Conexión de la petición actual. Con SHARDING_ENABLED, `project_id` elige el
+    archivo del proyecto (el proyecto debe existir, ver shards.py); sin él, o sin
+    particionado, es la base de datos principal (el catálogo).
+    """
+    if project_id is not None and current_app.config['SHARDING_ENABLED']:
+        shards = g.setdefault('shard_dbs', {})
+        if project_id not in shards:
+            shards[project_id] = _traced(get_shard_pool(project_id).acquire())
+        return shards[project_id]
+    if 'db' not in g:
+        g.db = _traced(get_pool().acquire())
     return g.db
 
+def release_db(project_id):
+    """Devuelve antes de tiempo la conexión al archivo de un proyecto (sin commit, se deshace)."""
+    conn = g.get('shard_dbs', {}).pop(project_id, None)
+    if conn is not None:
+        _release_shard(project_id, conn)
+
+def _traced(conn):
+    # Hook de trazado de consultas (ver metrics.py), si está activo
+    tracer = current_app.extensions.get('sql_tracer')
+    if tracer is not None:
+        tracer.install(conn)
+    return conn
+
 def close_db(e=None):
     db = g.pop('db', None)
     if db is not None:
-        db.close()
+        get_pool().release(db)
+    for project_id, conn in g.pop('shard_dbs', {}).items():
+        _release_shard(project_id, conn)
+
+def _release_shard(project_id, conn):
+    pool = current_app.extensions['sqlite_shard_pools'].get(project_id)
+    if pool is None:
+        # El proyecto se eliminó mientras tanto (ver discard_shard_pool)
+        conn.close()
+    else:
+        pool.release(conn)
 
 def init_db():
+    from .migrate import stamp
+
     db = get_db()
     with current_app.open_resource('schema.sql') as f:
         db.executescript(f.read().decode('utf8'))
+    # schema.sql ya incluye todas las migraciones
+    stamp(db)
+    db.commit()
 
 @click.command('init-db')
 def init_db_command():
@@ -29,5 +221,20 @@ def init_db_command():
     click.echo('Base de datos inicializada.')
 
 def init_app(app):
+    app.config.setdefault('SQLITE_PRAGMAS', DEFAULT_PRAGMAS)
+    # Conexiones inactivas que conserva cada proceso (0 = abrir y cerrar en cada petición)
+    app.config.setdefault('SQLITE_POOL_SIZE', 8)
+    # Caché de sentencias preparadas por conexión: holgada para todas las consultas de la app
+    app.config.setdefault('SQLITE_CACHED_STATEMENTS', 256)
+    # Conexiones inactivas que conserva cada proceso por archivo de proyecto (modo particionado)
+    app.config.setdefault('SQLITE_SHARD_POOL_SIZE', 2)
+
+    app.extensions['sqlite_pool'] = ConnectionPool(
+        app.config['DATABASE'],
+        app.config['SQLITE_PRAGMAS'],
+        app.config['SQLITE_POOL_SIZE'],
+        app.config['SQLITE_CACHED_STATEMENTS'],
+    )
+    app.extensions['sqlite_shard_pools'] = {}
     app.teardown_appcontext(close_db)
-    app.cli.add_command(init_db_command)
\ No newline at end of file
+    app.cli.add_command(init_db_command)
@@ -0,0 +1,304 @@
+# fabricioboard/events.py
+
+"""
+Canal de eventos en vivo (Server-Sent Events) para los tableros.
+
+El BoardEventHub es un publish/subscribe en memoria, uno por proceso:
+
+- Cada conexión a GET /api/projects/<code>/events se suscribe a su proyecto con
+  una cola acotada (EVENTS_QUEUE_SIZE). Si un cliente lento deja que su cola se
+  llene, se le desconecta (recibe un evento 'reset' y vuelve a sincronizar) en
+  lugar de acumular memoria o frenar a los demás.
+- Las mutaciones publican sus cambios después del commit (ver changes.commit_changes).
+  Cada evento se serializa una sola vez, sin importar cuántos suscriptores tenga.
+- Si nada ocurre en EVENTS_HEARTBEAT_SECONDS se envía un comentario SSE para
+  mantener viva la conexión a través de proxies.
+- Como cada worker de gunicorn tiene su propio hub, un hilo por proceso revisa
+  `board_changes` cada EVENTS_POLL_INTERVAL segundos y reenvía los cambios
+  confirmados por otros workers (una sola consulta por intervalo, no por conexión).
+  Con particionado (ver shards.py) cada proyecto tiene su `board_changes` en su
+  archivo: se consulta el de cada proyecto con suscriptores en este worker.
+  Los cambios llegan en orden de seq, así que el hilo conoce el `prev` de cada uno
+  (el último seq visto del proyecto) y el cliente los aplica sin ir a /changes.
+
+Las conexiones en espera no hacen nada más que bloquearse en su cola, así que con
+workers asíncronos (gunicorn -k gevent, ver gunicorn.conf.py) un proceso puede
+mantener miles de ellas abiertas.
+"""
+
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from urllib.parse import quote
+
+# Último cambio de un proyecto anterior a un seq (resuelta por idx_board_changes_project)
+PREVIOUS_SEQ_QUERY = 'SELECT MAX(seq) FROM board_changes WHERE project_id = ? AND seq < ?'
+
+
+class Subscriber:
+    """Una conexión SSE abierta: su proyecto y su cola acotada de eventos."""
+
+    def __init__(self, project_id, maxsize, seq=None):
+        self.project_id = project_id
+        # Versión del tablero al suscribirse: los cambios posteriores le llegan
+        self.seq = seq
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.dropped = False
+
+    def get(self, timeout):
+        """Espera el siguiente evento ya formateado, o None si vence el timeout."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class BoardEventHub:
+
+    def __init__(self, queue_size=100, heartbeat=15, max_subscribers=5000, poll_interval=2.0):
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+        self.max_subscribers = max_subscribers
+        self.poll_interval = poll_interval
+        self.database = None
+        self.shard_dir = None
+        self._subscribers = {}
+        self._count = 0
+        self._last_published = {}
+        self._lock = threading.Lock()
+        self._poller = None
+
+    def init_app(self, app):
+        app.config.setdefault('EVENTS_QUEUE_SIZE', self.queue_size)
+        app.config.setdefault('EVENTS_HEARTBEAT_SECONDS', self.heartbeat)
+        app.config.setdefault('EVENTS_MAX_SUBSCRIBERS', self.max_subscribers)
+        app.config.setdefault('EVENTS_POLL_INTERVAL', self.poll_interval)
+        self.queue_size = app.config['EVENTS_QUEUE_SIZE']
+        self.heartbeat = app.config['EVENTS_HEARTBEAT_SECONDS']
+        self.max_subscribers = app.config['EVENTS_MAX_SUBSCRIBERS']
+        self.poll_interval = app.config['EVENTS_POLL_INTERVAL']
+        self.database = app.config['DATABASE']
+        self.shard_dir = app.config['SHARD_DIR'] if app.config['SHARDING_ENABLED'] else None
+
+    # --- Suscripciones ---
+
+    def subscribe(self, project_id, seq=None):
+        """
+        Crea un suscriptor para el proyecto, que recibirá los cambios posteriores a
+        `seq`, o devuelve None si se alcanzó el máximo.
+        """
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                return None
+            subscriber = Subscriber(project_id, self.queue_size, seq)
+            self._subscribers.setdefault(project_id, set()).add(subscriber)
+            self._count += 1
+        self._ensure_poller()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(subscriber.project_id)
+            if subscribers is None or subscriber not in subscribers:
+                return
+            subscribers.discard(subscriber)
+            self._count -= 1
+            if not subscribers:
+                del self._subscribers[subscriber.project_id]
+
+    def subscriber_count(self):
+        return self._count
+
+    # --- Publicación ---
+
+    def publish(self, project_id, change):
+        """
+        Envía un cambio (mismo formato que /changes, más `prev`) a todos los
+        suscriptores del proyecto. Los que tengan la cola llena se desconectan.
+        """
+        message = format_event('change', change, event_id=change['seq'])
+        with self._lock:
+            if change['seq'] > self._last_published.get(project_id, 0):
+                self._last_published[project_id] = change['seq']
+            subscribers = list(self._subscribers.get(project_id, ()))
+
+        for subscriber in subscribers:
+            try:
+                subscriber.queue.put_nowait(message)
+            except queue.Full:
+                self._drop(subscriber)
+
+    def close_project(self, project_id):
+        """Desconecta a todos los suscriptores de un proyecto (p. ej. al eliminarlo)."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(project_id, ()))
+            self._last_published.pop(project_id, None)
+        for subscriber in subscribers:
+            self._drop(subscriber)
+
+    def _drop(self, subscriber):
+        subscriber.dropped = True
+        self.unsubscribe(subscriber)
+        # Despertamos a su stream si estaba esperando; si la cola está llena,
+        # verá `dropped` en cuanto consuma el siguiente evento.
+        try:
+            subscriber.queue.put_nowait(None)
+        except queue.Full:
+            pass
+
+    # --- Stream SSE ---
+
+    def stream(self, subscriber, seq):
+        """Generador con el cuerpo de la respuesta text/event-stream de un suscriptor."""
+        try:
+            # Indicamos al navegador cuánto esperar antes de reconectar y
+            # le confirmamos la versión desde la que recibirá cambios.
+            yield 'retry: 3000\n' + format_event('hello', {'seq': seq})
+            while True:
+                message = subscriber.get(timeout=self.heartbeat)
+                if subscriber.dropped:
+                    yield format_event('reset', {})
+                    return
+                if message is None:
+                    yield ': heartbeat\n\n'
+                    continue
+                yield message
+        finally:
+            self.unsubscribe(subscriber)
+
+    # --- Cambios de otros workers ---
+
+    def _ensure_poller(self):
+        if self.poll_interval <= 0 or self.database is None:
+            return
+        with self._lock:
+            if self._poller is not None and self._poller.is_alive():
+                return
+            self._poller = threading.Thread(target=self._poll, name='board-events-poller', daemon=True)
+            self._poller.start()
+
+    def _poll(self):
+        if self.shard_dir is not None:
+            self._poll_shards()
+            return
+        db = sqlite3.connect(self.database)
+        # Último seq visto de cada proyecto vigilado: el `prev` de su siguiente cambio
+        last_seen = {}
+        try:
+            last_seq = db.execute('SELECT MAX(seq) FROM board_changes').fetchone()[0] or 0
+            while True:
+                time.sleep(self.poll_interval)
+                watched = self._watched()
+                if watched is None:
+                    return
+
+                rows = db.execute(
+                    'SELECT seq, project_id, kind, task_id, data FROM board_changes '
+                    'WHERE seq > ? ORDER BY seq',
+                    (last_seq,)
+                ).fetchall()
+                if rows:
+                    last_seq = rows[-1][0]
+                self._forward(db, rows, watched, last_seen)
+        except sqlite3.Error:
+            with self._lock:
+                self._poller = None
+        finally:
+            db.close()
+
+    def _poll_shards(self):
+        """
+        Como _poll, con particionado: una conexión de solo lectura al archivo de cada
+        proyecto con suscriptores, y el último seq visto de cada uno.
+        """
+        connections = {}
+        last_seqs = {}
+        try:
+            while True:
+                time.sleep(self.poll_interval)
+                watched = self._watched()
+                if watched is None:
+                    return
+
+                for project_id in set(connections) - set(watched):
+                    connections.pop(project_id).close()
+                    last_seqs.pop(project_id, None)
+                for project_id, since in watched.items():
+                    try:
+                        db = connections.get(project_id)
+                        if db is None:
+                            path = os.path.join(self.shard_dir, f'project_{project_id}.db')
+                            db = connections[project_id] = sqlite3.connect(f'file:{quote(path)}?mode=ro', uri=True)
+                            if since is None:
+                                since = db.execute('SELECT MAX(seq) FROM board_changes').fetchone()[0] or 0
+                            last_seqs[project_id] = since
+                        rows = db.execute(
+                            'SELECT seq, project_id, kind, task_id, data FROM board_changes '
+                            'WHERE project_id = ? AND seq > ? ORDER BY seq',
+                            (project_id, last_seqs[project_id])
+                        ).fetchall()
+                    except sqlite3.Error:
+                        # p. ej. el proyecto se eliminó y su archivo ya no existe
+                        db = connections.pop(project_id, None)
+                        if db is not None:
+                            db.close()
+                        last_seqs.pop(project_id, None)
+                        continue
+                    self._forward(db, rows, watched, last_seqs)
+        finally:
+            for db in connections.values():
+                db.close()
+
+    def _watched(self):
+        """
+        Devuelve {project_id: seq} de los proyectos con suscriptores (el menor seq de
+        sus suscriptores, o None si no se conoce), o None si no queda ninguno: entonces
+        el hilo debe terminar, y el próximo subscribe lo relanza.
+        """
+        with self._lock:
+            if not self._subscribers:
+                self._poller = None
+                return None
+            return {
+                project_id: min((s.seq for s in subscribers if s.seq is not None), default=None)
+                for project_id, subscribers in self._subscribers.items()
+            }
+
+    def _forward(self, db, rows, watched, last_seen):
+        """
+        Publica las filas de `board_changes` de los proyectos vigilados que aún no se
+        publicaron. `last_seen` guarda el último seq visto de cada proyecto (se
+        actualiza aquí); si falta, el `prev` del primer cambio se busca en `db`.
+        """
+        for seq, project_id, kind, task_id, data in rows:
+            if project_id not in watched:
+                # Sus cambios no se siguen: el valor guardado dejaría de ser el último
+                last_seen.pop(project_id, None)
+                continue
+            if project_id in last_seen:
+                prev = last_seen[project_id]
+            else:
+                prev = db.execute(PREVIOUS_SEQ_QUERY, (project_id, seq)).fetchone()[0]
+            last_seen[project_id] = seq
+            if seq <= self._last_published.get(project_id, 0):
+                continue
+            self.publish(project_id, {
+                'seq': seq,
+                'prev': prev,
+                'kind': kind,
+                'task_id': task_id,
+                'data': None if data is None else json.loads(data),
+            })
+
+
+def format_event(event, data, event_id=None):
+    """Formatea un evento según el protocolo text/event-stream."""
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event}')
+    lines.append(f'data: {json.dumps(data, separators=(",", ":"))}')
+    return '\n'.join(lines) + '\n\n'
@@ -1,8 +1,22 @@
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 
+from .cache import BoardCache, ReferenceCache
+from .events import BoardEventHub
+# Registra el esquema sqlite:// en `limits` (contadores compartidos entre workers)
+from . import ratelimit  # noqa: F401
+
 # Lo haremos en la fábrica de la aplicación.
 limiter = Limiter(
     key_func=get_remote_address,
     default_limits=["200 per day", "50 per hour"]
-)
\ No newline at end of file
+)
+
+# Caché en memoria de los tableros ya serializados (ver cache.py).
+board_cache = BoardCache()
+
+# Caché en memoria de los usuarios y etiquetas ya serializados (ver reference.py).
+reference_cache = ReferenceCache()
+
+# Publish/subscribe en memoria para los eventos en vivo de los tableros (ver events.py).
+event_hub = BoardEventHub()
@@ -0,0 +1,344 @@
+# fabricioboard/metrics.py
+
+"""
+Instrumentación: métricas por petición y por consulta SQL, y endpoint /metrics.
+
+- Cada petición registra su latencia en un histograma por ruta (la plantilla de
+  la regla, p. ej. /api/tasks/<int:task_id>, para no crear una serie por id).
+- Si METRICS_SQL_TRACING está activo, las conexiones del pool usan TracedConnection:
+  cada sentencia se cuenta y se cronometra, y get_db instala el hook que asocia las
+  sentencias a la ruta de la petición. Se registra el número de sentencias y el
+  tiempo de base de datos de cada petición, que también se devuelve en la cabecera
+  `Server-Timing` (visible en las herramientas de desarrollo del navegador).
+- Con SLOW_QUERY_THRESHOLD_MS, las sentencias más lentas que el umbral se escriben
+  en el logger `fabricioboard.slow_queries` con su SQL y la forma de sus parámetros
+  (tipos y longitudes, nunca los valores).
+- GET /metrics devuelve todo en el formato de texto de Prometheus.
+
+El tiempo de una sentencia es el de execute() (que ya calcula la primera fila) más
+el de fetchone/fetchall/fetchmany; las filas leídas iterando el cursor no se
+cronometran para no añadir una llamada Python por fila.
+
+Las métricas son por proceso: con varios workers de gunicorn, cada scrape ve las
+del worker que atiende la petición.
+
+Con METRICS_ENABLED = False no se instala nada (ni hooks ni conexiones trazadas)
+y /metrics responde 404. benchmarks/bench_metrics.py mide el costo de cada nivel.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+
+from flask import current_app, g, has_request_context, request
+
+from .db import get_pool
+from .extensions import board_cache, event_hub, limiter
+
+# Límites de los buckets de los histogramas
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0)
+STATEMENTS_PER_REQUEST_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 500)
+
+slow_query_logger = logging.getLogger('fabricioboard.slow_queries')
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_values=(), amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            values = list(self._values.items())
+        for label_values, value in values:
+            lines.append(f'{self.name}{_format_labels(self.labels, label_values)} {_format_number(value)}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=REQUEST_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        # Por serie: [cuentas por bucket (no acumuladas, la última es +Inf), suma, total]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = [(labels, (list(counts), total, count)) for labels, (counts, total, count) in self._series.items()]
+        for label_values, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labels + ('le',), label_values + (bound,))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labels, label_values)
+            lines.append(f'{self.name}_sum{labels} {_format_number(total)}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+def parameter_shape(params):
+    """Describe los parámetros de una sentencia sin revelar sus valores: (int, str[12], None)."""
+    def shape(value):
+        if isinstance(value, (str, bytes)):
+            return f'{type(value).__name__}[{len(value)}]'
+        return type(value).__name__
+
+    if isinstance(params, dict):
+        return '{' + ', '.join(f'{key}: {shape(value)}' for key, value in params.items()) + '}'
+    return '(' + ', '.join(shape(value) for value in params) + ')'
+
+
+class SQLTracer:
+    """Recibe las sentencias de las conexiones trazadas y alimenta las métricas."""
+
+    def __init__(self, metrics, slow_threshold_ms=None):
+        self.metrics = metrics
+        self.slow_threshold = None if slow_threshold_ms is None else slow_threshold_ms / 1000
+
+    def install(self, conn):
+        """Asocia una conexión del pool a la petición actual (lo llama get_db)."""
+        if not isinstance(conn, TracedConnection):
+            return
+        conn.tracer = self
+        conn.trace_route = _route_label() if has_request_context() else 'background'
+        conn.trace_statements = 0
+        conn.trace_seconds = 0.0
+
+    def record(self, conn, sql, params, elapsed, many=False):
+        conn.trace_statements += 1
+        conn.trace_seconds += elapsed
+        operation = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else 'OTHER'
+        if operation not in ('SELECT', 'INSERT', 'UPDATE', 'DELETE'):
+            operation = 'OTHER'
+        self.metrics.statement_duration.observe((conn.trace_route, operation), elapsed)
+
+        if self.slow_threshold is not None and elapsed >= self.slow_threshold:
+            self.metrics.slow_statements.inc((conn.trace_route, operation))
+            if many and isinstance(params, list):
+                shape = f'{len(params)} filas × {parameter_shape(params[0])}' if params else '0 filas'
+            elif many:
+                shape = 'filas de un iterador'
+            else:
+                shape = parameter_shape(params)
+            slow_query_logger.warning(
+                'Consulta lenta (%.1f ms) en %s: %s params=%s',
+                elapsed * 1000, conn.trace_route, ' '.join(sql.split()), shape
+            )
+
+
+class TracedCursor(sqlite3.Cursor):
+    """Cursor que cronometra execute/executemany y las lecturas con fetch*."""
+
+    def execute(self, sql, params=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, params)
+        finally:
+            self._trace(sql, params, time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_params):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_params)
+        finally:
+            self._trace(sql, seq_of_params, time.perf_counter() - start, many=True)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            self._add_time(time.perf_counter() - start)
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        try:
+            return super().fetchmany(self.arraysize if size is None else size)
+        finally:
+            self._add_time(time.perf_counter() - start)
+
+    def fetchall(self):
+        start = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            self._add_time(time.perf_counter() - start)
+
+    def _trace(self, sql, params, elapsed, many=False):
+        tracer = self.connection.tracer
+        if tracer is not None:
+            tracer.record(self.connection, sql, params, elapsed, many)
+
+    def _add_time(self, elapsed):
+        # La lectura cuenta en el tiempo de base de datos de la petición
+        if self.connection.tracer is not None:
+            self.connection.trace_seconds += elapsed
+
+
+class TracedConnection(sqlite3.Connection):
+    """Conexión cuyos cursores (también los de db.execute) se cronometran."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tracer = None
+        self.trace_route = 'background'
+        self.trace_statements = 0
+        self.trace_seconds = 0.0
+
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    # Los atajos de sqlite3.Connection crean su cursor sin pasar por cursor()
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
+
+
+class Metrics:
+    """Registro de métricas de un proceso y hooks de Flask que lo alimentan."""
+
+    def __init__(self):
+        self.requests = Counter(
+            'fabricioboard_http_requests_total', 'Peticiones HTTP atendidas.', ('route', 'method', 'status')
+        )
+        self.request_duration = Histogram(
+            'fabricioboard_http_request_duration_seconds', 'Latencia de las peticiones HTTP.',
+            ('route', 'method'), REQUEST_BUCKETS
+        )
+        self.request_statements = Histogram(
+            'fabricioboard_db_statements_per_request', 'Sentencias SQL ejecutadas por petición.',
+            ('route',), STATEMENTS_PER_REQUEST_BUCKETS
+        )
+        self.request_db_duration = Histogram(
+            'fabricioboard_db_request_duration_seconds', 'Tiempo de base de datos por petición.',
+            ('route',), REQUEST_BUCKETS
+        )
+        self.statement_duration = Histogram(
+            'fabricioboard_db_statement_duration_seconds', 'Duración de cada sentencia SQL.',
+            ('route', 'operation'), STATEMENT_BUCKETS
+        )
+        self.slow_statements = Counter(
+            'fabricioboard_db_slow_statements_total', 'Sentencias SQL por encima del umbral de consulta lenta.',
+            ('route', 'operation')
+        )
+
+    def render(self, app):
+        lines = []
+        for metric in (self.requests, self.request_duration, self.request_statements,
+                       self.request_db_duration, self.statement_duration, self.slow_statements):
+            lines.extend(metric.render())
+
+        # Indicadores instantáneos, leídos al hacer scrape
+        entries, size = board_cache.stats()
+        gauges = (
+            ('fabricioboard_sse_subscribers', 'Conexiones en vivo (SSE) abiertas.', event_hub.subscriber_count()),
+            ('fabricioboard_board_cache_entries', 'Tableros en la caché de este proceso.', entries),
+            ('fabricioboard_board_cache_bytes', 'Bytes ocupados por la caché de tableros.', size),
+            ('fabricioboard_db_pool_idle_connections', 'Conexiones SQLite inactivas en el pool.',
+             get_pool(app).idle_count()),
+        )
+        for name, help_text, value in gauges:
+            lines.extend([f'# HELP {name} {help_text}', f'# TYPE {name} gauge', f'{name} {value}'])
+        return '\n'.join(lines) + '\n'
+
+    # --- Hooks de la petición ---
+
+    def before_request(self):
+        g.metrics_start = time.perf_counter()
+
+    def after_request(self, response):
+        start = g.pop('metrics_start', None)
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        route = _route_label()
+        self.requests.inc((route, request.method, str(response.status_code)))
+        self.request_duration.observe((route, request.method), elapsed)
+
+        db = g.get('db')
+        if isinstance(db, TracedConnection) and db.tracer is not None:
+            self.request_statements.observe((route,), db.trace_statements)
+            self.request_db_duration.observe((route,), db.trace_seconds)
+            response.headers.add(
+                'Server-Timing',
+                f'db;dur={db.trace_seconds * 1000:.2f};desc="{db.trace_statements} consultas"'
+            )
+        response.headers.add('Server-Timing', f'app;dur={elapsed * 1000:.2f}')
+        return response
+
+
+def _route_label():
+    rule = request.url_rule
+    return rule.rule if rule is not None else 'sin_ruta'
+
+
+def metrics_view():
+    metrics = current_app.extensions['metrics']
+    return current_app.response_class(
+        metrics.render(current_app), content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+
+def init_app(app):
+    app.config.setdefault('METRICS_ENABLED', True)
+    # Trazado de cada sentencia SQL (la parte más costosa de la instrumentación)
+    app.config.setdefault('METRICS_SQL_TRACING', True)
+    # Umbral en milisegundos del log de consultas lentas (None = desactivado)
+    app.config.setdefault('SLOW_QUERY_THRESHOLD_MS', None)
+
+    if not app.config['METRICS_ENABLED']:
+        return
+
+    metrics = Metrics()
+    app.extensions['metrics'] = metrics
+    app.before_request(metrics.before_request)
+    app.after_request(metrics.after_request)
+
+    if app.config['METRICS_SQL_TRACING']:
+        get_pool(app).factory = TracedConnection
+        app.extensions['sql_tracer'] = SQLTracer(metrics, app.config['SLOW_QUERY_THRESHOLD_MS'])
+
+    # Prometheus hace scrape cada pocos segundos: no debe contar para el límite por IP
+    app.add_url_rule('/metrics', 'metrics', limiter.exempt(metrics_view))
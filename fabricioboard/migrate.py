@@ -0,0 +1,234 @@
+# fabricioboard/migrate.py
+
+"""
+Migraciones del esquema de la base de datos.
+
+Cada migración es un archivo `migrations/NNNN_descripcion.sql`; el número es su
+versión. La tabla `schema_version` guarda las ya aplicadas, y `flask db-upgrade`
+aplica en orden las que falten, cada una en su propia transacción (si falla, no
+queda aplicada a medias).
+
+`flask init-db` crea el esquema completo desde schema.sql, que ya incluye todas
+las migraciones, y las marca como aplicadas. Una base de datos sin la tabla
+`schema_version` se considera creada con el esquema de la versión 1.1.5.
+
+`flask db-check-plans` comprueba con EXPLAIN QUERY PLAN que las consultas calientes
+usan los índices de las migraciones (sin recorrer tablas ni ordenar en memoria).
+"""
+
+import os
+import re
+
+import click
+from flask import current_app
+
+from .admin import ADMIN_LISTINGS
+from .archive import ARCHIVE_CANDIDATES_QUERY, ARCHIVE_PAGE_QUERY
+from .changes import TAG_PROJECTS_QUERY
+from .db import get_db
+from .ordering import (
+    INDEX_NEIGHBOURS_QUERY,
+    LAST_POSITION_QUERY,
+    NEXT_POSITION_QUERY,
+    PREVIOUS_POSITION_QUERY,
+    TIED_POSITION_QUERY,
+)
+from .snapshot import (
+    COLUMN_PAGE_QUERY,
+    COLUMNS_QUERY,
+    TAGS_QUERY,
+    TASK_COUNT_QUERY,
+    TASKS_QUERY,
+    USER_TASKS_QUERY,
+)
+from .stats import STATS_QUERY, TAG_STATS_QUERY
+
+MIGRATION_FILE = re.compile(r'^(\d+)_(\w+)\.sql$')
+
+# Consultas calientes y el índice que debe resolver cada una (con sus parámetros de ejemplo)
+QUERY_PLANS = {
+    'tablero: tareas': (TASKS_QUERY, (1,), 'idx_tasks_project_position'),
+    'tablero: etiquetas': (TAGS_QUERY, (1,), 'idx_tasks_project_position'),
+    'tablero: número de tareas': (TASK_COUNT_QUERY, (1,), 'idx_tasks_project_position'),
+    'columna: última posición': (LAST_POSITION_QUERY, (1, 'Por Hacer', None), 'idx_tasks_project_column_position'),
+    'columna: siguiente posición': (NEXT_POSITION_QUERY, (1, 'Por Hacer', 0.0, None), 'idx_tasks_project_column_position'),
+    'columna: posición anterior': (PREVIOUS_POSITION_QUERY, (1, 'Por Hacer', 0.0, None), 'idx_tasks_project_column_position'),
+    'columna: vecina por índice': (INDEX_NEIGHBOURS_QUERY, (1, 'Por Hacer', 0, 0), 'idx_tasks_project_column_position'),
+    'columna: posición empatada': (TIED_POSITION_QUERY, (1, 'Por Hacer', 0.0, 0, None), 'idx_tasks_project_column_position'),
+    'tablero: columnas': (COLUMNS_QUERY, (1,), 'idx_tasks_project_column_position'),
+    'columna: página filtrada': (
+        COLUMN_PAGE_QUERY.format(filters=' AND t.assigned_user_id = ? AND (t.position, t.id) > (?, ?)'),
+        (1, 'Por Hacer', 1, 0.0, 0, 51), 'idx_tasks_assigned_user'
+    ),
+    'estadísticas: columnas': (STATS_QUERY, (1,), 'PRIMARY KEY'),
+    'estadísticas: etiquetas': (TAG_STATS_QUERY, (1,), 'PRIMARY KEY'),
+    'etiqueta: tareas que la usan': (TAG_PROJECTS_QUERY, (1,), 'idx_task_tags_tag'),
+    'usuario: tareas asignadas': (
+        USER_TASKS_QUERY.format(filters=' AND +t.column = ? AND (t.project_id, t.column, t.position, t.id) > (?, ?, ?, ?)'),
+        (1, 'Hecho', 1, 'Hecho', 0.0, 0, 101), 'idx_tasks_assigned_user'
+    ),
+    'archivo: tareas a archivar': (
+        ARCHIVE_CANDIDATES_QUERY, (1, 'Hecho', '2000-01-01 00:00:00', 500), 'idx_tasks_project_column_position'
+    ),
+    'archivo: página': (
+        ARCHIVE_PAGE_QUERY.format(after=' AND (a.archived_at, a.id) < (?, ?)'),
+        (1, '2000-01-01 00:00:00', 0, 51), 'idx_archived_tasks_project'
+    ),
+    'admin: proyectos': (
+        ADMIN_LISTINGS['projects'][0].format(where=' AND (name, id) > (?, ?)'), ('a', 0, 51), 'idx_projects_name'
+    ),
+    'admin: usuarios': (
+        ADMIN_LISTINGS['users'][0].format(where=' AND (username, id) > (?, ?)'), ('a', 0, 51), 'sqlite_autoindex_users_1'
+    ),
+    'admin: etiquetas': (
+        ADMIN_LISTINGS['tags'][0].format(where=' AND (name, id) > (?, ?)'), ('a', 0, 51), 'sqlite_autoindex_tags_1'
+    ),
+}
+
+
+# Ordenaciones en memoria aceptadas en un plan, con su motivo; cualquier otra lo hace fallar
+ALLOWED_TEMP_BTREES = {
+    # Ordena solo los contadores del proyecto (columnas × etiquetas en uso), nunca sus
+    # tareas; un índice por task_count encarecería cada movimiento de tarjeta
+    'estadísticas: etiquetas': 'USE TEMP B-TREE FOR RIGHT PART OF ORDER BY',
+    # Quita los proyectos repetidos entre los usos de una etiqueta; solo se ejecuta al
+    # eliminar la etiqueta desde el admin
+    'etiqueta: tareas que la usan': 'USE TEMP B-TREE FOR DISTINCT',
+}
+
+
+def load_migrations(app=None):
+    """Devuelve la lista ordenada de migraciones como tuplas (versión, nombre, sql)."""
+    app = app or current_app
+    directory = os.path.join(app.root_path, 'migrations')
+    migrations = []
+    for filename in sorted(os.listdir(directory)):
+        match = MIGRATION_FILE.match(filename)
+        if match is None:
+            continue
+        with open(os.path.join(directory, filename), encoding='utf8') as f:
+            migrations.append((int(match.group(1)), match.group(2), f.read()))
+    return migrations
+
+
+def _table_exists(db, name):
+    row = db.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ).fetchone()
+    return row is not None
+
+
+def _baseline_version(db):
+    """Versión de una base de datos anterior a las migraciones."""
+    columns = [row['name'] for row in db.execute('PRAGMA table_info(projects)')]
+    # Creada con schema.sql antes de existir schema_version: ya tiene el registro de cambios (0001)
+    return 1 if 'version' in columns else 0
+
+
+def current_version(db):
+    """Última migración aplicada (0 para una base de datos de la versión 1.1.5)."""
+    if _table_exists(db, 'schema_version'):
+        row = db.execute('SELECT MAX(version) AS version FROM schema_version').fetchone()
+        if row['version'] is not None:
+            return row['version']
+    return _baseline_version(db)
+
+
+def upgrade(db, migrations=None):
+    """Aplica las migraciones pendientes y devuelve la lista de las aplicadas."""
+    if migrations is None:
+        migrations = load_migrations()
+    db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    db.commit()
+
+    version = current_version(db)
+    applied = []
+    for number, name, sql in migrations:
+        if number <= version:
+            continue
+        # executescript confirma antes cualquier transacción abierta; el script lleva la suya
+        try:
+            db.executescript(
+                f'BEGIN IMMEDIATE;\n{sql}\n'
+                f"INSERT INTO schema_version (version, name) VALUES ({number}, '{name}');\n"
+                'COMMIT;'
+            )
+        except Exception:
+            if db.in_transaction:
+                db.rollback()
+            raise
+        applied.append((number, name))
+    return applied
+
+
+def stamp(db, migrations=None):
+    """Marca todas las migraciones como aplicadas (tras crear el esquema completo). NO hace commit."""
+    if migrations is None:
+        migrations = load_migrations()
+    db.executemany(
+        'INSERT OR IGNORE INTO schema_version (version, name) VALUES (?, ?)',
+        [(number, name) for number, name, _ in migrations]
+    )
+
+
+def check_query_plans(db):
+    """
+    Devuelve {nombre: (ok, plan)} con el EXPLAIN QUERY PLAN de cada consulta caliente.
+    Una consulta está bien si usa su índice y no recorre tablas ni ordena en memoria
+    (salvo lo aceptado en ALLOWED_TEMP_BTREES).
+    """
+    results = {}
+    for label, (sql, params, index) in QUERY_PLANS.items():
+        plan = [row['detail'] for row in db.execute(f'EXPLAIN QUERY PLAN {sql}', params)]
+        allowed = ALLOWED_TEMP_BTREES.get(label)
+        ok = (
+            any(index in detail for detail in plan)
+            and not any(detail.startswith('SCAN') for detail in plan)
+            and not any('USE TEMP B-TREE' in detail and detail != allowed for detail in plan)
+        )
+        results[label] = (ok, plan)
+    return results
+
+
+@click.command('db-upgrade')
+def db_upgrade_command():
+    """Aplica las migraciones pendientes del esquema."""
+    db = get_db()
+    applied = upgrade(db)
+    for number, name in applied:
+        click.echo(f'Aplicada {number:04d}_{name}')
+    if current_app.config['SHARDING_ENABLED']:
+        from .shards import project_databases, shard_migrations
+
+        # Los archivos de los proyectos (ver shards.py) se crean en la última versión
+        # con shard.sql; las migraciones posteriores se les aplican también
+        migrations = shard_migrations()
+        shards = sum(bool(upgrade(shard, migrations)) for shard in project_databases())
+        click.echo(f'{shards} archivo(s) de proyecto actualizados.')
+    click.echo(f'Esquema en la versión {current_version(db)}.')
+
+
+@click.command('db-check-plans')
+def db_check_plans_command():
+    """Comprueba que las consultas calientes usan sus índices."""
+    failed = False
+    for label, (ok, plan) in check_query_plans(get_db()).items():
+        click.echo(f"[{'OK' if ok else 'FALLA'}] {label}")
+        for detail in plan:
+            click.echo(f'    {detail}')
+        failed = failed or not ok
+    if failed:
+        raise click.ClickException('Hay consultas que no usan sus índices; ejecuta `flask db-upgrade`.')
+
+
+def init_app(app):
+    app.cli.add_command(db_upgrade_command)
+    app.cli.add_command(db_check_plans_command)
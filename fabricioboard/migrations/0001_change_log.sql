@@ -0,0 +1,15 @@
+-- Versión de cada tablero y registro de cambios (ver cache.py y changes.py),
+-- para bases de datos creadas con el esquema de la versión 1.1.5.
+ALTER TABLE projects ADD COLUMN version INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE projects ADD COLUMN changes_floor INTEGER NOT NULL DEFAULT 0;
+
+CREATE TABLE IF NOT EXISTS board_changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    project_id INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    task_id INTEGER,
+    data TEXT,
+    FOREIGN KEY (project_id) REFERENCES projects (id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_board_changes_project ON board_changes (project_id, seq);
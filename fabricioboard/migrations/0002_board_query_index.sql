@@ -0,0 +1,3 @@
+-- Carga del tablero (snapshot.TASKS_QUERY y TAGS_QUERY):
+-- tareas de un proyecto ya ordenadas por posición, sin recorrer toda la tabla ni ordenar en memoria.
+CREATE INDEX IF NOT EXISTS idx_tasks_project_position ON tasks (project_id, position);
@@ -0,0 +1,3 @@
+-- Búsquedas de posición dentro de una columna (ordering.py): última tarjeta,
+-- vecinas de un movimiento e índice de SortableJS. Índice de cobertura: no lee la tabla.
+CREATE INDEX IF NOT EXISTS idx_tasks_project_column_position ON tasks (project_id, column, position);
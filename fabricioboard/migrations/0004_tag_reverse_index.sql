@@ -0,0 +1,3 @@
+-- Búsqueda inversa de etiquetas: qué tareas usan una etiqueta dada
+-- (la clave primaria de task_tags empieza por task_id y no sirve para esto).
+CREATE INDEX IF NOT EXISTS idx_task_tags_tag ON task_tags (tag_id, task_id);
@@ -0,0 +1,28 @@
+-- Búsqueda de texto completo sobre el título y la descripción de las tareas (ver search.py).
+-- Índice FTS5 de contenido externo: el texto se lee de `tasks`, el índice solo guarda los términos.
+CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+    title,
+    description,
+    content='tasks',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2',
+    prefix='2 3'
+);
+
+-- Triggers que mantienen el índice sincronizado con cualquier escritura sobre `tasks`.
+-- Mover una tarjeta (column/position) no toca el índice.
+CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN
+    INSERT INTO tasks_fts (rowid, title, description) VALUES (new.id, new.title, new.description);
+END;
+
+CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN
+    INSERT INTO tasks_fts (tasks_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description);
+END;
+
+CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE OF title, description ON tasks BEGIN
+    INSERT INTO tasks_fts (tasks_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description);
+    INSERT INTO tasks_fts (rowid, title, description) VALUES (new.id, new.title, new.description);
+END;
+
+-- Indexa las tareas que ya existían
+INSERT INTO tasks_fts (tasks_fts) VALUES ('rebuild');
@@ -0,0 +1,100 @@
+-- Estadísticas materializadas por proyecto y columna (ver stats.py).
+-- Las filas con contador 0 se eliminan: una columna o etiqueta sin tareas no aparece.
+CREATE TABLE IF NOT EXISTS column_stats (
+    project_id INTEGER NOT NULL,
+    column TEXT NOT NULL,
+    task_count INTEGER NOT NULL,
+    unassigned_count INTEGER NOT NULL,
+    PRIMARY KEY (project_id, column),
+    FOREIGN KEY (project_id) REFERENCES projects (id) ON DELETE CASCADE
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS column_tag_stats (
+    project_id INTEGER NOT NULL,
+    column TEXT NOT NULL,
+    tag_id INTEGER NOT NULL,
+    task_count INTEGER NOT NULL,
+    PRIMARY KEY (project_id, column, tag_id),
+    FOREIGN KEY (project_id) REFERENCES projects (id) ON DELETE CASCADE
+) WITHOUT ROWID;
+
+-- Triggers que mantienen los contadores en la misma transacción de cada escritura
+-- sobre `tasks` y `task_tags` (también las de los ON DELETE CASCADE / SET NULL).
+CREATE TRIGGER IF NOT EXISTS tasks_stats_insert AFTER INSERT ON tasks BEGIN
+    INSERT INTO column_stats (project_id, column, task_count, unassigned_count)
+    VALUES (new.project_id, new.column, 1, new.assigned_user_id IS NULL)
+    ON CONFLICT (project_id, column) DO UPDATE SET
+        task_count = task_count + 1,
+        unassigned_count = unassigned_count + excluded.unassigned_count;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tasks_stats_delete AFTER DELETE ON tasks BEGIN
+    UPDATE column_stats
+    SET task_count = task_count - 1, unassigned_count = unassigned_count - (old.assigned_user_id IS NULL)
+    WHERE project_id = old.project_id AND column = old.column;
+    DELETE FROM column_stats WHERE project_id = old.project_id AND column = old.column AND task_count = 0;
+END;
+
+-- BEFORE: cuando se borra la tarea, sus filas de task_tags todavía existen
+-- (el ON DELETE CASCADE las borra después, y entonces la tarea ya no está).
+CREATE TRIGGER IF NOT EXISTS tasks_tag_stats_delete BEFORE DELETE ON tasks BEGIN
+    UPDATE column_tag_stats SET task_count = task_count - 1
+    WHERE project_id = old.project_id AND column = old.column
+      AND tag_id IN (SELECT tag_id FROM task_tags WHERE task_id = old.id);
+    DELETE FROM column_tag_stats WHERE project_id = old.project_id AND column = old.column AND task_count = 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tasks_stats_update AFTER UPDATE OF project_id, column, assigned_user_id ON tasks
+WHEN old.project_id IS NOT new.project_id OR old.column IS NOT new.column
+  OR (old.assigned_user_id IS NULL) IS NOT (new.assigned_user_id IS NULL)
+BEGIN
+    UPDATE column_stats
+    SET task_count = task_count - 1, unassigned_count = unassigned_count - (old.assigned_user_id IS NULL)
+    WHERE project_id = old.project_id AND column = old.column;
+    INSERT INTO column_stats (project_id, column, task_count, unassigned_count)
+    VALUES (new.project_id, new.column, 1, new.assigned_user_id IS NULL)
+    ON CONFLICT (project_id, column) DO UPDATE SET
+        task_count = task_count + 1,
+        unassigned_count = unassigned_count + excluded.unassigned_count;
+    DELETE FROM column_stats WHERE project_id = old.project_id AND column = old.column AND task_count = 0;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tasks_tag_stats_update AFTER UPDATE OF project_id, column ON tasks
+WHEN old.project_id IS NOT new.project_id OR old.column IS NOT new.column
+BEGIN
+    UPDATE column_tag_stats SET task_count = task_count - 1
+    WHERE project_id = old.project_id AND column = old.column
+      AND tag_id IN (SELECT tag_id FROM task_tags WHERE task_id = new.id);
+    DELETE FROM column_tag_stats WHERE project_id = old.project_id AND column = old.column AND task_count = 0;
+    INSERT INTO column_tag_stats (project_id, column, tag_id, task_count)
+    SELECT new.project_id, new.column, tag_id, 1 FROM task_tags WHERE task_id = new.id
+    ON CONFLICT (project_id, column, tag_id) DO UPDATE SET task_count = task_count + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS task_tags_stats_insert AFTER INSERT ON task_tags BEGIN
+    INSERT INTO column_tag_stats (project_id, column, tag_id, task_count)
+    SELECT project_id, column, new.tag_id, 1 FROM tasks WHERE id = new.task_id
+    ON CONFLICT (project_id, column, tag_id) DO UPDATE SET task_count = task_count + 1;
+END;
+
+-- Si la tarea ya no existe (se está borrando), tasks_tag_stats_delete ya descontó la etiqueta
+CREATE TRIGGER IF NOT EXISTS task_tags_stats_delete AFTER DELETE ON task_tags BEGIN
+    UPDATE column_tag_stats SET task_count = task_count - 1
+    WHERE (project_id, column) = (SELECT project_id, column FROM tasks WHERE id = old.task_id)
+      AND tag_id = old.tag_id;
+    DELETE FROM column_tag_stats
+    WHERE (project_id, column) = (SELECT project_id, column FROM tasks WHERE id = old.task_id)
+      AND tag_id = old.tag_id AND task_count = 0;
+END;
+
+-- Calcula las estadísticas de las tareas que ya existían
+INSERT INTO column_stats (project_id, column, task_count, unassigned_count)
+SELECT project_id, column, COUNT(*), SUM(assigned_user_id IS NULL)
+FROM tasks
+GROUP BY project_id, column;
+
+INSERT INTO column_tag_stats (project_id, column, tag_id, task_count)
+SELECT t.project_id, t.column, tt.tag_id, COUNT(*)
+FROM task_tags tt
+JOIN tasks t ON t.id = tt.task_id
+GROUP BY t.project_id, t.column, tt.tag_id;
@@ -0,0 +1,3 @@
+-- Proyectos eliminados pendientes de purga (ver purge.py): se ocultan al momento
+-- y sus tareas se borran por partes en segundo plano.
+ALTER TABLE projects ADD COLUMN deleted_at TEXT;
@@ -0,0 +1,36 @@
+-- Fechas de creación y de última modificación de las tareas (ver archive.py).
+-- ALTER TABLE no admite DEFAULT CURRENT_TIMESTAMP: las escriben las inserciones y
+-- actualizaciones, y las tareas que ya existían toman la fecha de la migración.
+ALTER TABLE tasks ADD COLUMN created_at TEXT;
+ALTER TABLE tasks ADD COLUMN updated_at TEXT;
+UPDATE tasks SET created_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP;
+
+-- Tareas terminadas archivadas: fuera de `tasks`, del tablero, de la búsqueda y de
+-- las estadísticas. Conservan su id para poder restaurarlas tal cual.
+CREATE TABLE IF NOT EXISTS archived_tasks (
+    id INTEGER PRIMARY KEY,
+    project_id INTEGER NOT NULL,
+    assigned_user_id INTEGER,
+    title TEXT NOT NULL,
+    description TEXT,
+    column TEXT NOT NULL,
+    position REAL NOT NULL,
+    created_at TEXT,
+    updated_at TEXT,
+    archived_at TEXT NOT NULL,
+    FOREIGN KEY (project_id) REFERENCES projects (id) ON DELETE CASCADE,
+    FOREIGN KEY (assigned_user_id) REFERENCES users (id) ON DELETE SET NULL
+);
+
+CREATE TABLE IF NOT EXISTS archived_task_tags (
+    task_id INTEGER NOT NULL,
+    tag_id INTEGER NOT NULL,
+    PRIMARY KEY (task_id, tag_id),
+    FOREIGN KEY (task_id) REFERENCES archived_tasks (id) ON DELETE CASCADE,
+    FOREIGN KEY (tag_id) REFERENCES tags (id) ON DELETE CASCADE
+) WITHOUT ROWID;
+
+-- Páginas del archivo de un proyecto, de la más reciente a la más antigua
+CREATE INDEX IF NOT EXISTS idx_archived_tasks_project ON archived_tasks (project_id, archived_at, id);
+-- ON DELETE CASCADE al eliminar una etiqueta
+CREATE INDEX IF NOT EXISTS idx_archived_task_tags_tag ON archived_task_tags (tag_id, task_id);
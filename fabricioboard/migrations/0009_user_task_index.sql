@@ -0,0 +1,4 @@
+-- Tareas asignadas a un usuario en todos los proyectos (GET /api/users/<id>/tasks),
+-- ya en el orden de la respuesta: por proyecto, columna y posición.
+-- También evita recorrer `tasks` en el ON DELETE SET NULL al eliminar un usuario.
+CREATE INDEX IF NOT EXISTS idx_tasks_assigned_user ON tasks (assigned_user_id, project_id, column, position);
@@ -0,0 +1,3 @@
+-- Listado paginado de proyectos del dashboard de administración (ver admin.py),
+-- en orden alfabético sin recorrer ni ordenar la tabla.
+CREATE INDEX IF NOT EXISTS idx_projects_name ON projects (name);
@@ -0,0 +1,9 @@
+-- Versión de los datos de referencia (usuarios y etiquetas) de GET /api/reference:
+-- cada alta o baja la incrementa en su misma transacción (ver reference.py), así
+-- que todos los workers saben cuándo su copia en memoria quedó vieja.
+-- Solo del catálogo: los archivos de los proyectos no la tienen (ver shards.py).
+CREATE TABLE IF NOT EXISTS reference_version (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO reference_version (id, version) VALUES (1, 0);
@@ -0,0 +1,33 @@
+-- El índice de búsqueda guarda también el proyecto de cada tarea (ver search.py):
+-- la búsqueda exige `project_id : "<id>"` dentro del MATCH, así que bm25 solo puntúa
+-- las tareas de ese proyecto en lugar de todas las coincidencias de la base de datos.
+DROP TRIGGER IF EXISTS tasks_fts_insert;
+DROP TRIGGER IF EXISTS tasks_fts_delete;
+DROP TRIGGER IF EXISTS tasks_fts_update;
+DROP TABLE IF EXISTS tasks_fts;
+
+CREATE VIRTUAL TABLE tasks_fts USING fts5(
+    title,
+    description,
+    project_id,
+    content='tasks',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2',
+    prefix='2 3'
+);
+
+CREATE TRIGGER tasks_fts_insert AFTER INSERT ON tasks BEGIN
+    INSERT INTO tasks_fts (rowid, title, description, project_id) VALUES (new.id, new.title, new.description, new.project_id);
+END;
+
+CREATE TRIGGER tasks_fts_delete AFTER DELETE ON tasks BEGIN
+    INSERT INTO tasks_fts (tasks_fts, rowid, title, description, project_id) VALUES ('delete', old.id, old.title, old.description, old.project_id);
+END;
+
+CREATE TRIGGER tasks_fts_update AFTER UPDATE OF title, description, project_id ON tasks BEGIN
+    INSERT INTO tasks_fts (tasks_fts, rowid, title, description, project_id) VALUES ('delete', old.id, old.title, old.description, old.project_id);
+    INSERT INTO tasks_fts (rowid, title, description, project_id) VALUES (new.id, new.title, new.description, new.project_id);
+END;
+
+-- Vuelve a indexar las tareas existentes
+INSERT INTO tasks_fts (tasks_fts) VALUES ('rebuild');
@@ -0,0 +1,214 @@
+# fabricioboard/ordering.py
+
+"""
+Orden de las tarjetas dentro de cada columna con posiciones fraccionarias.
+
+`tasks.position` es un número real. Las tarjetas nuevas se colocan STEP unidades
+después de la última, y una tarjeta movida entre dos vecinas recibe el punto medio
+de sus posiciones. Así, mover o crear una tarjeta escribe exactamente una fila,
+sin importar cuántas tarjetas tenga la columna.
+
+Cada punto medio reduce el hueco a la mitad. Cuando el hueco baja de MIN_GAP se
+programa un rebalanceo de la columna en segundo plano (renumera sus posiciones
+con separación STEP). Solo si la precisión se agota del todo antes de que ocurra,
+el rebalanceo se hace en la misma transacción.
+"""
+
+import threading
+
+from flask import current_app
+
+from .changes import commit_changes, record_change
+from .db import get_db
+
+# Separación entre posiciones al añadir al final o al rebalancear
+STEP = 1024.0
+
+# Por debajo de este hueco entre vecinas se programa un rebalanceo
+MIN_GAP = 1e-6
+
+# Búsquedas dentro de una columna (resueltas por idx_tasks_project_column_position)
+LAST_POSITION_QUERY = (
+    'SELECT MAX(position) AS position FROM tasks '
+    'WHERE project_id = ? AND column = ? AND id IS NOT ?'
+)
+
+NEXT_POSITION_QUERY = (
+    'SELECT MIN(position) AS position FROM tasks '
+    'WHERE project_id = ? AND column = ? AND position > ? AND id IS NOT ?'
+)
+
+PREVIOUS_POSITION_QUERY = (
+    'SELECT MAX(position) AS position FROM tasks '
+    'WHERE project_id = ? AND column = ? AND position < ? AND id IS NOT ?'
+)
+
+TIED_POSITION_QUERY = (
+    'SELECT 1 FROM tasks '
+    'WHERE project_id = ? AND column = ? AND position = ? AND id != ? AND id IS NOT ? LIMIT 1'
+)
+
+INDEX_NEIGHBOURS_QUERY = (
+    'SELECT id FROM tasks WHERE project_id = ? AND column = ? AND id != ? '
+    'ORDER BY position, id LIMIT 1 OFFSET ?'
+)
+
+
+def position_between(before, after):
+    """
+    Devuelve una posición estrictamente entre `before` y `after` (cualquiera puede
+    ser None para indicar el principio o el final), o None si no queda precisión.
+    """
+    if before is None and after is None:
+        return 0.0
+    if before is None:
+        return after - STEP
+    if after is None:
+        return before + STEP
+    middle = (before + after) / 2
+    if not before < middle < after:
+        return None
+    return middle
+
+
+def last_position(db, project_id, column, exclude_id=None):
+    row = db.execute(LAST_POSITION_QUERY, (project_id, column, exclude_id)).fetchone()
+    return row['position']
+
+
+def position_after_last(db, project_id, column):
+    """Posición para una tarjeta nueva al final de la columna."""
+    return position_between(last_position(db, project_id, column), None)
+
+
+def _next_position(db, project_id, column, position, exclude_id):
+    row = db.execute(NEXT_POSITION_QUERY, (project_id, column, position, exclude_id)).fetchone()
+    return row['position']
+
+
+def _previous_position(db, project_id, column, position, exclude_id):
+    row = db.execute(PREVIOUS_POSITION_QUERY, (project_id, column, position, exclude_id)).fetchone()
+    return row['position']
+
+
+def _is_tied(db, project_id, column, position, neighbour_id, exclude_id):
+    row = db.execute(TIED_POSITION_QUERY, (project_id, column, position, neighbour_id, exclude_id)).fetchone()
+    return row is not None
+
+
+def _neighbour(db, neighbour_id, project_id, column):
+    row = db.execute(
+        'SELECT id, project_id, column, position FROM tasks WHERE id = ?', (neighbour_id,)
+    ).fetchone()
+    if row is None or row['project_id'] != project_id or row['column'] != column:
+        raise ValueError(f"La tarea vecina {neighbour_id} no está en la columna '{column}' del proyecto.")
+    return row
+
+
+def position_for_move(db, task, column, before_id=None, after_id=None):
+    """
+    Calcula la nueva posición de `task` (fila con id y project_id) en `column`.
+
+    - before_id: tarjeta que quedará justo ANTES (encima) de la movida.
+    - after_id:  tarjeta que quedará justo DESPUÉS (debajo) de la movida.
+
+    Basta con una de las dos; la otra vecina se busca en la base de datos. Sin
+    ninguna, la tarjeta va al final de la columna. Lanza ValueError si una vecina
+    no pertenece a la columna destino.
+    """
+    project_id, task_id = task['project_id'], task['id']
+    before = _neighbour(db, before_id, project_id, column)['position'] if before_id is not None else None
+    after = _neighbour(db, after_id, project_id, column)['position'] if after_id is not None else None
+
+    if any(
+        neighbour_id is not None and _is_tied(db, project_id, column, position, neighbour_id, task_id)
+        for neighbour_id, position in ((before_id, before), (after_id, after))
+    ):
+        # Otra tarjeta comparte la posición de la vecina (importaciones, datos de ejemplo):
+        # las posiciones no distinguen el orden (position, id) del tablero, así que
+        # rebalanceamos ya y repetimos el cálculo
+        rebalance_column(db, project_id, column)
+        return position_for_move(db, task, column, before_id, after_id)
+
+    if before is not None and (after is None or after <= before):
+        # Si el cliente tenía una vista desactualizada, confiamos en `before`
+        after = _next_position(db, project_id, column, before, task_id)
+    elif before is None and after is not None:
+        before = _previous_position(db, project_id, column, after, task_id)
+    elif before is None:
+        before = last_position(db, project_id, column, exclude_id=task_id)
+
+    position = position_between(before, after)
+    if position is None:
+        # Precisión agotada: rebalanceamos ya y repetimos el cálculo (muy raro)
+        rebalance_column(db, project_id, column)
+        return position_for_move(db, task, column, before_id, after_id)
+
+    if after is not None and before is not None and after - before < MIN_GAP * 2:
+        schedule_rebalance(project_id, column)
+    return position
+
+
+def position_for_index(db, task, column, index):
+    """
+    Traduce un índice dentro de la columna (lo que envía SortableJS) a una posición
+    fraccionaria entre las tarjetas que quedarán alrededor. La vecina se busca en el
+    mismo orden que el tablero (position, id), para que coincida aunque haya empates.
+    """
+    row = db.execute(
+        INDEX_NEIGHBOURS_QUERY, (task['project_id'], column, task['id'], max(index - 1, 0))
+    ).fetchone()
+    neighbour_id = row['id'] if row else None
+    if index <= 0:
+        return position_for_move(db, task, column, after_id=neighbour_id)
+    return position_for_move(db, task, column, before_id=neighbour_id)
+
+
+def rebalance_column(db, project_id, column):
+    """
+    Renumera las posiciones de una columna con separación STEP, conservando el orden.
+    Registra un cambio 'reset' para que los clientes recarguen el tablero. NO hace commit.
+    """
+    if not db.in_transaction:
+        # Leemos el orden ya con el bloqueo de escritura, para no pisar movimientos concurrentes
+        db.execute('BEGIN IMMEDIATE')
+    rows = db.execute(
+        'SELECT id FROM tasks WHERE project_id = ? AND column = ? ORDER BY position, id',
+        (project_id, column)
+    ).fetchall()
+    db.executemany(
+        'UPDATE tasks SET position = ? WHERE id = ?',
+        [(index * STEP, row['id']) for index, row in enumerate(rows)]
+    )
+    record_change(db, project_id, 'reset', data={'column': column})
+    return len(rows)
+
+
+# --- Rebalanceo en segundo plano ---
+
+_scheduled = set()
+_scheduled_lock = threading.Lock()
+
+
+def schedule_rebalance(project_id, column):
+    """Rebalancea la columna en un hilo aparte (una sola vez aunque se pida varias)."""
+    key = (project_id, column)
+    with _scheduled_lock:
+        if key in _scheduled:
+            return
+        _scheduled.add(key)
+
+    app = current_app._get_current_object()
+    threading.Thread(target=_rebalance_in_background, args=(app, key), daemon=True).start()
+
+
+def _rebalance_in_background(app, key):
+    try:
+        with app.app_context():
+            # El proyecto decide el archivo en modo particionado (ver shards.py)
+            db = get_db(key[0])
+            rebalance_column(db, *key)
+            commit_changes(db)
+    finally:
+        with _scheduled_lock:
+            _scheduled.discard(key)
@@ -0,0 +1,248 @@
+# fabricioboard/purge.py
+
+"""
+Eliminación de proyectos por partes y recolección de filas huérfanas.
+
+Borrar un proyecto grande con un solo DELETE (y sus ON DELETE CASCADE) es una única
+transacción que borra decenas de miles de tareas, con sus triggers (búsqueda y
+estadísticas), mientras retiene el bloqueo de escritura: el resto de la aplicación
+no puede escribir hasta que termina. En su lugar:
+
+1. mark_project_deleted marca el proyecto (`projects.deleted_at`) en una transacción
+   mínima: desde ese momento deja de existir para la API, el tablero y el admin, no
+   admite escrituras y su código queda libre para un proyecto nuevo.
+2. Un hilo en segundo plano (schedule_purge) borra sus tareas y etiquetas en lotes de
+   PURGE_CHUNK filas, cada transacción limitada a PROJECT_PURGE_BATCH_MS, con una
+   pausa de PROJECT_PURGE_PAUSE_MS entre transacciones para dejar escribir a los demás.
+3. Al quedar vacío, se borra la fila del proyecto (y con ella su registro de cambios
+   y sus estadísticas).
+
+Si el proceso se reinicia a mitad de una purga, `flask gc-orphans` la termina. Ese
+comando también elimina las tareas cuyo proyecto ya no existe y las filas de
+`task_tags` cuya tarea o etiqueta ya no existe (p. ej. de bases de datos en las que
+las llaves foráneas no estaban activas), mostrando el progreso.
+"""
+
+import threading
+import time
+
+import click
+from flask import current_app
+
+from .db import get_db
+from .shards import drop_project, project_databases, remove_shard_files, shard_files, sharding_enabled
+
+# Filas por sentencia DELETE
+PURGE_CHUNK = 200
+
+# Tablas de tareas de un proyecto y la de sus etiquetas, en el orden en que se purgan
+PURGE_TABLES = (('tasks', 'task_tags'), ('archived_tasks', 'archived_task_tags'))
+
+# Proyectos de los que quedan tareas: los marcados y los que ya no existen
+PENDING_PROJECTS_QUERY = """
+    SELECT id AS project_id FROM projects WHERE deleted_at IS NOT NULL
+    UNION
+    SELECT DISTINCT t.project_id FROM tasks t
+    WHERE NOT EXISTS (SELECT 1 FROM projects p WHERE p.id = t.project_id)
+    UNION
+    SELECT DISTINCT a.project_id FROM archived_tasks a
+    WHERE NOT EXISTS (SELECT 1 FROM projects p WHERE p.id = a.project_id)
+"""
+
+# Siguiente lote de task_tags huérfanas, recorriendo la tabla por rowid
+ORPHAN_TAGS_QUERY = """
+    SELECT tt.rowid FROM task_tags tt
+    WHERE tt.rowid > ?
+      AND (NOT EXISTS (SELECT 1 FROM tasks t WHERE t.id = tt.task_id)
+           OR NOT EXISTS (SELECT 1 FROM tags tg WHERE tg.id = tt.tag_id))
+    ORDER BY tt.rowid
+    LIMIT ?
+"""
+
+
+def mark_project_deleted(db, project_id):
+    """
+    Marca el proyecto como eliminado y libera su código (UNIQUE) para que se pueda
+    crear otro con el mismo mientras este se purga. Devuelve False si no existía.
+    NO hace commit.
+    """
+    result = db.execute(
+        """
+        UPDATE projects SET deleted_at = CURRENT_TIMESTAMP, code = code || '#deleted-' || id
+        WHERE id = ? AND deleted_at IS NULL
+        """,
+        (project_id,)
+    )
+    return result.rowcount > 0
+
+
+def _delete_next_chunk(db, project_id):
+    """Borra hasta PURGE_CHUNK tareas (activas o archivadas) del proyecto. Devuelve cuántas."""
+    for table, tags_table in PURGE_TABLES:
+        task_ids = [
+            row[0] for row in db.execute(f'SELECT id FROM {table} WHERE project_id = ? LIMIT ?', (project_id, PURGE_CHUNK))
+        ]
+        if task_ids:
+            placeholders = ', '.join('?' * len(task_ids))
+            # Primero sus etiquetas: así no dependemos de que foreign_keys esté activo
+            db.execute(f'DELETE FROM {tags_table} WHERE task_id IN ({placeholders})', task_ids)
+            db.execute(f'DELETE FROM {table} WHERE id IN ({placeholders})', task_ids)
+            return len(task_ids)
+    return 0
+
+
+def purge_step(db, project_id, budget):
+    """
+    Borra tareas (activas y archivadas) del proyecto en una transacción de como mucho `budget` segundos
+    (aprox.) y la confirma. Devuelve cuántas borró; 0 significa que ya no quedan y
+    que la fila del proyecto (si existía) también se borró.
+    """
+    deadline = time.monotonic() + budget
+    deleted = 0
+    db.execute('BEGIN IMMEDIATE')
+    try:
+        while True:
+            chunk = _delete_next_chunk(db, project_id)
+            if not chunk:
+                break
+            deleted += chunk
+            if time.monotonic() >= deadline:
+                break
+        if not deleted:
+            db.execute('DELETE FROM board_changes WHERE project_id = ?', (project_id,))
+            db.execute('DELETE FROM column_stats WHERE project_id = ?', (project_id,))
+            db.execute('DELETE FROM column_tag_stats WHERE project_id = ?', (project_id,))
+            db.execute('DELETE FROM projects WHERE id = ?', (project_id,))
+        db.commit()
+    except BaseException:
+        db.rollback()
+        raise
+    return deleted
+
+
+def purge_project(db, project_id, budget, pause, progress=None):
+    """Purga el proyecto completo, paso a paso. `progress(n)` se llama tras cada paso."""
+    total = 0
+    while True:
+        deleted = purge_step(db, project_id, budget)
+        total += deleted
+        if progress is not None:
+            progress(deleted)
+        if not deleted:
+            return total
+        time.sleep(pause)
+
+
+def gc_orphan_tags(db, progress=None):
+    """Borra por lotes las filas de task_tags huérfanas. Devuelve cuántas borró."""
+    total, last_rowid = 0, 0
+    max_rowid = db.execute('SELECT COALESCE(MAX(rowid), 0) FROM task_tags').fetchone()[0]
+    while True:
+        rowids = [row[0] for row in db.execute(ORPHAN_TAGS_QUERY, (last_rowid, PURGE_CHUNK))]
+        if rowids:
+            db.execute(
+                f'DELETE FROM task_tags WHERE rowid IN ({", ".join("?" * len(rowids))})', rowids
+            )
+            db.commit()
+            total += len(rowids)
+        if progress is not None:
+            # El avance se mide en rowids recorridos
+            progress((rowids[-1] if rowids else max_rowid) - last_rowid)
+        if len(rowids) < PURGE_CHUNK:
+            return total
+        last_rowid = rowids[-1]
+
+
+# --- Purga en segundo plano ---
+
+_purging = set()
+_purging_lock = threading.Lock()
+
+
+def schedule_purge(project_id):
+    """Purga el proyecto en un hilo aparte (una sola vez aunque se pida varias)."""
+    with _purging_lock:
+        if project_id in _purging:
+            return
+        _purging.add(project_id)
+
+    app = current_app._get_current_object()
+    threading.Thread(target=_purge_in_background, args=(app, project_id), daemon=True).start()
+
+
+def _purge_in_background(app, project_id):
+    try:
+        with app.app_context():
+            started = time.monotonic()
+            if sharding_enabled(app):
+                # Sus tareas están en su propio archivo: basta con borrarlo
+                total = 0
+                drop_project(get_db(), project_id)
+            else:
+                total = purge_project(
+                    get_db(), project_id,
+                    app.config['PROJECT_PURGE_BATCH_MS'] / 1000,
+                    app.config['PROJECT_PURGE_PAUSE_MS'] / 1000,
+                )
+            app.logger.info('Proyecto %s purgado: %s tareas en %.1f s.',
+                            project_id, total, time.monotonic() - started)
+    except Exception:
+        # La purga se puede retomar con `flask gc-orphans`
+        app.logger.exception('No se pudo purgar el proyecto %s.', project_id)
+    finally:
+        with _purging_lock:
+            _purging.discard(project_id)
+
+
+@click.command('gc-orphans')
+def gc_orphans_command():
+    """Termina las purgas pendientes y borra tareas y etiquetas huérfanas."""
+    db = get_db()
+    budget = current_app.config['PROJECT_PURGE_BATCH_MS'] / 1000
+    pause = current_app.config['PROJECT_PURGE_PAUSE_MS'] / 1000
+
+    if sharding_enabled():
+        _gc_shards(db)
+        return
+
+    projects = [row[0] for row in db.execute(PENDING_PROJECTS_QUERY)]
+    for project_id in projects:
+        remaining = sum(
+            db.execute(f'SELECT COUNT(*) FROM {table} WHERE project_id = ?', (project_id,)).fetchone()[0]
+            for table, _ in PURGE_TABLES
+        )
+        with click.progressbar(length=remaining, label=f'Proyecto {project_id}') as bar:
+            purge_project(db, project_id, budget, pause, progress=bar.update)
+
+    max_rowid = db.execute('SELECT COALESCE(MAX(rowid), 0) FROM task_tags').fetchone()[0]
+    with click.progressbar(length=max_rowid, label='Etiquetas de tareas') as bar:
+        tags = gc_orphan_tags(db, progress=bar.update)
+
+    click.echo(f'{len(projects)} proyecto(s) purgado(s) y {tags} etiqueta(s) de tareas huérfanas eliminadas.')
+
+
+def _gc_shards(db):
+    """gc-orphans en modo particionado (ver shards.py): las purgas pendientes son archivos."""
+    live = {row[0] for row in db.execute('SELECT id FROM projects WHERE deleted_at IS NULL')}
+    projects = [row[0] for row in db.execute('SELECT id FROM projects WHERE deleted_at IS NOT NULL')]
+    for project_id in projects:
+        drop_project(db, project_id)
+    # Archivos de proyectos que ya no están en el catálogo
+    orphans = [project_id for project_id in shard_files() if project_id not in live]
+    for project_id in orphans:
+        remove_shard_files(project_id)
+
+    tags = 0
+    with click.progressbar(length=len(live), label='Etiquetas de tareas') as bar:
+        for shard in project_databases():
+            tags += gc_orphan_tags(shard)
+            bar.update(1)
+
+    click.echo(f'{len(set(projects) | set(orphans))} proyecto(s) purgado(s) y {tags} etiqueta(s) de tareas huérfanas eliminadas.')
+
+
+def init_app(app):
+    # Duración máxima de cada transacción de la purga y pausa entre ellas
+    app.config.setdefault('PROJECT_PURGE_BATCH_MS', 50)
+    app.config.setdefault('PROJECT_PURGE_PAUSE_MS', 20)
+    app.cli.add_command(gc_orphans_command)
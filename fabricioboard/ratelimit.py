@@ -0,0 +1,174 @@
+# fabricioboard/ratelimit.py
+
+"""
+Almacenamiento compartido de los límites de peticiones (Flask-Limiter) sin Redis.
+
+Con el almacenamiento en memoria cada worker de gunicorn lleva sus propios
+contadores, así que un límite de "20 por minuto" se convierte en 20 × workers.
+`SQLiteStorage` guarda los contadores en un archivo SQLite dedicado (en modo WAL)
+que comparten todos los procesos del mismo servidor, sin un salto de red por
+petición. Se registra en la librería `limits` con el esquema `sqlite://`:
+
+    RATELIMIT_STORAGE_URI = 'sqlite:///ruta/absoluta/ratelimit.db'
+
+El archivo solo contiene contadores temporales: puede vivir en un tmpfs
+(p. ej. /dev/shm) y no necesita copias de seguridad.
+
+Soporta las estrategias de ventana fija y de ventana deslizante
+('sliding-window-counter', la que usa la aplicación). Cada comprobación de la
+ventana deslizante se hace en una sola transacción de escritura (BEGIN IMMEDIATE):
+ningún otro proceso puede contar entre la lectura de las ventanas y el incremento,
+así que el límite es exacto incluso con muchos workers a la vez.
+"""
+
+import itertools
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from limits.storage import SlidingWindowCounterSupport, Storage
+from limits.storage.base import TimestampedSlidingWindow
+
+# Cada cuántas escrituras (por proceso) se borran los contadores ya vencidos
+PURGE_EVERY = 1000
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS rate_limits (
+        key TEXT PRIMARY KEY,
+        count INTEGER NOT NULL,
+        expires_at REAL NOT NULL
+    ) WITHOUT ROWID
+"""
+
+# Los contadores vencidos vuelven a empezar en la misma sentencia (atómica)
+INCR_QUERY = """
+    INSERT INTO rate_limits (key, count, expires_at) VALUES (:key, :amount, :now + :expiry)
+    ON CONFLICT (key) DO UPDATE SET
+        count = CASE WHEN expires_at <= :now THEN excluded.count ELSE count + excluded.count END,
+        expires_at = CASE WHEN expires_at <= :now THEN excluded.expires_at ELSE expires_at END
+    RETURNING count
+"""
+
+GET_QUERY = 'SELECT count, expires_at FROM rate_limits WHERE key = ? AND expires_at > ?'
+
+PRAGMAS = {
+    'journal_mode': 'wal',
+    # Perder los últimos contadores en un corte de luz no importa: sin fsync
+    'synchronous': 'off',
+    'busy_timeout': 5000,
+}
+
+
+class SQLiteStorage(Storage, SlidingWindowCounterSupport, TimestampedSlidingWindow):
+    """
+    Contadores de límites en un archivo SQLite compartido por los procesos del servidor.
+    Cada hilo usa su propia conexión, que se abre al primer uso (y de nuevo tras un fork).
+    """
+
+    STORAGE_SCHEME = ['sqlite']
+
+    def __init__(self, uri, wrap_exceptions=False, **options):
+        # sqlite:///ruta/absoluta.db -> /ruta/absoluta.db
+        self.database = uri.split('://', 1)[1]
+        self._local = threading.local()
+        self._writes = itertools.count(1)
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    @property
+    def db(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = self._connect()
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _connect(self):
+        directory = os.path.dirname(self.database)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Sin transacciones implícitas: cada sentencia es atómica y las compuestas usan BEGIN IMMEDIATE
+        conn = sqlite3.connect(self.database, isolation_level=None, check_same_thread=False)
+        for name, value in PRAGMAS.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        conn.execute(SCHEMA)
+        return conn
+
+    def _get(self, key, now):
+        row = self.db.execute(GET_QUERY, (key, now)).fetchone()
+        return row or (0, None)
+
+    def _incr(self, key, expiry, amount, now):
+        count = self.db.execute(
+            INCR_QUERY, {'key': key, 'amount': amount, 'now': now, 'expiry': expiry}
+        ).fetchone()[0]
+        if next(self._writes) % PURGE_EVERY == 0:
+            self.db.execute('DELETE FROM rate_limits WHERE expires_at <= ?', (now,))
+        return count
+
+    # --- Ventana fija ---
+
+    def incr(self, key, expiry, amount=1):
+        return self._incr(key, expiry, amount, time.time())
+
+    def get(self, key):
+        return self._get(key, time.time())[0]
+
+    def get_expiry(self, key):
+        now = time.time()
+        return self._get(key, now)[1] or now
+
+    def clear(self, key):
+        self.db.execute('DELETE FROM rate_limits WHERE key = ?', (key,))
+
+    def reset(self):
+        return self.db.execute('DELETE FROM rate_limits').rowcount
+
+    def check(self):
+        try:
+            self.db.execute('SELECT 1')
+        except sqlite3.Error:
+            return False
+        return True
+
+    # --- Ventana deslizante ---
+
+    def _sliding_window(self, key, expiry, now):
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        previous_count = self._get(previous_key, now)[0]
+        current_count = self._get(current_key, now)[0]
+        # Fracción de la ventana anterior que todavía se solapa con la deslizante
+        previous_ttl = (1 - (((now - expiry) / expiry) % 1)) * expiry if previous_count else 0.0
+        current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+        return previous_count, previous_ttl, current_count, current_ttl
+
+    def acquire_sliding_window_entry(self, key, limit, expiry, amount=1):
+        if amount > limit:
+            return False
+        db = self.db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            now = time.time()
+            previous_count, previous_ttl, current_count, _ = self._sliding_window(key, expiry, now)
+            weighted_count = previous_count * previous_ttl / expiry + current_count
+            acquired = math.floor(weighted_count) + amount <= limit
+            if acquired:
+                # El contador de la ventana actual sigue contando durante la siguiente
+                self._incr(self.sliding_window_keys(key, expiry, now)[1], 2 * expiry, amount, now)
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        return acquired
+
+    def get_sliding_window(self, key, expiry):
+        return self._sliding_window(key, expiry, time.time())
+
+    def clear_sliding_window(self, key, expiry):
+        for window_key in self.sliding_window_keys(key, expiry, time.time()):
+            self.clear(window_key)
@@ -0,0 +1,58 @@
+# fabricioboard/reference.py
+
+"""
+Datos de referencia: todos los usuarios y etiquetas (GET /api/reference).
+
+El tablero los necesita completos (el modal de una tarea permite asignar cualquier
+usuario y cualquier etiqueta, no solo los que ya aparecen en las tarjetas), pero
+cambian muy poco. Por eso:
+
+- La tabla `reference_version` guarda una versión global que cada alta o baja de
+  un usuario o una etiqueta incrementa con bump_reference_version, dentro de su
+  misma transacción.
+- Cada worker guarda el JSON ya serializado con su versión (reference_cache, ver
+  cache.py) y lo reconstruye solo cuando la versión de la base de datos cambia.
+- El ETag es la versión: el navegador revalida con If-None-Match y recibe un 304
+  sin cuerpo mientras no haya cambios.
+
+Con particionado (ver shards.py), los usuarios y etiquetas viven en el catálogo.
+"""
+
+from flask import jsonify
+
+from .extensions import reference_cache
+
+REFERENCE_VERSION_QUERY = 'SELECT version FROM reference_version WHERE id = 1'
+
+
+def get_reference_version(db):
+    return db.execute(REFERENCE_VERSION_QUERY).fetchone()['version']
+
+
+def bump_reference_version(db):
+    """Marca que cambiaron los usuarios o las etiquetas. NO hace commit."""
+    db.execute('UPDATE reference_version SET version = version + 1 WHERE id = 1')
+
+
+def build_reference(db, version):
+    return {
+        'version': version,
+        'users': [dict(row) for row in db.execute('SELECT id, username, full_name FROM users ORDER BY username ASC')],
+        'tags': [dict(row) for row in db.execute('SELECT id, name, color FROM tags ORDER BY name ASC')],
+    }
+
+
+def get_reference_body(db, version=None):
+    """
+    Devuelve (versión, cuerpo JSON en bytes), desde la caché del worker si ya tiene
+    la versión actual.
+    """
+    if version is None:
+        version = get_reference_version(db)
+    body = reference_cache.get(version)
+    if body is None:
+        # La versión se lee antes que las filas: si cambian entretanto, la próxima
+        # petición verá una versión más nueva y volverá a construir el cuerpo
+        body = jsonify(build_reference(db, version)).get_data()
+        reference_cache.set(version, body)
+    return version, body
@@ -1,7 +1,10 @@
 CREATE TABLE projects (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     code TEXT NOT NULL UNIQUE,
-    name TEXT NOT NULL
+    name TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0,
+    changes_floor INTEGER NOT NULL DEFAULT 0,
+    deleted_at TEXT
 );
 
 CREATE TABLE users (
@@ -24,7 +27,9 @@ CREATE TABLE tasks (
     title TEXT NOT NULL,
     description TEXT,
     column TEXT NOT NULL,
-    position INTEGER NOT NULL,
+    position REAL NOT NULL,
+    created_at TEXT,
+    updated_at TEXT,
     FOREIGN KEY (project_id) REFERENCES projects (id) ON DELETE CASCADE,
     FOREIGN KEY (assigned_user_id) REFERENCES users (id) ON DELETE SET NULL
 );
@@ -35,4 +40,177 @@ CREATE TABLE task_tags (
     PRIMARY KEY (task_id, tag_id),
     FOREIGN KEY (task_id) REFERENCES tasks (id) ON DELETE CASCADE,
     FOREIGN KEY (tag_id) REFERENCES tags (id) ON DELETE CASCADE
-);
\ No newline at end of file
+);
+
+-- Registro de cambios por proyecto (ver changes.py)
+CREATE TABLE board_changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    project_id INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    task_id INTEGER,
+    data TEXT,
+    FOREIGN KEY (project_id) REFERENCES projects (id) ON DELETE CASCADE
+);
+
+CREATE INDEX idx_board_changes_project ON board_changes (project_id, seq);
+
+-- Índices de las consultas calientes (ver migrations/)
+CREATE INDEX idx_tasks_project_position ON tasks (project_id, position);
+CREATE INDEX idx_tasks_project_column_position ON tasks (project_id, column, position);
+CREATE INDEX idx_task_tags_tag ON task_tags (tag_id, task_id);
+CREATE INDEX idx_tasks_assigned_user ON tasks (assigned_user_id, project_id, column, position);
+CREATE INDEX idx_projects_name ON projects (name);
+
+-- Búsqueda de texto completo (ver search.py y migrations/0005_task_search.sql, 0012_task_search_project.sql)
+CREATE VIRTUAL TABLE tasks_fts USING fts5(
+    title,
+    description,
+    project_id,
+    content='tasks',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2',
+    prefix='2 3'
+);
+
+CREATE TRIGGER tasks_fts_insert AFTER INSERT ON tasks BEGIN
+    INSERT INTO tasks_fts (rowid, title, description, project_id) VALUES (new.id, new.title, new.description, new.project_id);
+END;
+
+CREATE TRIGGER tasks_fts_delete AFTER DELETE ON tasks BEGIN
+    INSERT INTO tasks_fts (tasks_fts, rowid, title, description, project_id) VALUES ('delete', old.id, old.title, old.description, old.project_id);
+END;
+
+CREATE TRIGGER tasks_fts_update AFTER UPDATE OF title, description, project_id ON tasks BEGIN
+    INSERT INTO tasks_fts (tasks_fts, rowid, title, description, project_id) VALUES ('delete', old.id, old.title, old.description, old.project_id);
+    INSERT INTO tasks_fts (rowid, title, description, project_id) VALUES (new.id, new.title, new.description, new.project_id);
+END;
+
+-- Estadísticas materializadas por proyecto y columna (ver stats.py y migrations/0006_column_stats.sql).
+-- Las filas con contador 0 se eliminan: una columna o etiqueta sin tareas no aparece.
+CREATE TABLE column_stats (
+    project_id INTEGER NOT NULL,
+    column TEXT NOT NULL,
+    task_count INTEGER NOT NULL,
+    unassigned_count INTEGER NOT NULL,
+    PRIMARY KEY (project_id, column),
+    FOREIGN KEY (project_id) REFERENCES projects (id) ON DELETE CASCADE
+) WITHOUT ROWID;
+
+CREATE TABLE column_tag_stats (
+    project_id INTEGER NOT NULL,
+    column TEXT NOT NULL,
+    tag_id INTEGER NOT NULL,
+    task_count INTEGER NOT NULL,
+    PRIMARY KEY (project_id, column, tag_id),
+    FOREIGN KEY (project_id) REFERENCES projects (id) ON DELETE CASCADE
+) WITHOUT ROWID;
+
+-- Triggers que mantienen los contadores en la misma transacción de cada escritura
+-- sobre `tasks` y `task_tags` (también las de los ON DELETE CASCADE / SET NULL).
+CREATE TRIGGER tasks_stats_insert AFTER INSERT ON tasks BEGIN
+    INSERT INTO column_stats (project_id, column, task_count, unassigned_count)
+    VALUES (new.project_id, new.column, 1, new.assigned_user_id IS NULL)
+    ON CONFLICT (project_id, column) DO UPDATE SET
+        task_count = task_count + 1,
+        unassigned_count = unassigned_count + excluded.unassigned_count;
+END;
+
+CREATE TRIGGER tasks_stats_delete AFTER DELETE ON tasks BEGIN
+    UPDATE column_stats
+    SET task_count = task_count - 1, unassigned_count = unassigned_count - (old.assigned_user_id IS NULL)
+    WHERE project_id = old.project_id AND column = old.column;
+    DELETE FROM column_stats WHERE project_id = old.project_id AND column = old.column AND task_count = 0;
+END;
+
+-- BEFORE: cuando se borra la tarea, sus filas de task_tags todavía existen
+-- (el ON DELETE CASCADE las borra después, y entonces la tarea ya no está).
+CREATE TRIGGER tasks_tag_stats_delete BEFORE DELETE ON tasks BEGIN
+    UPDATE column_tag_stats SET task_count = task_count - 1
+    WHERE project_id = old.project_id AND column = old.column
+      AND tag_id IN (SELECT tag_id FROM task_tags WHERE task_id = old.id);
+    DELETE FROM column_tag_stats WHERE project_id = old.project_id AND column = old.column AND task_count = 0;
+END;
+
+CREATE TRIGGER tasks_stats_update AFTER UPDATE OF project_id, column, assigned_user_id ON tasks
+WHEN old.project_id IS NOT new.project_id OR old.column IS NOT new.column
+  OR (old.assigned_user_id IS NULL) IS NOT (new.assigned_user_id IS NULL)
+BEGIN
+    UPDATE column_stats
+    SET task_count = task_count - 1, unassigned_count = unassigned_count - (old.assigned_user_id IS NULL)
+    WHERE project_id = old.project_id AND column = old.column;
+    INSERT INTO column_stats (project_id, column, task_count, unassigned_count)
+    VALUES (new.project_id, new.column, 1, new.assigned_user_id IS NULL)
+    ON CONFLICT (project_id, column) DO UPDATE SET
+        task_count = task_count + 1,
+        unassigned_count = unassigned_count + excluded.unassigned_count;
+    DELETE FROM column_stats WHERE project_id = old.project_id AND column = old.column AND task_count = 0;
+END;
+
+CREATE TRIGGER tasks_tag_stats_update AFTER UPDATE OF project_id, column ON tasks
+WHEN old.project_id IS NOT new.project_id OR old.column IS NOT new.column
+BEGIN
+    UPDATE column_tag_stats SET task_count = task_count - 1
+    WHERE project_id = old.project_id AND column = old.column
+      AND tag_id IN (SELECT tag_id FROM task_tags WHERE task_id = new.id);
+    DELETE FROM column_tag_stats WHERE project_id = old.project_id AND column = old.column AND task_count = 0;
+    INSERT INTO column_tag_stats (project_id, column, tag_id, task_count)
+    SELECT new.project_id, new.column, tag_id, 1 FROM task_tags WHERE task_id = new.id
+    ON CONFLICT (project_id, column, tag_id) DO UPDATE SET task_count = task_count + 1;
+END;
+
+CREATE TRIGGER task_tags_stats_insert AFTER INSERT ON task_tags BEGIN
+    INSERT INTO column_tag_stats (project_id, column, tag_id, task_count)
+    SELECT project_id, column, new.tag_id, 1 FROM tasks WHERE id = new.task_id
+    ON CONFLICT (project_id, column, tag_id) DO UPDATE SET task_count = task_count + 1;
+END;
+
+-- Si la tarea ya no existe (se está borrando), tasks_tag_stats_delete ya descontó la etiqueta
+CREATE TRIGGER task_tags_stats_delete AFTER DELETE ON task_tags BEGIN
+    UPDATE column_tag_stats SET task_count = task_count - 1
+    WHERE (project_id, column) = (SELECT project_id, column FROM tasks WHERE id = old.task_id)
+      AND tag_id = old.tag_id;
+    DELETE FROM column_tag_stats
+    WHERE (project_id, column) = (SELECT project_id, column FROM tasks WHERE id = old.task_id)
+      AND tag_id = old.tag_id AND task_count = 0;
+END;
+
+-- Tareas terminadas archivadas (ver archive.py y migrations/0008_task_archive.sql)
+CREATE TABLE archived_tasks (
+    id INTEGER PRIMARY KEY,
+    project_id INTEGER NOT NULL,
+    assigned_user_id INTEGER,
+    title TEXT NOT NULL,
+    description TEXT,
+    column TEXT NOT NULL,
+    position REAL NOT NULL,
+    created_at TEXT,
+    updated_at TEXT,
+    archived_at TEXT NOT NULL,
+    FOREIGN KEY (project_id) REFERENCES projects (id) ON DELETE CASCADE,
+    FOREIGN KEY (assigned_user_id) REFERENCES users (id) ON DELETE SET NULL
+);
+
+CREATE TABLE archived_task_tags (
+    task_id INTEGER NOT NULL,
+    tag_id INTEGER NOT NULL,
+    PRIMARY KEY (task_id, tag_id),
+    FOREIGN KEY (task_id) REFERENCES archived_tasks (id) ON DELETE CASCADE,
+    FOREIGN KEY (tag_id) REFERENCES tags (id) ON DELETE CASCADE
+) WITHOUT ROWID;
+
+CREATE INDEX idx_archived_tasks_project ON archived_tasks (project_id, archived_at, id);
+CREATE INDEX idx_archived_task_tags_tag ON archived_task_tags (tag_id, task_id);
+
+-- Versión de los usuarios y etiquetas para GET /api/reference (ver reference.py)
+CREATE TABLE reference_version (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL
+);
+INSERT INTO reference_version (id, version) VALUES (1, 0);
+
+-- Migraciones aplicadas (ver migrate.py)
+CREATE TABLE schema_version (
+    version INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    applied_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
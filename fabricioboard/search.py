@@ -0,0 +1,124 @@
+# fabricioboard/search.py
+
+"""
+Búsqueda de texto completo en las tareas de un proyecto.
+
+`tasks_fts` es un índice FTS5 de contenido externo sobre `tasks.title` y
+`tasks.description`, mantenido por triggers (ver migrations/0005_task_search.sql),
+así que cualquier escritura sobre `tasks` lo actualiza en la misma transacción.
+
+El índice es uno para todos los proyectos, así que también indexa `project_id`
+(migrations/0012_task_search_project.sql) y la consulta lo exige dentro del MATCH:
+bm25 solo puntúa las tareas del proyecto, no todas las coincidencias de la base de
+datos. Esa columna pesa 0 en la relevancia y no aparece en los fragmentos.
+
+Los resultados se ordenan por relevancia (bm25, con más peso para el título) y
+cada uno trae un fragmento del texto con los términos encontrados resaltados.
+"""
+
+import html
+import re
+
+import click
+
+from .shards import project_databases
+
+# Peso de cada columna del índice en bm25: una coincidencia en el título cuenta más
+# (la del proyecto solo filtra)
+TITLE_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+PROJECT_WEIGHT = 0.0
+
+# Tokens del texto de búsqueda (se ignoran los operadores y la puntuación)
+TOKEN = re.compile(r'\w+', re.UNICODE)
+
+# Marcadores internos del fragmento; se sustituyen por <mark> tras escapar el texto
+MARK_START = '\x02'
+MARK_END = '\x03'
+
+SEARCH_QUERY = f"""
+    SELECT t.id, t.title, t.column, t.assigned_user_id,
+           snippet(tasks_fts, -1, '{MARK_START}', '{MARK_END}', '…', 12) AS snippet
+    FROM tasks_fts
+    JOIN tasks t ON t.id = tasks_fts.rowid
+    WHERE tasks_fts MATCH ?
+    ORDER BY bm25(tasks_fts, {TITLE_WEIGHT}, {DESCRIPTION_WEIGHT}, {PROJECT_WEIGHT}), t.id
+    LIMIT ? OFFSET ?
+"""
+
+
+def build_match_query(text, project_id):
+    """
+    Convierte el texto del usuario en una consulta FTS5 segura sobre un proyecto:
+    cada palabra entre comillas (deben aparecer todas, en el título o la descripción)
+    y la última como prefijo, para buscar mientras se escribe. Devuelve None si el
+    texto no tiene ninguna palabra.
+    """
+    tokens = TOKEN.findall(text)
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += '*'
+    return f'project_id : "{int(project_id)}" AND {{title description}} : ({" ".join(terms)})'
+
+
+def highlight(snippet):
+    """Escapa el fragmento para HTML y marca los términos encontrados con <mark>."""
+    escaped = html.escape(snippet or '')
+    return escaped.replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+
+
+def search_tasks(db, project_id, text, limit, offset=0):
+    """
+    Busca `text` en las tareas del proyecto. Devuelve una lista de resultados
+    ordenados por relevancia, con hasta `limit` elementos a partir de `offset`.
+    """
+    match = build_match_query(text, project_id)
+    if match is None:
+        return []
+    rows = db.execute(SEARCH_QUERY, (match, limit, offset)).fetchall()
+    return [
+        {
+            'id': row['id'],
+            'title': row['title'],
+            'column': row['column'],
+            'assigned_user_id': row['assigned_user_id'],
+            'snippet': highlight(row['snippet']),
+        }
+        for row in rows
+    ]
+
+
+def rebuild_index(db, optimize=True):
+    """Reconstruye el índice completo desde la tabla `tasks`. NO hace commit."""
+    db.execute("INSERT INTO tasks_fts (tasks_fts) VALUES ('rebuild')")
+    if optimize:
+        # Compacta los segmentos del índice tras la reconstrucción
+        db.execute("INSERT INTO tasks_fts (tasks_fts) VALUES ('optimize')")
+
+
+def index_project(db, project_id):
+    """Indexa de una vez las tareas de un proyecto cargado sin triggers. NO hace commit."""
+    db.execute(
+        """
+        INSERT INTO tasks_fts (rowid, title, description, project_id)
+        SELECT id, title, description, project_id FROM tasks WHERE project_id = ?
+        """,
+        (project_id,)
+    )
+
+
+@click.command('search-rebuild')
+def search_rebuild_command():
+    """Reconstruye el índice de búsqueda de tareas."""
+    total = 0
+    # Con particionado, cada archivo de proyecto tiene su índice (ver shards.py)
+    for db in project_databases():
+        rebuild_index(db)
+        db.commit()
+        total += db.execute('SELECT COUNT(*) FROM tasks').fetchone()[0]
+    click.echo(f'Índice de búsqueda reconstruido ({total} tareas).')
+
+
+def init_app(app):
+    app.cli.add_command(search_rebuild_command)
@@ -0,0 +1,422 @@
+# fabricioboard/shards.py
+
+"""
+Particionado opcional por proyecto (SHARDING_ENABLED): un archivo SQLite por tablero.
+
+SQLite admite un solo escritor por archivo. Con una única `instance/database.db`,
+una edición en cualquier tablero espera a las de todos los demás, y un tablero muy
+activo frena a equipos que no tienen nada que ver. Con el particionado:
+
+- DATABASE es el catálogo: proyectos, usuarios y etiquetas.
+- Las tareas de cada proyecto (con sus etiquetas, su archivo, su registro de cambios
+  y sus estadísticas) viven en SHARD_DIR/project_<id>.db, creado con shard.sql, junto
+  con una copia de la fila del proyecto donde se lleva la versión del tablero. Cada
+  escritura solo bloquea el archivo de su proyecto.
+- Cada conexión a un proyecto adjunta el catálogo como `catalog`. SQLite busca los
+  nombres sin esquema primero en el archivo del proyecto y después en el catálogo,
+  así que las consultas que unen `users` o `tags` no cambian. Desde esas conexiones
+  el catálogo solo se lee.
+- Las llaves foráneas no cruzan archivos: al eliminar un usuario o una etiqueta el
+  admin actualiza cada proyecto (ver admin.py), y `flask shard-check` busca las
+  referencias rotas.
+- Los ids de tarea llevan el proyecto en los bits altos (project_id <<
+  SHARD_TASK_ID_BITS), de modo que /api/tasks/<id> sabe a qué archivo ir sin
+  consultar ninguna tabla.
+
+Las vistas obtienen su conexión con db_for_code, db_for_project o db_for_task, y
+recorren todos los proyectos con project_databases. Sin particionado todas ellas
+devuelven la conexión de siempre, sin consultas adicionales.
+
+`flask shard-split` convierte una base de datos existente (con la aplicación
+detenida) y `flask shard-check` comprueba la coherencia entre el catálogo y los
+archivos de los proyectos (`--repair` corrige lo que se puede corregir).
+
+La cola de escrituras (WRITE_QUEUE_ENABLED) no se combina con el particionado, y
+`flask seed` e `import-project` trabajan sobre la base de datos sin particionar.
+"""
+
+import os
+import re
+import sqlite3
+import time
+
+import click
+from flask import current_app
+
+from .changes import commit_changes, record_change
+from .db import discard_shard_pool, get_db, release_db, shard_path
+
+# Bits bajos del id de una tarea; los altos son su proyecto. Con 32 bits, los ids
+# siguen siendo enteros exactos en JavaScript hasta el proyecto 2**21.
+SHARD_TASK_ID_BITS = 32
+
+MAX_SHARDED_PROJECT_ID = 2 ** (53 - SHARD_TASK_ID_BITS)
+
+SHARD_FILE_PATTERN = re.compile(r'^project_(\d+)\.db$')
+
+LIVE_PROJECT_QUERY = 'SELECT id FROM projects WHERE id = ? AND deleted_at IS NULL'
+
+# Migraciones que solo afectan al catálogo: en los archivos de los proyectos se
+# marcan como aplicadas sin ejecutarlas. Una tabla con el mismo nombre en el archivo
+# de un proyecto ocultaría la del catálogo en las consultas sin esquema.
+CATALOG_MIGRATIONS = {'reference_version'}
+
+# Tablas de tareas que shard-split copia a cada proyecto, con la de sus etiquetas
+SPLIT_TABLES = (
+    ('tasks', 'task_tags'),
+    ('archived_tasks', 'archived_task_tags'),
+)
+
+
+def sharding_enabled(app=None):
+    return (app or current_app).config['SHARDING_ENABLED']
+
+
+def task_project_id(task_id):
+    """Proyecto al que pertenece una tarea en modo particionado."""
+    return task_id >> SHARD_TASK_ID_BITS
+
+
+def db_for_project(project_id):
+    """
+    Conexión con las tareas del proyecto. Con particionado devuelve None si el
+    proyecto no existe o está eliminado (así nunca se abre un archivo que no existe).
+    """
+    if not sharding_enabled():
+        return get_db()
+    if not isinstance(project_id, int) or isinstance(project_id, bool):
+        return None
+    if get_db().execute(LIVE_PROJECT_QUERY, (project_id,)).fetchone() is None:
+        return None
+    return get_db(project_id)
+
+
+def db_for_code(project_code):
+    """Como db_for_project, a partir del código del proyecto."""
+    if not sharding_enabled():
+        return get_db()
+    project = get_db().execute(
+        'SELECT id FROM projects WHERE code = ? AND deleted_at IS NULL', (project_code,)
+    ).fetchone()
+    return get_db(project['id']) if project is not None else None
+
+
+def db_for_task(task_id):
+    """Como db_for_project, para el proyecto de una tarea (activa o archivada)."""
+    if not sharding_enabled():
+        return get_db()
+    return db_for_project(task_project_id(task_id))
+
+
+def project_databases(first_project_id=0):
+    """
+    Recorre las conexiones que contienen los proyectos activos con id >=
+    `first_project_id`, en orden de id. Sin particionado es solo la conexión
+    principal. Con particionado, cada conexión se devuelve al pool al pasar a la
+    siguiente: quien escribe debe confirmar antes.
+    """
+    if not sharding_enabled():
+        yield get_db()
+        return
+    project_ids = [
+        row[0] for row in get_db().execute(
+            'SELECT id FROM projects WHERE deleted_at IS NULL AND id >= ? ORDER BY id', (first_project_id,)
+        )
+    ]
+    for project_id in project_ids:
+        try:
+            yield get_db(project_id)
+        finally:
+            release_db(project_id)
+
+
+def shard_migrations():
+    """Migraciones de los archivos de los proyectos (ver migrate.load_migrations)."""
+    from .migrate import load_migrations
+
+    return [
+        (number, name, '' if name in CATALOG_MIGRATIONS else sql)
+        for number, name, sql in load_migrations()
+    ]
+
+
+def create_shard(project_id, code, name):
+    """Crea el archivo (vacío) de un proyecto nuevo. Falla si ya existe."""
+    from .migrate import stamp
+
+    if project_id >= MAX_SHARDED_PROJECT_ID:
+        raise ValueError(f'El id de proyecto {project_id} no admite ids de tarea particionados.')
+    path = shard_path(project_id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if os.path.exists(path):
+        raise FileExistsError(f'Ya existe el archivo del proyecto {project_id}: {path}')
+
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute('PRAGMA journal_mode = wal')
+        with current_app.open_resource('shard.sql') as f:
+            conn.executescript(f.read().decode('utf8'))
+        stamp(conn)
+        conn.execute('INSERT INTO projects (id, code, name) VALUES (?, ?, ?)', (project_id, code, name))
+        # Los ids de sus tareas empiezan en project_id << SHARD_TASK_ID_BITS
+        conn.execute(
+            "INSERT INTO sqlite_sequence (name, seq) VALUES ('tasks', ?)", (project_id << SHARD_TASK_ID_BITS,)
+        )
+        conn.commit()
+    except BaseException:
+        conn.close()
+        remove_shard_files(project_id)
+        raise
+    conn.close()
+
+
+def remove_shard_files(project_id):
+    """Borra el archivo de un proyecto (y su WAL), cerrando antes las conexiones del pool."""
+    discard_shard_pool(project_id)
+    path = shard_path(project_id)
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def drop_project(db, project_id):
+    """
+    Purga un proyecto en modo particionado: basta con borrar su archivo, sin
+    transacciones largas. Después borra su fila del catálogo (y hace commit).
+    """
+    remove_shard_files(project_id)
+    db.execute('DELETE FROM projects WHERE id = ?', (project_id,))
+    db.commit()
+
+
+def shard_files(app=None):
+    """{project_id: nombre de archivo} de los archivos de proyecto en SHARD_DIR."""
+    directory = (app or current_app).config['SHARD_DIR']
+    if not os.path.isdir(directory):
+        return {}
+    files = {}
+    for name in os.listdir(directory):
+        match = SHARD_FILE_PATTERN.match(name)
+        if match:
+            files[int(match.group(1))] = name
+    return files
+
+
+# --- División de una base de datos existente ---
+
+def split_project(db, project):
+    """
+    Copia las tareas del proyecto (activas y archivadas, con sus etiquetas) desde el
+    catálogo a su archivo nuevo. Los ids se desplazan a project_id << SHARD_TASK_ID_BITS;
+    el registro de cambios no se copia (tiene los ids anteriores): se registra un
+    'reset' para que los clientes recarguen el tablero. Devuelve cuántas tareas copió.
+    """
+    from .bulk import bulk_load
+    from .search import rebuild_index
+    from .stats import rebuild_stats
+
+    project_id = project['id']
+    offset = project_id << SHARD_TASK_ID_BITS
+    create_shard(project_id, project['code'], project['name'])
+    shard = get_db(project_id)
+    with bulk_load(shard):
+        for table, tags_table in SPLIT_TABLES:
+            extra = ', archived_at' if table == 'archived_tasks' else ''
+            shard.execute(
+                f"""
+                INSERT INTO {table} (id, project_id, assigned_user_id, title, description, column,
+                                     position, created_at, updated_at{extra})
+                SELECT id + ?, project_id,
+                       -- Las referencias rotas (de antes de las llaves foráneas) se descartan
+                       (SELECT u.id FROM catalog.users u WHERE u.id = assigned_user_id),
+                       title, description, column, position, created_at, updated_at{extra}
+                FROM catalog.{table} WHERE project_id = ?
+                """,
+                (offset, project_id)
+            )
+            shard.execute(
+                f"""
+                INSERT INTO {tags_table} (task_id, tag_id)
+                SELECT tt.task_id + ?, tt.tag_id
+                FROM catalog.{tags_table} tt
+                JOIN catalog.{table} t ON t.id = tt.task_id
+                JOIN catalog.tags tg ON tg.id = tt.tag_id
+                WHERE t.project_id = ?
+                """,
+                (offset, project_id)
+            )
+        rebuild_index(shard, optimize=False)
+        rebuild_stats(shard)
+        # La versión continúa desde la del catálogo: los ETag anteriores no vuelven a coincidir
+        shard.execute(
+            'UPDATE projects SET version = ?, changes_floor = ? WHERE id = ?',
+            (project['version'], project['version'], project_id)
+        )
+        shard.execute(
+            "INSERT INTO sqlite_sequence (name, seq) VALUES ('board_changes', ?)", (project['version'],)
+        )
+    record_change(shard, project_id, 'reset')
+    commit_changes(shard)
+    total = shard.execute('SELECT COUNT(*) FROM tasks').fetchone()[0]
+    release_db(project_id)
+    return total
+
+
+def clear_catalog_tasks(db):
+    """Vacía las tablas de tareas del catálogo tras repartirlas (y hace commit)."""
+    from .bulk import bulk_load
+
+    with bulk_load(db):
+        for table, tags_table in reversed(SPLIT_TABLES):
+            db.execute(f'DELETE FROM {tags_table}')
+            db.execute(f'DELETE FROM {table}')
+        for table in ('board_changes', 'column_stats', 'column_tag_stats'):
+            db.execute(f'DELETE FROM {table}')
+        db.execute("INSERT INTO tasks_fts (tasks_fts) VALUES ('delete-all')")
+        # Los proyectos eliminados pendientes de purga ya no tienen tareas
+        db.execute('DELETE FROM projects WHERE deleted_at IS NOT NULL')
+
+
+@click.command('shard-split')
+@click.option('--vacuum', is_flag=True, help='Compacta el catálogo al terminar.')
+def shard_split_command(vacuum):
+    """Reparte las tareas de la base de datos en un archivo por proyecto."""
+    if not sharding_enabled():
+        raise click.ClickException('Activa SHARDING_ENABLED en la configuración antes de dividir la base de datos.')
+    db = get_db()
+    existing = shard_files()
+    if existing:
+        raise click.ClickException(
+            f"{current_app.config['SHARD_DIR']} ya contiene {len(existing)} archivo(s) de proyecto."
+        )
+    max_id = max(
+        db.execute(f'SELECT COALESCE(MAX(id), 0) FROM {table}').fetchone()[0] for table, _ in SPLIT_TABLES
+    )
+    if max_id >= 1 << SHARD_TASK_ID_BITS:
+        raise click.ClickException(f'Hay ids de tarea demasiado grandes para particionar ({max_id}).')
+
+    projects = db.execute(
+        'SELECT id, code, name, version FROM projects WHERE deleted_at IS NULL ORDER BY id'
+    ).fetchall()
+    start = time.perf_counter()
+    total = 0
+    try:
+        with click.progressbar(projects, label='Proyectos') as bar:
+            for project in bar:
+                total += split_project(db, project)
+        clear_catalog_tasks(db)
+    except BaseException:
+        # El catálogo sigue intacto: basta con quitar los archivos creados
+        for project_id in shard_files():
+            remove_shard_files(project_id)
+        raise
+
+    if vacuum:
+        db.execute('VACUUM')
+    click.echo(
+        f'{len(projects)} proyecto(s) y {total} tareas repartidos en {time.perf_counter() - start:.1f} s.'
+    )
+
+
+# --- Comprobación de integridad ---
+
+def check_shards(db, repair=False):
+    """
+    Comprueba el catálogo y los archivos de los proyectos. Devuelve la lista de
+    problemas encontrados; con `repair` corrige los que tienen arreglo seguro (y
+    los marca como reparados). Las tareas con referencias corregidas se notifican
+    a los clientes con un 'reset'.
+    """
+    problems = []
+    projects = {
+        row['id']: row for row in db.execute('SELECT id, code, name FROM projects WHERE deleted_at IS NULL')
+    }
+    files = shard_files()
+    suffix = ' (reparado)' if repair else ''
+
+    for table, tags_table in SPLIT_TABLES:
+        for name in (table, tags_table):
+            count = db.execute(f'SELECT COUNT(*) FROM {name}').fetchone()[0]
+            if count:
+                problems.append(f'El catálogo todavía tiene {count} fila(s) en {name}.')
+
+    for project_id in sorted(set(files) - set(projects)):
+        problems.append(f'{files[project_id]}: no corresponde a ningún proyecto activo{suffix}.')
+        if repair:
+            drop_project(db, project_id)
+
+    for project_id, project in sorted(projects.items()):
+        label = f"Proyecto {project_id} ({project['code']})"
+        if project_id not in files:
+            problems.append(f'{label}: falta su archivo{suffix}.')
+            if repair:
+                create_shard(project_id, project['code'], project['name'])
+            continue
+
+        shard = get_db(project_id)
+        fixed = 0
+        rows = shard.execute('SELECT id, code, name FROM projects').fetchall()
+        if [tuple(row) for row in rows] != [(project_id, project['code'], project['name'])]:
+            problems.append(f'{label}: la copia de la fila del proyecto no coincide con el catálogo{suffix}.')
+            if repair:
+                # Sin borrar filas: el ON DELETE CASCADE se llevaría sus tareas
+                shard.execute(
+                    """
+                    INSERT INTO projects (id, code, name) VALUES (?, ?, ?)
+                    ON CONFLICT (id) DO UPDATE SET code = excluded.code, name = excluded.name
+                    """,
+                    (project_id, project['code'], project['name'])
+                )
+
+        for table, tags_table in SPLIT_TABLES:
+            misplaced = shard.execute(
+                f'SELECT COUNT(*) FROM {table} WHERE project_id != ? OR (id >> ?) != ?',
+                (project_id, SHARD_TASK_ID_BITS, project_id)
+            ).fetchone()[0]
+            if misplaced:
+                problems.append(f'{label}: {misplaced} fila(s) de {table} de otro proyecto.')
+
+            where = 'assigned_user_id NOT IN (SELECT id FROM catalog.users)'
+            count = shard.execute(f'SELECT COUNT(*) FROM {table} WHERE {where}').fetchone()[0]
+            if count:
+                problems.append(f'{label}: {count} fila(s) de {table} asignadas a usuarios inexistentes{suffix}.')
+                if repair:
+                    fixed += shard.execute(f'UPDATE {table} SET assigned_user_id = NULL WHERE {where}').rowcount
+
+            where = 'tag_id NOT IN (SELECT id FROM catalog.tags)'
+            count = shard.execute(f'SELECT COUNT(*) FROM {tags_table} WHERE {where}').fetchone()[0]
+            if count:
+                problems.append(f'{label}: {count} fila(s) de {tags_table} con etiquetas inexistentes{suffix}.')
+                if repair:
+                    fixed += shard.execute(f'DELETE FROM {tags_table} WHERE {where}').rowcount
+
+        broken = shard.execute('PRAGMA foreign_key_check').fetchall()
+        if broken:
+            problems.append(f'{label}: {len(broken)} llave(s) foránea(s) rotas dentro del archivo.')
+
+        if fixed:
+            record_change(shard, project_id, 'reset')
+        commit_changes(shard)
+        release_db(project_id)
+    return problems
+
+
+@click.command('shard-check')
+@click.option('--repair', is_flag=True, help='Corrige los problemas que tienen arreglo seguro.')
+def shard_check_command(repair):
+    """Comprueba la coherencia entre el catálogo y los archivos de los proyectos."""
+    if not sharding_enabled():
+        raise click.ClickException('El particionado (SHARDING_ENABLED) no está activo.')
+    problems = check_shards(get_db(), repair)
+    if not problems:
+        click.echo('Catálogo y archivos de proyecto coherentes.')
+        return
+    for problem in problems:
+        click.echo(problem)
+    if not repair:
+        raise click.exceptions.Exit(1)
+
+
+def init_app(app):
+    app.cli.add_command(shard_split_command)
+    app.cli.add_command(shard_check_command)
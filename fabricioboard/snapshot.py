@@ -0,0 +1,341 @@
+# fabricioboard/snapshot.py
+
+"""
+Construcción del "snapshot" completo de un tablero.
+
+En lugar de lanzar una consulta de etiquetas por cada tarea (N+1 consultas),
+el tablero se carga con un número fijo de consultas basadas en conjuntos:
+
+1. El proyecto.
+2. Todas sus tareas, junto con el usuario asignado (LEFT JOIN).
+3. Todas las etiquetas de todas sus tareas (un único JOIN).
+
+Después se ensambla el JSON en una sola pasada, sin importar cuántas tareas tenga
+el proyecto. El formato de salida es el de GET /api/projects/<code>.
+
+Para tableros muy grandes, iter_board_json produce el mismo JSON por partes,
+recorriendo los cursores de tareas y etiquetas a la vez (ambos en el mismo orden)
+sin construir la lista completa de tareas: la memoria no crece con el tablero.
+
+Para columnas largas, build_column_page carga una página de una columna (con
+filtros opcionales) usando paginación por cursor: el cursor es la (position, id)
+de la última tarjeta devuelta, así que cada página es una búsqueda en el índice
+idx_tasks_project_column_position, sin OFFSET, por lejos que esté en la columna.
+"""
+
+import base64
+import binascii
+import json
+
+# Tareas serializadas de una vez por iter_board_json
+STREAM_BATCH_SIZE = 500
+
+# Los proyectos marcados como eliminados (ver purge.py) ya no existen para el tablero
+PROJECT_QUERY = 'SELECT id, code, name, version FROM projects WHERE code = ? AND deleted_at IS NULL'
+
+TASK_COLUMNS = """
+    SELECT t.id, t.title, t.description, t.column, t.position,
+           t.assigned_user_id, u.username
+    FROM tasks t
+    LEFT JOIN users u ON t.assigned_user_id = u.id
+"""
+
+TASKS_QUERY = TASK_COLUMNS + """
+    WHERE t.project_id = ?
+    ORDER BY t.position, t.id
+"""
+
+TASK_QUERY = TASK_COLUMNS + 'WHERE t.id = ?'
+
+# Se resuelve solo con el índice idx_tasks_project_position
+TASK_COUNT_QUERY = 'SELECT COUNT(*) FROM tasks WHERE project_id = ?'
+
+# Mismo orden que TASKS_QUERY (resuelto por el índice, sin ordenar en memoria):
+# iter_board_json recorre ambos cursores a la vez
+TAGS_QUERY = """
+    SELECT tt.task_id, tg.id, tg.name, tg.color
+    FROM task_tags tt
+    JOIN tasks t ON t.id = tt.task_id
+    JOIN tags tg ON tg.id = tt.tag_id
+    WHERE t.project_id = ?
+    ORDER BY t.position, t.id, tt.tag_id
+"""
+
+TASK_TAGS_QUERY = """
+    SELECT tg.id, tg.name, tg.color
+    FROM task_tags tt
+    JOIN tags tg ON tg.id = tt.tag_id
+    WHERE tt.task_id = ?
+"""
+
+
+COLUMNS_QUERY = 'SELECT DISTINCT column FROM tasks WHERE project_id = ? ORDER BY column'
+
+# Página de una columna; build_column_page añade los filtros antes de ORDER BY
+COLUMN_PAGE_QUERY = TASK_COLUMNS + """
+    WHERE t.project_id = ? AND t.column = ?{filters}
+    ORDER BY t.position, t.id
+    LIMIT ?
+"""
+
+# Tareas de un usuario en todos los proyectos (activos), resuelto por idx_tasks_assigned_user
+# en el mismo orden del índice; build_user_tasks_page añade los filtros antes de ORDER BY
+USER_TASKS_QUERY = """
+    SELECT t.id, t.title, t.description, t.column, t.position,
+           t.assigned_user_id, u.username, t.project_id, p.code, p.name
+    FROM tasks t
+    JOIN projects p ON p.id = t.project_id
+    JOIN users u ON u.id = t.assigned_user_id
+    WHERE t.assigned_user_id = ? AND p.deleted_at IS NULL{filters}
+    ORDER BY t.project_id, t.column, t.position, t.id
+    LIMIT ?
+"""
+
+# Tipos de las claves de un cursor de tareas de usuario: (project_id, column, position, id)
+USER_CURSOR_TYPES = (int, str, (int, float), int)
+
+PAGE_TAGS_QUERY = """
+    SELECT tt.task_id, tg.id, tg.name, tg.color
+    FROM task_tags tt
+    JOIN tags tg ON tg.id = tt.tag_id
+    WHERE tt.task_id IN ({placeholders})
+"""
+
+
+def get_project(db, project_code):
+    """Devuelve la fila del proyecto con ese código, o None si no existe."""
+    return db.execute(PROJECT_QUERY, (project_code,)).fetchone()
+
+
+def count_tasks(db, project_id):
+    """Número de tareas del proyecto."""
+    return db.execute(TASK_COUNT_QUERY, (project_id,)).fetchone()[0]
+
+
+def task_to_dict(row, tags):
+    """Convierte una fila de TASK_COLUMNS al formato JSON de una tarea."""
+    task_id, title, description, column, position, user_id, username = row
+    return {
+        'id': task_id,
+        'title': title,
+        'description': description,
+        'column': column,
+        'position': position,
+        'tags': tags,
+        # Igual que antes: si el usuario no existe, la tarea queda sin asignar
+        'assigned_user': {'id': user_id, 'username': username} if username else None,
+    }
+
+
+def build_board_snapshot(db, project):
+    """
+    Construye el snapshot de un tablero a partir de la fila de su proyecto.
+    Devuelve un diccionario {'project': {...}, 'tasks': [...], 'seq': N} listo para
+    jsonify. `seq` es la versión del tablero: el cliente la usa para pedir solo los
+    cambios posteriores en GET /api/projects/<code>/changes?since=<seq>.
+    """
+    project_id = project['id']
+
+    tasks_list = []
+    tags_by_task = {}
+    for row in db.execute(TASKS_QUERY, (project_id,)):
+        tags = []
+        tags_by_task[row[0]] = tags
+        tasks_list.append(task_to_dict(row, tags))
+
+    # Las listas de etiquetas ya están enlazadas a cada tarea, solo hay que llenarlas.
+    # (Si otra petición creó una tarea entre ambas consultas, sus etiquetas se ignoran.)
+    for task_id, tag_id, name, color in db.execute(TAGS_QUERY, (project_id,)):
+        tags = tags_by_task.get(task_id)
+        if tags is not None:
+            tags.append({'id': tag_id, 'name': name, 'color': color})
+
+    return {
+        'project': {'id': project['id'], 'code': project['code'], 'name': project['name']},
+        'tasks': tasks_list,
+        'seq': project['version'],
+    }
+
+
+def iter_board_json(db, project, dumps):
+    """
+    Genera el JSON del snapshot por partes (cadenas), en el mismo formato y orden de
+    claves que build_board_snapshot serializado con `dumps` (app.json.dumps).
+    Solo mantiene en memoria el lote de tareas que está serializando.
+    """
+    project_id = project['id']
+    project_json = dumps({'id': project_id, 'code': project['code'], 'name': project['name']})
+    # Claves en orden alfabético, como las ordena el proveedor JSON de Flask
+    yield f'{{"project":{project_json},"seq":{dumps(project["version"])},"tasks":['
+
+    # Con el primer cursor aún abierto, el segundo lee de la misma transacción de lectura
+    tags_cursor = db.execute(TAGS_QUERY, (project_id,))
+    tag = tags_cursor.fetchone()
+    batch = []
+    separator = ''
+    for row in db.execute(TASKS_QUERY, (project_id,)):
+        tags = []
+        while tag is not None and tag[0] == row[0]:
+            tags.append({'id': tag[1], 'name': tag[2], 'color': tag[3]})
+            tag = tags_cursor.fetchone()
+        batch.append(task_to_dict(row, tags))
+        if len(batch) == STREAM_BATCH_SIZE:
+            # Se serializa por lotes: una llamada a dumps por tarea es bastante más lenta
+            yield separator + dumps(batch)[1:-1]
+            batch = []
+            separator = ','
+    if batch:
+        yield separator + dumps(batch)[1:-1]
+    yield ']}\n'
+
+
+def build_task_snapshot(db, task_id):
+    """Devuelve una sola tarea en el mismo formato que el tablero, o None si no existe."""
+    row = db.execute(TASK_QUERY, (task_id,)).fetchone()
+    if row is None:
+        return None
+    tags = [
+        {'id': tag_id, 'name': name, 'color': color}
+        for tag_id, name, color in db.execute(TASK_TAGS_QUERY, (task_id,))
+    ]
+    return task_to_dict(row, tags)
+
+
+# Tipos de las claves de un cursor de columna: (position, id)
+COLUMN_CURSOR_TYPES = ((int, float), int)
+
+
+def encode_cursor(*values):
+    """Cursor opaco con la clave de orden (p. ej. posición e id) de la última tarjeta de una página."""
+    raw = json.dumps(values).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor, types=COLUMN_CURSOR_TYPES):
+    """
+    Devuelve la tupla de valores de un cursor, comprobando que haya uno por cada
+    elemento de `types` y de ese tipo. Lanza ValueError si no es válido.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise ValueError(f"Cursor inválido: '{cursor}'.")
+    if (
+        not isinstance(values, list) or len(values) != len(types)
+        or not all(isinstance(value, type_) and not isinstance(value, bool) for value, type_ in zip(values, types))
+    ):
+        raise ValueError(f"Cursor inválido: '{cursor}'.")
+    return tuple(values)
+
+
+def list_columns(db, project_id):
+    """Columnas que tienen al menos una tarea en el proyecto."""
+    return [row['column'] for row in db.execute(COLUMNS_QUERY, (project_id,))]
+
+
+def build_column_page(db, project_id, column, limit, cursor=None, assigned_user_id=None, tag_id=None):
+    """
+    Devuelve {'tasks': [...], 'next_cursor': str | None} con hasta `limit` tareas de
+    una columna, en orden, a partir del cursor (exclusivo) y aplicando los filtros.
+    `next_cursor` es None cuando no quedan más tareas.
+    """
+    filters = []
+    params = [project_id, column]
+    if assigned_user_id is not None:
+        filters.append('t.assigned_user_id = ?')
+        params.append(assigned_user_id)
+    if tag_id is not None:
+        filters.append('EXISTS (SELECT 1 FROM task_tags ft WHERE ft.task_id = t.id AND ft.tag_id = ?)')
+        params.append(tag_id)
+    if cursor is not None:
+        # Comparación de row values: SQLite la resuelve como un rango sobre el índice
+        filters.append('(t.position, t.id) > (?, ?)')
+        params.extend(decode_cursor(cursor))
+    # Pedimos una de más para saber si hay otra página
+    params.append(limit + 1)
+
+    sql = COLUMN_PAGE_QUERY.format(filters=''.join(f' AND {f}' for f in filters))
+    rows = db.execute(sql, params).fetchall()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    tasks_list = []
+    tags_by_task = {}
+    for row in rows:
+        tags = []
+        tags_by_task[row[0]] = tags
+        tasks_list.append(task_to_dict(row, tags))
+
+    if tags_by_task:
+        sql = PAGE_TAGS_QUERY.format(placeholders=', '.join('?' * len(tags_by_task)))
+        for tag in db.execute(sql, list(tags_by_task)):
+            tags_by_task[tag['task_id']].append({'id': tag['id'], 'name': tag['name'], 'color': tag['color']})
+
+    next_cursor = None
+    if has_more:
+        last = tasks_list[-1]
+        next_cursor = encode_cursor(last['position'], last['id'])
+    return {'tasks': tasks_list, 'next_cursor': next_cursor}
+
+
+def build_user_tasks_page(databases, user_id, limit, cursor=None, column=None, tag_id=None):
+    """
+    Devuelve {'projects': [...], 'next_cursor': str | None} con hasta `limit` tareas
+    asignadas al usuario, de todos los proyectos, a partir del cursor (exclusivo).
+    Cada proyecto es {'id', 'code', 'name', 'columns': {<columna>: [tareas]}}, en el
+    orden de la página: un mismo proyecto puede continuar en la página siguiente.
+
+    `databases(first_project_id)` devuelve las conexiones a recorrer, en orden de
+    proyecto (ver shards.project_databases): sin particionado es una sola.
+    """
+    filters = []
+    params = [user_id]
+    if column is not None:
+        # El "+" impide usar la igualdad en el índice: así el ORDER BY sigue
+        # resuelto por idx_tasks_assigned_user (sin B-tree temporal) y la columna
+        # se filtra al recorrerlo
+        filters.append('+t.column = ?')
+        params.append(column)
+    if tag_id is not None:
+        filters.append('EXISTS (SELECT 1 FROM task_tags ft WHERE ft.task_id = t.id AND ft.tag_id = ?)')
+        params.append(tag_id)
+    after = None
+    if cursor is not None:
+        after = decode_cursor(cursor, USER_CURSOR_TYPES)
+        filters.append('(t.project_id, t.column, t.position, t.id) > (?, ?, ?, ?)')
+        params.extend(after)
+    # El LIMIT se fija en cada conexión
+    params.append(None)
+    sql = USER_TASKS_QUERY.format(filters=''.join(f' AND {f}' for f in filters))
+
+    projects = []
+    rows = []
+    for db in databases(after[0] if after is not None else 0):
+        # Pedimos una de más para saber si hay otra página
+        params[-1] = limit + 1 - len(rows)
+        found = db.execute(sql, params).fetchall()
+
+        tags_by_task = {}
+        for row in found[:limit - len(rows)]:
+            if not projects or projects[-1]['id'] != row['project_id']:
+                projects.append({'id': row['project_id'], 'code': row['code'], 'name': row['name'], 'columns': {}})
+            tags = []
+            tags_by_task[row['id']] = tags
+            projects[-1]['columns'].setdefault(row['column'], []).append(task_to_dict(row[:7], tags))
+
+        # Las etiquetas de las tareas de la página con una sola consulta (por conexión)
+        if tags_by_task:
+            tags_sql = PAGE_TAGS_QUERY.format(placeholders=', '.join('?' * len(tags_by_task)))
+            for tag in db.execute(tags_sql, list(tags_by_task)):
+                tags_by_task[tag['task_id']].append({'id': tag['id'], 'name': tag['name'], 'color': tag['color']})
+
+        rows.extend(found)
+        if len(rows) > limit:
+            break
+
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = encode_cursor(last['project_id'], last['column'], last['position'], last['id'])
+    return {'projects': projects, 'next_cursor': next_cursor}
@@ -2,11 +2,28 @@
 
 let currentBoardData = {};
 let activeFilters = { userId: null, tagId: null };
+// Todos los usuarios y etiquetas (no solo los que aparecen en el tablero), ver GET /api/reference
+let boardReference = { version: null, users: [], tags: [] };
+// Tarea abierta en el modal (null si está cerrado)
+let modalTaskId = null;
 
 document.addEventListener('DOMContentLoaded', () => {
     // Esta función se ejecuta cuando el HTML ha sido completamente cargado.
+    const referenceEl = document.getElementById('board-reference');
+    if (referenceEl) boardReference = JSON.parse(referenceEl.textContent);
+
     if (typeof PROJECT_CODE !== 'undefined') {
-        fetchAndRenderBoard(PROJECT_CODE);
+        // El servidor incluye el snapshot inicial en la página (salvo en tableros grandes):
+        // lo usamos directamente en lugar de pedirlo otra vez a la API
+        const snapshotEl = document.getElementById('board-snapshot');
+        if (snapshotEl) {
+            currentBoardData = JSON.parse(snapshotEl.textContent);
+            renderBoard(currentBoardData);
+            renderFilters(currentBoardData);
+            connectBoardEvents(PROJECT_CODE);
+        } else {
+            fetchAndRenderBoard(PROJECT_CODE).then(() => connectBoardEvents(PROJECT_CODE));
+        }
     }
 
     // Añadimos los listeners para cerrar el modal aquí dentro.
@@ -37,6 +54,109 @@ async function fetchAndRenderBoard(projectCode) {
     }
 }
 
+// Descarga solo los cambios posteriores al último `seq` conocido y los aplica
+// sobre currentBoardData, en lugar de volver a descargar todo el tablero.
+async function syncBoardChanges(projectCode) {
+    try {
+        let more = true;
+        while (more) {
+            const response = await fetch(`/api/projects/${projectCode}/changes?since=${currentBoardData.seq}`);
+            if (response.status === 410) {
+                // Nuestro `seq` es demasiado antiguo: volvemos a cargar el snapshot completo
+                return fetchAndRenderBoard(projectCode);
+            }
+            if (!response.ok) {
+                throw new Error(`Error HTTP: ${response.status}`);
+            }
+            const data = await response.json();
+            if (data.changes.some(change => change.kind === 'reset')) {
+                // Cambiaron muchas tarjetas a la vez: es más simple recargar el tablero
+                return fetchAndRenderBoard(projectCode);
+            }
+            data.changes.forEach(applyBoardChange);
+            currentBoardData.seq = data.seq;
+            more = data.more;
+        }
+
+        renderBoard(currentBoardData);
+        renderFilters(currentBoardData);
+        applyFilters();
+
+    } catch (error) {
+        console.error('No se pudieron sincronizar los cambios:', error);
+        return fetchAndRenderBoard(projectCode);
+    }
+}
+
+// Escucha los cambios de otros usuarios en vivo (Server-Sent Events).
+// EventSource se reconecta solo si la conexión se corta.
+function connectBoardEvents(projectCode) {
+    if (typeof EventSource === 'undefined') return;
+
+    const source = new EventSource(`/api/projects/${projectCode}/events`);
+
+    source.addEventListener('change', (event) => {
+        const change = JSON.parse(event.data);
+        if (change.seq <= currentBoardData.seq) return; // Ya lo tenemos (p. ej. un cambio propio)
+
+        if (change.kind === 'reset') {
+            fetchAndRenderBoard(projectCode);
+        } else if (change.prev === currentBoardData.seq) {
+            // Es justo el siguiente cambio: lo aplicamos sin pedir nada al servidor
+            applyBoardChange(change);
+            currentBoardData.seq = change.seq;
+            renderBoard(currentBoardData);
+            renderFilters(currentBoardData);
+            applyFilters();
+        } else {
+            // Nos perdimos algún cambio intermedio: pedimos solo los que faltan
+            syncBoardChanges(projectCode);
+        }
+    });
+
+    // Al (re)conectar el servidor nos dice su versión: si nos perdimos algo, sincronizamos
+    source.addEventListener('hello', (event) => {
+        const hello = JSON.parse(event.data);
+        if (hello.seq !== currentBoardData.seq) syncBoardChanges(projectCode);
+    });
+
+    // El servidor nos desconectó (cola llena o proyecto eliminado): sincronizamos
+    source.addEventListener('reset', () => syncBoardChanges(projectCode));
+}
+
+function applyBoardChange(change) {
+    const tasks = currentBoardData.tasks;
+    const index = tasks.findIndex(t => t.id === change.task_id);
+
+    switch (change.kind) {
+        case 'task':
+            if (index >= 0) {
+                tasks[index] = change.data;
+            } else {
+                tasks.push(change.data);
+            }
+            tasks.sort((a, b) => a.position - b.position);
+            break;
+        case 'task_deleted':
+            if (index >= 0) tasks.splice(index, 1);
+            break;
+        case 'user_deleted':
+            tasks.forEach(t => {
+                if (t.assigned_user && t.assigned_user.id === change.data.user_id) {
+                    t.assigned_user = null;
+                }
+            });
+            boardReference.users = boardReference.users.filter(u => u.id !== change.data.user_id);
+            break;
+        case 'tag_deleted':
+            tasks.forEach(t => {
+                t.tags = t.tags.filter(tag => tag.id !== change.data.tag_id);
+            });
+            boardReference.tags = boardReference.tags.filter(tag => tag.id !== change.data.tag_id);
+            break;
+    }
+}
+
 
 // fabricioboard/static/js/board.js
 
@@ -174,6 +294,11 @@ function renderBoard(data) {
 
         columnEl.appendChild(addCardButton)
 
+        // Las tarjetas terminadas antiguas están archivadas: se piden solo al abrir el archivo
+        if (columnName === 'Hecho') {
+            columnEl.appendChild(createArchivePanel(PROJECT_CODE));
+        }
+
         boardContainer.appendChild(columnEl);
 
         // --- ¡LA MAGIA DE SORTABLEJS EMPIEZA AQUÍ! ---
@@ -186,10 +311,16 @@ function renderBoard(data) {
             onEnd: function (evt) {
                 const taskId = evt.item.getAttribute('data-task-id');
                 const newColumnName = evt.to.parentElement.getAttribute('data-column-name');
-                const newIndex = evt.newDraggableIndex;
 
-                // Llamamos a nuestra API para persistir el cambio
-                updateTask(taskId, { column: newColumnName, position: newIndex })
+                // Enviamos las tarjetas vecinas: el servidor coloca la tarea entre ellas
+                // modificando solo su fila, sin renumerar el resto de la columna.
+                const prev = evt.item.previousElementSibling;
+                const next = evt.item.nextElementSibling;
+                moveTask(taskId, {
+                    column: newColumnName,
+                    before_id: prev ? parseInt(prev.getAttribute('data-task-id')) : null,
+                    after_id: next ? parseInt(next.getAttribute('data-task-id')) : null,
+                });
             }
         });
     });
@@ -214,6 +345,25 @@ async function updateTask(taskId, dataToUpdate) {
     }
 }
 
+async function moveTask(taskId, move) {
+    try {
+        const response = await fetch(`/api/tasks/${taskId}/move`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(move),
+        });
+
+        if (!response.ok) throw new Error('Falló el movimiento de la tarea.');
+
+        console.log(`Tarea ${taskId} movida a:`, move);
+    } catch (error) {
+        console.error("Error al mover la tarea:", error);
+        alert("No se pudo mover la tarea.");
+        // Volvemos a dibujar el tablero con el orden que conoce el servidor
+        syncBoardChanges(PROJECT_CODE);
+    }
+}
+
 async function deleteTask(taskId) {
     try {
         const response = await fetch(`/api/tasks/${taskId}`, {
@@ -239,8 +389,103 @@ async function deleteTask(taskId) {
 }
 
 
+async function unarchiveTask(taskId, projectCode) {
+    try {
+        const response = await fetch(`/api/tasks/${taskId}/unarchive`, {
+            method: 'POST',
+        });
+
+        if (!response.ok) throw new Error('Falló la restauración de la tarea.');
+
+        // La tarea vuelve al tablero: traemos solo los cambios desde nuestra última versión
+        syncBoardChanges(projectCode);
+        return true;
+    } catch (error) {
+        console.error("Error al restaurar la tarea:", error);
+        alert("No se pudo restaurar la tarea.");
+        return false;
+    }
+}
+
+
 // --- FIN FUNCIONES API ---
 
+// --- ARCHIVO DE TAREAS TERMINADAS ---
+function createArchivePanel(projectCode) {
+    const panel = document.createElement('div');
+    panel.className = 'archive-panel';
+
+    const toggleButton = document.createElement('button');
+    toggleButton.className = 'add-card-btn';
+    toggleButton.textContent = 'Ver tareas archivadas';
+
+    const list = document.createElement('div');
+    list.className = 'archive-list hidden';
+
+    const moreButton = document.createElement('button');
+    moreButton.className = 'add-card-btn hidden';
+    moreButton.textContent = 'Cargar más...';
+
+    let cursor = null;
+    let loaded = false;
+
+    async function loadPage() {
+        const params = new URLSearchParams();
+        if (cursor) params.set('cursor', cursor);
+        try {
+            const response = await fetch(`/api/projects/${projectCode}/archive?${params}`);
+            if (!response.ok) throw new Error(`Error HTTP: ${response.status}`);
+            const page = await response.json();
+
+            page.tasks.forEach(task => list.appendChild(createArchivedCard(task, projectCode)));
+            if (!list.children.length) {
+                list.innerHTML = '<p class="archive-empty">No hay tareas archivadas.</p>';
+            }
+            cursor = page.next_cursor;
+            moreButton.classList.toggle('hidden', !cursor);
+        } catch (error) {
+            console.error('No se pudo cargar el archivo:', error);
+        }
+    }
+
+    toggleButton.addEventListener('click', () => {
+        const opening = list.classList.contains('hidden');
+        list.classList.toggle('hidden', !opening);
+        moreButton.classList.toggle('hidden', !opening || !cursor);
+        toggleButton.textContent = opening ? 'Ocultar tareas archivadas' : 'Ver tareas archivadas';
+        if (opening && !loaded) {
+            loaded = true;
+            loadPage();
+        }
+    });
+    moreButton.addEventListener('click', loadPage);
+
+    panel.appendChild(toggleButton);
+    panel.appendChild(list);
+    panel.appendChild(moreButton);
+    return panel;
+}
+
+function createArchivedCard(task, projectCode) {
+    const cardEl = document.createElement('div');
+    cardEl.className = 'archived-card';
+
+    const titleEl = document.createElement('p');
+    titleEl.className = 'card-title';
+    titleEl.textContent = task.title;
+
+    const restoreButton = document.createElement('button');
+    restoreButton.className = 'filter-btn';
+    restoreButton.textContent = 'Restaurar';
+    restoreButton.addEventListener('click', async () => {
+        if (await unarchiveTask(task.id, projectCode)) cardEl.remove();
+    });
+
+    cardEl.appendChild(titleEl);
+    cardEl.appendChild(restoreButton);
+    return cardEl;
+}
+
 function createCardForm(columnName, addButton) {
     const form = document.createElement('div');
     form.className = 'create-card-form';
@@ -278,11 +523,8 @@ function createCardForm(columnName, addButton) {
 }
 
 async function createTask(title, column, projectCode) {
-    // Extraemos el ID del proyecto desde el JSON inicial
-    // (Esto es una simplificación, en una app más grande lo manejaríamos diferente)
-    const response_data = await fetch(`/api/projects/${projectCode}`);
-    const data = await response_data.json();
-    const projectId = data.project.id;
+    // El ID del proyecto viene en la página (PROJECT_ID): no hace falta pedir el tablero
+    const projectId = PROJECT_ID;
 
     try {
         const response = await fetch('/api/tasks', {
@@ -301,9 +543,8 @@ async function createTask(title, column, projectCode) {
             throw new Error('Falló la creación de la tarea.');
         }
 
-        // Si la creación es exitosa, simplemente recargamos todo el tablero
-        // Es la forma más sencilla de asegurar que todo está sincronizado.
-        fetchAndRenderBoard(projectCode);
+        // Si la creación es exitosa, traemos solo los cambios desde nuestra última versión
+        syncBoardChanges(projectCode);
 
     } catch (error) {
         console.error("Error al crear la tarea:", error);
@@ -312,10 +553,28 @@ async function createTask(title, column, projectCode) {
 }
 
 
+// Vuelve a pedir los usuarios y etiquetas. El navegador revalida su copia con el
+// ETag, así que mientras nadie cree ni elimine ninguno la respuesta es un 304 sin cuerpo.
+// Devuelve true si cambiaron.
+async function refreshBoardReference() {
+    try {
+        const response = await fetch('/api/reference');
+        if (!response.ok) throw new Error(`Error HTTP: ${response.status}`);
+        const data = await response.json();
+        if (data.version === boardReference.version) return false;
+        boardReference = data;
+        return true;
+    } catch (error) {
+        console.error('No se pudieron actualizar los usuarios y etiquetas:', error);
+        return false;
+    }
+}
+
 // --- PARA MODAL ---
-function openTaskModal(taskId) {
+function openTaskModal(taskId, refreshReference = true) {
     const task = currentBoardData.tasks.find(t => t.id === taskId);
     if (!task) return;
+    modalTaskId = taskId;
 
     // Poblar datos básicos
     document.getElementById('modal-task-title').textContent = task.title;
@@ -324,11 +583,8 @@ function openTaskModal(taskId) {
     // Poblar y manejar usuarios
     const usersList = document.getElementById('modal-users-list');
     usersList.innerHTML = '';
-    // Necesitamos la lista completa de usuarios del proyecto. Asumimos que la API la proveerá.
-    // Por ahora, usemos los usuarios que ya tenemos en las tareas.
-    const allUsers = [...new Set(currentBoardData.tasks.map(t => t.assigned_user).filter(Boolean).map(u => u.username))];
-    allUsers.forEach(username => {
-        const user = currentBoardData.tasks.find(t => t.assigned_user && t.assigned_user.username === username).assigned_user;
+    // Todos los usuarios, incluidos los que aún no tienen tareas en este tablero
+    boardReference.users.forEach(user => {
         const userEl = document.createElement('div');
         userEl.className = 'list-item';
         userEl.textContent = user.username;
@@ -344,11 +600,10 @@ function openTaskModal(taskId) {
     const tagsList = document.getElementById('modal-tags-list');
     tagsList.innerHTML = '';
 
-    // Obtenemos una lista única de todas las etiquetas disponibles en el tablero
-    const allTags = [...new Map(currentBoardData.tasks.flatMap(t => t.tags).map(item => [item['id'], item])).values()];
+    // Todas las etiquetas, incluidas las que aún no se usan en este tablero
     const assignedTagIds = new Set(task.tags.map(t => t.id));
 
-    allTags.forEach(tag => {
+    boardReference.tags.forEach(tag => {
         const tagEl = document.createElement('div');
         tagEl.className = 'list-item';
 
@@ -376,9 +631,20 @@ function openTaskModal(taskId) {
     // Mostrar el modal
     document.getElementById('modal-backdrop').style.display = 'block';
     document.getElementById('task-modal').style.display = 'block';
+
+    // Se muestra al momento con la lista que ya tenemos; si el administrador creó o
+    // eliminó usuarios o etiquetas desde que se cargó la página, se vuelve a dibujar
+    if (refreshReference) {
+        refreshBoardReference().then(changed => {
+            if (changed && modalTaskId === taskId) {
+                openTaskModal(taskId, false);
+            }
+        });
+    }
 }
 
 function closeModal() {
+    modalTaskId = null;
     document.getElementById('modal-backdrop').style.display = 'none';
     document.getElementById('task-modal').style.display = 'none';
 }
@@ -389,8 +655,8 @@ async function handleUserAssignment(taskId, userId) {
 
     await updateTask(taskId, { assigned_user_id: newUserId });
 
-    // Recargamos todo para ver los cambios reflejados
-    await fetchAndRenderBoard(PROJECT_CODE);
+    // Traemos solo los cambios para ver la asignación reflejada
+    await syncBoardChanges(PROJECT_CODE);
 
     // Volvemos a abrir el modal para ver el cambio instantáneo
     openTaskModal(taskId);
@@ -415,8 +681,8 @@ async function handleTagAssignment(taskId, tagId, isCurrentlyAssigned) {
 
         console.log(`Asignación de etiqueta para tarea ${taskId} actualizada.`);
 
-        // Recargamos los datos y reabrimos el modal para ver el cambio
-        await fetchAndRenderBoard(PROJECT_CODE);
+        // Traemos solo los cambios y reabrimos el modal para ver el cambio
+        await syncBoardChanges(PROJECT_CODE);
         openTaskModal(taskId);
 
     } catch (error) {
@@ -0,0 +1,131 @@
+# fabricioboard/stats.py
+
+"""
+Estadísticas materializadas de los tableros: cuántas tareas hay en cada columna,
+cuántas están sin asignar y cuántas llevan cada etiqueta.
+
+Los contadores viven en `column_stats` y `column_tag_stats` y los mantienen los
+triggers de migrations/0006_column_stats.sql, en la misma transacción de cada
+escritura sobre `tasks` y `task_tags`. Así, leer el resumen de un tablero es una
+búsqueda por clave primaria en lugar de recorrer todas sus tareas.
+
+Las cargas masivas (bulk.py) desactivan los triggers y recalculan los contadores
+al terminar con rebuild_stats. `flask stats-verify` compara los contadores con las
+tareas y, con --repair, recalcula los proyectos que no coincidan.
+"""
+
+import click
+
+from .shards import project_databases
+
+STATS_QUERY = """
+    SELECT column, task_count, unassigned_count
+    FROM column_stats
+    WHERE project_id = ?
+    ORDER BY column
+"""
+
+TAG_STATS_QUERY = """
+    SELECT s.column, tg.id, tg.name, tg.color, s.task_count
+    FROM column_tag_stats s
+    JOIN tags tg ON tg.id = s.tag_id
+    WHERE s.project_id = ?
+    ORDER BY s.column, s.task_count DESC, tg.id
+"""
+
+# Los contadores calculados desde cero (opcionalmente solo para un proyecto)
+EXPECTED_STATS_QUERY = """
+    SELECT project_id, column, COUNT(*) AS task_count, SUM(assigned_user_id IS NULL) AS unassigned_count
+    FROM tasks
+    WHERE {where}
+    GROUP BY project_id, column
+"""
+
+EXPECTED_TAG_STATS_QUERY = """
+    SELECT t.project_id, t.column, tt.tag_id, COUNT(*) AS task_count
+    FROM task_tags tt
+    JOIN tasks t ON t.id = tt.task_id
+    WHERE {where}
+    GROUP BY t.project_id, t.column, tt.tag_id
+"""
+
+# Filas que sobran o faltan en los contadores guardados, en cualquiera de los dos sentidos
+MISMATCH_QUERY = """
+    SELECT project_id FROM (SELECT * FROM ({expected}) EXCEPT SELECT * FROM {table})
+    UNION
+    SELECT project_id FROM (SELECT * FROM {table} EXCEPT SELECT * FROM ({expected}))
+"""
+
+
+def get_project_stats(db, project_id):
+    """
+    Resumen del tablero: {'tasks', 'unassigned', 'columns': {<columna>: {'tasks',
+    'unassigned', 'tags': [{'id', 'name', 'color', 'tasks'}]}}}. Las etiquetas de
+    cada columna van de la más usada a la menos usada.
+    """
+    columns = {}
+    for column, task_count, unassigned_count in db.execute(STATS_QUERY, (project_id,)):
+        columns[column] = {'tasks': task_count, 'unassigned': unassigned_count, 'tags': []}
+    for column, tag_id, name, color, task_count in db.execute(TAG_STATS_QUERY, (project_id,)):
+        if column in columns:
+            columns[column]['tags'].append({'id': tag_id, 'name': name, 'color': color, 'tasks': task_count})
+    return {
+        'tasks': sum(stats['tasks'] for stats in columns.values()),
+        'unassigned': sum(stats['unassigned'] for stats in columns.values()),
+        'columns': columns,
+    }
+
+
+def _scope(project_id, alias=''):
+    if project_id is None:
+        return '1', ()
+    return f'{alias}project_id = ?', (project_id,)
+
+
+def rebuild_stats(db, project_id=None):
+    """Recalcula desde cero los contadores (de todos los proyectos o de uno). NO hace commit."""
+    where, params = _scope(project_id)
+    db.execute(f'DELETE FROM column_stats WHERE {where}', params)
+    db.execute(f'DELETE FROM column_tag_stats WHERE {where}', params)
+    db.execute(f'INSERT INTO column_stats {EXPECTED_STATS_QUERY.format(where=where)}', params)
+    where, params = _scope(project_id, alias='t.')
+    db.execute(f'INSERT INTO column_tag_stats {EXPECTED_TAG_STATS_QUERY.format(where=where)}', params)
+
+
+def verify_stats(db):
+    """Devuelve los ids (ordenados) de los proyectos cuyos contadores no coinciden con sus tareas."""
+    projects = set()
+    checks = (
+        ('column_stats', EXPECTED_STATS_QUERY.format(where='1')),
+        ('column_tag_stats', EXPECTED_TAG_STATS_QUERY.format(where='1')),
+    )
+    for table, expected in checks:
+        query = MISMATCH_QUERY.format(expected=expected, table=table)
+        projects.update(row[0] for row in db.execute(query))
+    return sorted(projects)
+
+
+@click.command('stats-verify')
+@click.option('--repair', is_flag=True, help='Recalcula los proyectos con diferencias.')
+def stats_verify_command(repair):
+    """Comprueba las estadísticas materializadas de los tableros."""
+    projects = []
+    # Con particionado, cada archivo de proyecto tiene sus contadores (ver shards.py)
+    for db in project_databases():
+        wrong = verify_stats(db)
+        if repair:
+            for project_id in wrong:
+                rebuild_stats(db, project_id)
+            db.commit()
+        projects.extend(wrong)
+    if not projects:
+        click.echo('Estadísticas correctas.')
+        return
+    click.echo(f'{len(projects)} proyecto(s) con estadísticas incorrectas: {", ".join(map(str, projects))}')
+    if not repair:
+        raise click.exceptions.Exit(1)
+    click.echo('Estadísticas recalculadas.')
+
+
+def init_app(app):
+    app.cli.add_command(stats_verify_command)
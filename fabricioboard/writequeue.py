@@ -0,0 +1,189 @@
+# fabricioboard/writequeue.py
+
+"""
+Cola de escrituras con commit agrupado (group commit), opcional (WRITE_QUEUE_ENABLED).
+
+SQLite admite un solo escritor a la vez. Cuando muchas peticiones escriben a la vez
+(p. ej. un equipo reorganizando un tablero), cada una espera el bloqueo de escritura
+por su cuenta y paga su propio commit; con suficiente concurrencia algunas agotan
+busy_timeout y fallan con "database is locked".
+
+Con la cola activa, las mutaciones de la API no escriben desde el hilo de la
+petición: se encolan como funciones `apply(db)` y un único hilo escritor por proceso
+las recoge durante una ventana corta (WRITE_QUEUE_WINDOW_MS, hasta
+WRITE_QUEUE_MAX_BATCH operaciones) y las aplica todas en una sola transacción:
+
+- Cada operación corre dentro de su propio SAVEPOINT: si falla (p. ej. un abort(404)),
+  solo se deshace esa operación y su petición recibe el error; las demás siguen.
+- Al final hay un único COMMIT. La conexión del escritor usa WRITE_QUEUE_SYNCHRONOUS
+  (por defecto FULL), así que ese commit es durable y su fsync se reparte entre
+  todas las operaciones del grupo.
+- Cada petición recibe su respuesta solo después de ese commit, y los cambios se
+  publican a las conexiones en vivo igual que con commit_changes.
+
+Sin la cola (por defecto), perform_write aplica la operación y hace commit en la
+conexión de la petición, como siempre.
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+from flask import abort, current_app, g
+
+from .changes import commit_changes, rollback_changes
+from .db import get_db, get_pool
+
+# Segundos que una petición espera a que el escritor confirme su operación
+SUBMIT_TIMEOUT = 30
+
+
+def perform_write(apply, db=None):
+    """
+    Aplica `apply(db)` (una mutación sin commit) y la confirma. Devuelve su resultado;
+    si la operación lanza una excepción (p. ej. abort), se propaga a la petición.
+    `db` es la conexión del proyecto afectado en modo particionado (ver shards.py).
+    """
+    write_queue = current_app.extensions.get('write_queue')
+    if write_queue is None:
+        if db is None:
+            db = get_db()
+        result = apply(db)
+        commit_changes(db)
+        return result
+    return write_queue.submit(apply)
+
+
+class WriteQueue:
+    """Un hilo escritor por proceso que confirma las operaciones encoladas en grupos."""
+
+    def __init__(self, app, window, max_batch, synchronous):
+        self.app = app
+        self.window = window
+        self.max_batch = max_batch
+        self.synchronous = synchronous
+        # Totales del proceso (para benchmarks y depuración)
+        self.batches = 0
+        self.operations = 0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def submit(self, apply):
+        """Encola una operación y espera a que su grupo se confirme."""
+        self._ensure_writer()
+        future = Future()
+        self._queue.put((apply, future))
+        try:
+            return future.result(timeout=SUBMIT_TIMEOUT)
+        except TimeoutError:
+            # Si el escritor todavía no la tomó, se cancela: el 503 garantiza que no se
+            # escribió nada y el cliente puede reintentar sin duplicarla
+            if future.cancel():
+                abort(503, description='La escritura no se pudo confirmar a tiempo; inténtalo de nuevo.')
+        # Su grupo ya se está aplicando: esperamos a que se confirme (o falle)
+        return future.result()
+
+    def _ensure_writer(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                # Primer uso en este proceso (o hijo tras un fork): el hilo no se hereda
+                self._queue = queue.Queue()
+                self._thread = threading.Thread(target=self._run, name='write-queue', daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def _connect(self):
+        conn = get_pool(self.app).connect()
+        conn.execute(f'PRAGMA synchronous = {self.synchronous}')
+        tracer = self.app.extensions.get('sql_tracer')
+        if tracer is not None:
+            tracer.install(conn)
+        return conn
+
+    def _run(self):
+        db = self._connect()
+        while True:
+            batch = self._gather()
+            try:
+                with self.app.app_context():
+                    self._apply(db, batch)
+            except Exception as e:
+                # Un error inesperado no debe dejar peticiones esperando ni detener el hilo
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _gather(self):
+        """Espera la primera operación y junta las que lleguen durante la ventana."""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _apply(self, db, batch):
+        # Las operaciones canceladas (su petición ya respondió 503) no se aplican; las
+        # demás pasan a "en curso" y ya no se pueden cancelar
+        batch = [(apply, future) for apply, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        outcomes = []
+        try:
+            db.execute('BEGIN IMMEDIATE')
+            pending = g.setdefault('pending_changes', [])
+            for apply, future in batch:
+                mark = len(pending)
+                db.execute('SAVEPOINT operacion')
+                try:
+                    outcomes.append((future, apply(db), None))
+                except Exception as e:
+                    db.execute('ROLLBACK TO operacion')
+                    # Los cambios de la operación deshecha no se publican
+                    del pending[mark:]
+                    outcomes.append((future, None, e))
+                db.execute('RELEASE operacion')
+            commit_changes(db)
+        except sqlite3.Error as e:
+            # Falló el grupo entero (p. ej. no se obtuvo el bloqueo): ninguna operación quedó escrita
+            if db.in_transaction:
+                rollback_changes(db)
+            outcomes = [(future, None, e) for _, future in batch]
+
+        self.batches += 1
+        self.operations += len(batch)
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+
+def init_app(app):
+    app.config.setdefault('WRITE_QUEUE_ENABLED', False)
+    app.config.setdefault('WRITE_QUEUE_WINDOW_MS', 2)
+    app.config.setdefault('WRITE_QUEUE_MAX_BATCH', 64)
+    app.config.setdefault('WRITE_QUEUE_SYNCHRONOUS', 'full')
+    if not app.config['WRITE_QUEUE_ENABLED']:
+        return
+    if app.config['SHARDING_ENABLED']:
+        # El escritor único usa una sola conexión; con un archivo por proyecto las
+        # escrituras de tableros distintos ya no compiten por el mismo bloqueo
+        raise RuntimeError('WRITE_QUEUE_ENABLED no se puede combinar con SHARDING_ENABLED.')
+    app.extensions['write_queue'] = WriteQueue(
+        app,
+        window=app.config['WRITE_QUEUE_WINDOW_MS'] / 1000,
+        max_batch=app.config['WRITE_QUEUE_MAX_BATCH'],
+        synchronous=app.config['WRITE_QUEUE_SYNCHRONOUS'],
+    )
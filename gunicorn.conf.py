@@ -0,0 +1,33 @@
+# gunicorn.conf.py
+
+"""
+Configuración de gunicorn (se carga automáticamente al ejecutar `gunicorn wsgi:app`
+desde la raíz del proyecto).
+
+Los tableros mantienen conexiones Server-Sent Events abiertas (ver events.py).
+Con workers síncronos cada conexión ocuparía un worker entero, así que usamos
+workers gevent (incluido en requirements.txt): cada conexión en espera es solo
+una greenlet, y un worker puede mantener miles abiertas. Si gevent no está
+disponible, se usan workers con hilos (gthread) y cada conexión en vivo ocupa un
+hilo mientras está abierta: para que el resto de la API siga respondiendo, solo
+la mitad de los hilos de cada worker aceptan conexiones en vivo (las demás
+reciben un 503 y el tablero sigue funcionando sin cambios en vivo).
+"""
+
+import os
+
+workers = int(os.environ.get('GUNICORN_WORKERS', 2))
+
+try:
+    import gevent  # noqa: F401
+except ImportError:
+    worker_class = 'gthread'
+    threads = int(os.environ.get('GUNICORN_THREADS', 32))
+
+    def post_worker_init(worker):
+        from fabricioboard.extensions import event_hub
+
+        event_hub.max_subscribers = min(event_hub.max_subscribers, threads // 2)
+else:
+    worker_class = 'gevent'
+    worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 4000))